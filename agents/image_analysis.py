@@ -1,12 +1,18 @@
 import base64
+import logging
+import time
+import cv2
+import numpy as np
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage
-from config.prompts import IMAGE_ANALYSIS_PROMPT
+from config.prompts import IMAGE_ANALYSIS_CONTACT_SHEET_PROMPT, IMAGE_ANALYSIS_PROMPT
 from config.model_config import MODEL_CONFIG
+from utils.image_payload import (build_contact_sheet, estimate_image_tokens, face_centered_crop,
+                                 fit_to_budget, format_timestamp)
 
 class ImageAnalysisAgent:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, payload_budget=None, image_mode=None):
         model_config = MODEL_CONFIG["ImageAnalysisAgent"]
         self.llm = ChatOpenAI(
             model_name=model_config["model_name"],
@@ -14,39 +20,145 @@ class ImageAnalysisAgent:
             api_key=api_key
         )
         self.prompt_template = IMAGE_ANALYSIS_PROMPT
+        self.contact_sheet_prompt = IMAGE_ANALYSIS_CONTACT_SHEET_PROMPT
+        # 图片上传预算，传入 None 使用配置文件中的默认值；设为 False 则原样发送
+        self.payload_budget = model_config.get("payload_budget") if payload_budget is None else payload_budget
+        # 默认上传方式（"images" / "contact_sheet"）及联系表参数
+        self.image_mode = image_mode or model_config.get("image_mode", "images")
+        self.contact_sheet_config = model_config.get("contact_sheet", {})
+        # 最近一次调用的请求体大小与耗时，便于在成本和质量之间调参
+        self.last_request_stats = {}
 
-    def _encode_image(self, image_path: str) -> str:
-        """将图片文件编码为Base64字符串"""
-        try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        except FileNotFoundError:
-            return ""
+    def _prepare_image(self, image):
+        """
+        得到待上传的 JPEG：返回 (JPEG 字节, 宽, 高)，读取失败返回 None。
+        image 可以是图片文件路径，也可以是内存中的 BGR 数组。
+        配置了上传预算时先做人脸裁剪、缩放和分级质量压缩。
+        """
+        if not self.payload_budget:
+            if isinstance(image, np.ndarray):
+                ok, buffer = cv2.imencode(".jpg", image)
+                return (buffer.tobytes(), image.shape[1], image.shape[0]) if ok else None
+            try:
+                with open(image, "rb") as image_file:
+                    return image_file.read(), None, None
+            except FileNotFoundError:
+                return None
+
+        if not isinstance(image, np.ndarray):
+            image = cv2.imread(image)
+            if image is None:
+                return None
+        if self.payload_budget.get("face_crop", True):
+            image = face_centered_crop(image)
+        data, info = fit_to_budget(
+            image,
+            max_pixels=self.payload_budget["max_pixels"],
+            max_bytes=self.payload_budget["max_bytes"],
+            quality_steps=self.payload_budget.get("quality_steps", (85, 75, 65, 55)),
+        )
+        return data, info["width"], info["height"]
+
+    def _encode_image(self, image) -> str:
+        """将图片编码为Base64字符串（已按上传预算处理）"""
+        prepared = self._prepare_image(image)
+        return base64.b64encode(prepared[0]).decode('utf-8') if prepared else ""
 
-    def analyze(self, image_paths: list[str], detail: str = "high") -> str:
-        """分析本地图片文件列表"""
+    def _build_contact_sheet(self, images, timestamps=None):
+        """把多帧拼成一张网格图，返回 (JPEG 字节, 宽, 高, 提示词)；没有可用图片时返回 None"""
+        frames, labels, index_lines = [], [], []
+        cols = self.contact_sheet_config.get("cols", 3)
+        for index, image in enumerate(images):
+            if not isinstance(image, np.ndarray):
+                image = cv2.imread(image)
+                if image is None:
+                    continue
+            number = len(frames) + 1
+            stamp = format_timestamp(timestamps[index]) if timestamps else None
+            frames.append(image)
+            labels.append(f"#{number} {stamp}" if stamp else f"#{number}")
+        if not frames:
+            return None
+
+        face_crop = bool(self.payload_budget) and self.payload_budget.get("face_crop", True)
+        sheet, rows, cols = build_contact_sheet(
+            frames, labels, cols=cols,
+            cell_size=tuple(self.contact_sheet_config.get("cell_size", (384, 512))),
+            face_crop=face_crop,
+        )
+        for number, label in enumerate(labels, start=1):
+            row, col = divmod(number - 1, cols)
+            index_lines.append(f"- 第{row + 1}行第{col + 1}列：{label}")
+        data, info = fit_to_budget(
+            sheet,
+            max_pixels=self.contact_sheet_config.get("max_pixels", 1536 * 1024),
+            max_bytes=self.contact_sheet_config.get("max_bytes", 400 * 1024),
+        )
+        prompt_text = self.contact_sheet_prompt.format(
+            count=len(frames), rows=rows, cols=cols, frame_index="\n".join(index_lines)
+        )
+        return data, info["width"], info["height"], prompt_text
+
+    def build_message(self, images: list, detail: str = "high", mode: str = None, timestamps: list = None):
+        """
+        构建发送给视觉模型的消息。
+
+        Args:
+            images (list): 本地图片文件路径或抽帧得到的 BGR numpy 数组。
+            detail (str): 图片细节级别。
+            mode (str, optional): "images" 每帧单独上传，"contact_sheet" 拼成一张网格图；缺省用配置值。
+            timestamps (list, optional): 每帧对应的秒数，联系表模式下烧录在格子上。
+        Returns:
+            tuple: (HumanMessage 或 None, 统计信息 dict)
+        """
+        mode = mode or self.image_mode
         messages_content = []
         image_urls = []
+        token_estimate = 0
 
-        for image_path in image_paths:
-            base64_image = self._encode_image(image_path)
-            if not base64_image:
-                messages_content.append({"type": "text", "text": f"错误：无法读取或编码图片文件 {image_path}。"})
-                continue
-            image_urls.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}", "detail": detail}})
-        
+        if mode == "contact_sheet":
+            built = self._build_contact_sheet(images, timestamps)
+            if built is not None:
+                data, width, height, prompt_text = built
+                base64_image = base64.b64encode(data).decode('utf-8')
+                image_urls.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}", "detail": detail}})
+                token_estimate += estimate_image_tokens(width, height, detail)
+        else:
+            for index, image in enumerate(images):
+                prepared = self._prepare_image(image)
+                if not prepared:
+                    name = image if isinstance(image, str) else f"第 {index + 1} 张图片"
+                    messages_content.append({"type": "text", "text": f"错误：无法读取或编码图片文件 {name}。"})
+                    continue
+                data, width, height = prepared
+                base64_image = base64.b64encode(data).decode('utf-8')
+                image_urls.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}", "detail": detail}})
+                if width and height:
+                    token_estimate += estimate_image_tokens(width, height, detail)
+            prompt_text = self.prompt_template.format(input_image="") # Prompt template might need adjustment for multiple images
+
+        # base64 图片占请求体的绝大部分，按其总长度估算请求大小
+        stats = {
+            "mode": mode,
+            "images": len(image_urls),
+            "payload_bytes": sum(len(item["image_url"]["url"]) for item in image_urls),
+            "estimated_image_tokens": token_estimate,
+        }
         if not image_urls:
-            return "错误：没有可用于分析的图片。"
+            return None, stats
 
-        prompt_text = self.prompt_template.format(input_image="") # Prompt template might need adjustment for multiple images
         messages_content.append({"type": "text", "text": prompt_text})
         messages_content.extend(image_urls)
-        
         # 构建包含图片的消息
-        message = HumanMessage(
-            content=messages_content
-        )
+        return HumanMessage(content=messages_content), stats
+
+    def analyze(self, images: list, detail: str = "high", mode: str = None, timestamps: list = None) -> str:
+        """分析图片列表：元素为本地图片文件路径或抽帧得到的 BGR numpy 数组，参数见 build_message"""
+        message, stats = self.build_message(images, detail=detail, mode=mode, timestamps=timestamps)
+        if message is None:
+            return "错误：没有可用于分析的图片。"
 
+        start = time.perf_counter()
         try:
             stream = self.llm.stream([message])
             full_response_content = ""
@@ -55,4 +167,10 @@ class ImageAnalysisAgent:
                     full_response_content += chunk.content
             return full_response_content
         except Exception as e:
-            return f"调用API失败: {e}"
\ No newline at end of file
+            return f"调用API失败: {e}"
+        finally:
+            stats["latency"] = time.perf_counter() - start
+            self.last_request_stats = stats
+            logging.info(f"图像分析请求（{stats['mode']}）：{stats['images']} 张图片，"
+                         f"约 {stats['payload_bytes'] / 1024:.1f} KB，估算 {stats['estimated_image_tokens']} 图像 token，"
+                         f"耗时 {stats['latency']:.2f} 秒")
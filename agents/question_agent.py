@@ -1,16 +1,15 @@
 import random
 import logging
 import os
-import hashlib
 from typing import List
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableSequence
-from config.prompts import QUESTION_AGENT_PROMPT
+from config.prompts import QUESTION_AGENT_PROMPT, SELF_INTRODUCTION_QUESTION
 from config.model_config import MODEL_CONFIG
-from utils.text2Audio import run_tts
+from utils.tts_cache import get_tts_cache, synthesize_batch, synthesize_cached, synthesize_iter
 
 # 配置日志
 # 设置日志级别为 INFO，并定义日志输出格式
@@ -188,24 +187,19 @@ class InterviewQuestionAgent:
             logging.error(f"智能体生成问题失败: {e}", exc_info=True) # exc_info=True 会打印堆栈信息
             return []
 
-    def generate_questions(self, time_limit_per_question: float = 1.25) -> tuple[list[str], list[str]]:
+    def _select_questions(self) -> list[str]:
         """
-        生成面试问题。
-
-        Args:
-            time_limit_per_question (float): 每道题预估的回答时间（分钟）。用于估算总面试时间。默认为1.25分钟。
+        选出自我介绍之后的面试问题：默认由智能体生成，失败时回退到题库文件。
 
         Returns:
-            tuple[list[str], list[str]]: 包含"自我介绍"在内的面试问题列表和对应的音频文件路径列表。
+            list[str]: 问题列表（不含自我介绍）。
         """
         # 默认生成4个问题，如果需要更多或更少，可以在前端控制或通过其他参数传递
         num_questions = 4
         # 默认使用智能体生成问题，如果需要从文件中加载，可以在前端控制或通过其他参数传递
         use_agent = True
         
-        # 所有面试默认包含自我介绍
-        questions = ["请做个自我介绍"]
-        question_audio_paths = [] # 新增列表用于存储语音文件路径
+        questions = []
 
         if use_agent:
             # 如果选择使用智能体生成问题
@@ -239,28 +233,55 @@ class InterviewQuestionAgent:
                 selected = random.sample(file_questions, min(num_questions, len(file_questions)))
                 questions.extend(selected)
 
-        # 将生成的问题转换为语音并保存
-        # 修正相对路径问题，确保从项目根目录开始查找
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        audio_dir = os.path.join(base_dir, "question_audio")
-        if not os.path.exists(audio_dir):
-            os.makedirs(audio_dir)
+        return questions
 
-        for i, question_text in enumerate(questions):
-            # 使用问题内容的哈希值作为文件名，确保唯一性
-            file_hash = hashlib.md5(question_text.encode('utf-8')).hexdigest()
-            audio_filename = f"question_{i}_{file_hash}.wav"
-            audio_filepath = os.path.join(audio_dir, audio_filename)
-            
-            # 异步调用 run_tts，避免阻塞主线程
-            # 注意：run_tts 内部已经使用了线程，这里不需要额外开线程
-            run_tts(question_text, audio_filepath)
-            question_audio_paths.append(audio_filepath)
-            logging.info(f"问题 '{question_text}' 的语音文件已保存到: {audio_filepath}")
+    def generate_questions(self, time_limit_per_question: float = 1.25) -> tuple[list[str], list[str]]:
+        """
+        生成面试问题。
+
+        Args:
+            time_limit_per_question (float): 每道题预估的回答时间（分钟）。用于估算总面试时间。默认为1.25分钟。
+
+        Returns:
+            tuple[list[str], list[str]]: 包含"自我介绍"在内的面试问题列表和对应的音频文件路径列表（合成失败的位置为 None）。
+        """
+        # 所有面试默认包含自我介绍
+        questions = [SELF_INTRODUCTION_QUESTION] + self._select_questions()
+
+        # 将生成的问题转换为语音：按 (文本, 发音人, 音频格式) 缓存，未命中的问题并发合成
+        question_audio_paths = synthesize_batch(questions)
+        for question_text, audio_filepath in zip(questions, question_audio_paths):
+            logging.info(f"问题 '{question_text}' 的语音文件: {audio_filepath}")
+        self._log_tts_cache_stats()
 
         # 计算总的面试预估时间
         total_time = len(questions) * time_limit_per_question
         logging.info(f"总问题数: {len(questions)}，预估总时长: {total_time:.2f} 分钟。")
 
         # 返回问题列表和语音文件路径列表
-        return questions, question_audio_paths
\ No newline at end of file
+        return questions, question_audio_paths
+
+    def iter_questions(self):
+        """
+        generate_questions 的逐条版本：先产出自我介绍（语音通常已在缓存中），
+        再生成其余问题并并发合成，每合成完一条就产出一条（按完成顺序，不一定按题号）。
+
+        Yields:
+            tuple[int, str, str | None]: (题号下标, 问题文本, 音频文件路径)，合成失败时路径为 None。
+        """
+        try:
+            intro_path = synthesize_cached(SELF_INTRODUCTION_QUESTION)
+        except Exception as e:
+            logging.error(f"问题 '{SELF_INTRODUCTION_QUESTION}' 的语音合成失败: {e}")
+            intro_path = None
+        yield 0, SELF_INTRODUCTION_QUESTION, intro_path
+
+        questions = self._select_questions()
+        for index, audio_filepath in synthesize_iter(questions):
+            yield index + 1, questions[index], audio_filepath
+        self._log_tts_cache_stats()
+
+    @staticmethod
+    def _log_tts_cache_stats():
+        cache_stats = get_tts_cache().stats()
+        logging.info(f"问题语音缓存命中率: {cache_stats['hit_rate']:.0%}（命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次）")
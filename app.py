@@ -11,12 +11,17 @@ from database.database import get_db
 from database.database import Base, engine
 from database.models import EvaluationResult, User
 from routes import auth_routes, interview_routes, report_routes, user_routes
+from utils.tts_cache import load_tts_manifest
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 在应用启动时创建数据库表
     Base.metadata.create_all(bind=engine)
+    # 加载离线预合成的问题语音清单，题库问题的语音常驻缓存
+    load_tts_manifest()
     yield
+    # 关闭时不再接收新的后台任务，未开始的任务取消
+    interview_routes.job_service.shutdown()
 
 app = FastAPI(
     title="AI面试评估系统API",
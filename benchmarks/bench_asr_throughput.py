@@ -0,0 +1,111 @@
+"""
+离线吞吐基准：启动本地模拟转写服务（utils/asr_standin.py），并发运行多个面试的视频处理管线
+（抽帧、音频提取、语音转写，即 /process_interview/ 中不依赖大模型的部分），统计吞吐和转写阶段耗时。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_asr_throughput                       # 并发 1 / 4 / 16，2 分钟合成视频
+    python -m benchmarks.bench_asr_throughput --concurrency 8 32 --minutes 5
+
+不需要讯飞账号和网络；模拟服务的处理耗时按 ASR_STANDIN_CONFIG 中的 base + ratio × 音频时长计算。
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from moviepy.config import FFMPEG_BINARY
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+
+from config.pipeline_config import ASR_CONFIG
+from utils.asr_client import make_asr_client
+from utils.asr_standin import create_app
+from utils.Video_processing import InterviewProcessor
+
+
+def make_test_video(path, minutes):
+    """用 ffmpeg 生成带音轨的测试视频（测试图案 + 正弦音）"""
+    seconds = str(int(minutes * 60))
+    subprocess.run([FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", "testsrc2=size=640x360:rate=30",
+                    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+                    "-t", seconds, "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", path],
+                   check=True)
+    return path
+
+
+def start_standin():
+    """在后台线程中启动模拟服务，返回 (server, 接口地址)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/v2/api"
+
+
+async def run_batch(video_path, concurrency, config):
+    async def one():
+        processor = InterviewProcessor(
+            video_path=video_path,
+            appid=None,
+            secret_key=None,
+            use_cache=False,
+            persist_frames=False,
+            asr_client=make_asr_client(config=config, provider="standin"),
+        )
+        # use_cache=False 只关闭任务目录缓存；转写缓存按 PCM 哈希命中，同一合成视频从第二次起
+        # 不会再请求转写服务，测到的将是磁盘读取而不是转写，这里一并关闭
+        processor.transcript_cache = None
+        try:
+            await processor.run_pipeline_async(on_event=lambda *args: None)
+            return processor.stage_timings
+        finally:
+            shutil.rmtree(processor.task_dir, ignore_errors=True)
+
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(one() for _ in range(concurrency)))
+    return time.perf_counter() - start, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语音转写离线吞吐基准")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="同时处理的面试数")
+    parser.add_argument("--minutes", type=float, default=2, help="合成视频时长（分钟）")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_asr_")
+    cwd = os.getcwd()
+    server, host = start_standin()
+    config = dict(ASR_CONFIG, standin_host=host)
+    rows = []
+    try:
+        video_path = make_test_video(os.path.join(work_dir, "interview.mp4"), args.minutes)
+        # InterviewProcessor 的输出写到相对路径 output/，切到临时目录避免污染项目
+        os.chdir(work_dir)
+        for concurrency in args.concurrency:
+            wall, timings = asyncio.run(run_batch(video_path, concurrency, config))
+            asr = sum(t.get("asr", 0) for t in timings) / len(timings)
+            rows.append((concurrency, wall, asr))
+    finally:
+        os.chdir(cwd)
+        server.should_exit = True
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{'concurrency':>12}{'wall(s)':>10}{'interviews/min':>16}{'avg asr(s)':>12}")
+    for concurrency, wall, asr in rows:
+        print(f"{concurrency:>12}{wall:>10.2f}{concurrency * 60 / wall:>16.1f}{asr:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
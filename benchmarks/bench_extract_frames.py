@@ -0,0 +1,87 @@
+"""
+抽帧基准：对比 sequential（逐帧解码）与 sparse（按目标时间定位）两种模式的
+解码帧数与耗时。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_extract_frames --minutes 10 --fps 30
+    python -m benchmarks.bench_extract_frames --video ./user_uploads/xxx.mp4
+
+不指定 --video 时会在临时目录生成一段合成视频。注意 decoded 只统计
+显式 read/grab 的帧，seek 内部从关键帧解码到目标帧的开销体现在耗时中。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.Video_processing import InterviewProcessor
+
+
+def make_synthetic_video(path, minutes, fps=30, size=(640, 360)):
+    """生成合成测试视频：移动的色块加帧序号，保证每帧内容不同"""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    total = int(minutes * 60 * fps)
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    for i in range(total):
+        canvas[:] = (i % 255, 80, 160)
+        x = (i * 4) % (width - 60)
+        cv2.rectangle(canvas, (x, 150), (x + 60, 210), (255, 255, 255), -1)
+        cv2.putText(canvas, str(i), (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        writer.write(canvas)
+    writer.release()
+    return path
+
+
+def run_mode(video_path, mode, frame_interval):
+    processor = InterviewProcessor(
+        video_path=video_path,
+        appid="",
+        secret_key="",
+        frame_interval=frame_interval,
+        extract_mode=mode,
+    )
+    processor.extract_frames()
+    return processor.decode_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抽帧模式基准")
+    parser.add_argument("--video", help="使用已有视频，缺省时生成合成视频")
+    parser.add_argument("--minutes", type=float, default=10, help="合成视频时长（分钟）")
+    parser.add_argument("--fps", type=int, default=30, help="合成视频帧率")
+    parser.add_argument("--frame-interval", type=int, default=8, help="抽帧间隔（秒）")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_frames_")
+    cwd = os.getcwd()
+    try:
+        video_path = os.path.abspath(args.video) if args.video else None
+        # InterviewProcessor 的输出写到相对路径 output/，切到临时目录避免污染项目
+        os.chdir(work_dir)
+        if video_path is None:
+            print(f"生成 {args.minutes} 分钟 {args.fps} FPS 合成视频...")
+            video_path = make_synthetic_video(os.path.join(work_dir, "synthetic.mp4"), args.minutes, args.fps)
+
+        results = [run_mode(video_path, mode, args.frame_interval) for mode in ("sequential", "sparse")]
+
+        print(f"\n{'mode':<12}{'decoded':>10}{'seeks':>8}{'saved':>8}{'wall(s)':>10}")
+        for stats in results:
+            print(f"{stats['mode']:<12}{stats['decoded']:>10}{stats['seeks']:>8}"
+                  f"{stats['saved']:>8}{stats['elapsed']:>10.2f}")
+        base, sparse = results
+        if sparse["elapsed"] > 0:
+            print(f"\n加速比: {base['elapsed'] / sparse['elapsed']:.1f}x")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+视觉请求基准：比较三种上传方式的请求体大小、估算图像 token 和（可选）真实延迟。
+
+    raw            每帧原图直接上传（无上传预算）
+    images         每帧按上传预算裁剪、缩放、压缩后上传
+    contact_sheet  所有帧拼成一张带序号和时间戳的网格图上传
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_image_payload --video ./user_uploads/xxx.mp4 --frames 6
+    python -m benchmarks.bench_image_payload --frames 6 --live   # 需要 .env 中的 STEPFUN_API_KEY
+
+不指定 --video 时使用合成的 1080p 帧。token 为按分块计费规则的估算值。
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.image_analysis import ImageAnalysisAgent
+
+
+def load_frames(video_path, count):
+    """从视频中均匀取 count 帧，返回 (帧列表, 秒数列表)"""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames, timestamps = [], []
+    for i in range(count):
+        index = int(total * (i + 1) / (count + 1))
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+            timestamps.append(int(index / fps))
+    cap.release()
+    return frames, timestamps
+
+
+def synthetic_frames(count, size=(1920, 1080)):
+    rng = np.random.default_rng(0)
+    width, height = size
+    frames = []
+    for i in range(count):
+        # 低频渐变加噪声，压缩难度接近真实画面
+        gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+        frame = np.clip(gradient + rng.normal(0, 25, (height, width, 3)), 0, 255).astype(np.uint8)
+        cv2.circle(frame, (width // 2, height // 2), 200 + 10 * i, (200, 180, 160), -1)
+        frames.append(frame)
+    return frames, [8 * (i + 1) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视觉请求上传方式基准")
+    parser.add_argument("--video", help="从该视频中取帧，缺省时使用合成帧")
+    parser.add_argument("--frames", type=int, default=6, help="帧数")
+    parser.add_argument("--live", action="store_true", help="真实调用视觉模型并记录延迟")
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("STEPFUN_API_KEY") if args.live else "dry-run"
+    if args.live and not api_key:
+        parser.error("--live 需要在 .env 中配置 STEPFUN_API_KEY")
+
+    frames, timestamps = load_frames(args.video, args.frames) if args.video else synthetic_frames(args.frames)
+    variants = [
+        ("raw", ImageAnalysisAgent(api_key=api_key, payload_budget=False), "images"),
+        ("images", ImageAnalysisAgent(api_key=api_key), "images"),
+        ("contact_sheet", ImageAnalysisAgent(api_key=api_key), "contact_sheet"),
+    ]
+
+    print(f"{'variant':<15}{'images':>8}{'payload(KB)':>13}{'tokens':>9}{'build(s)':>10}{'latency(s)':>12}")
+    for name, agent, mode in variants:
+        start = time.perf_counter()
+        _, stats = agent.build_message(frames, mode=mode, timestamps=timestamps)
+        build_time = time.perf_counter() - start
+        latency = "-"
+        if args.live:
+            agent.analyze(frames, mode=mode, timestamps=timestamps)
+            latency = f"{agent.last_request_stats['latency']:.2f}"
+        print(f"{name:<15}{stats['images']:>8}{stats['payload_bytes'] / 1024:>13.1f}"
+              f"{stats['estimated_image_tokens'] or '-':>9}{build_time:>10.2f}{latency:>12}")
+
+
+if __name__ == "__main__":
+    main()
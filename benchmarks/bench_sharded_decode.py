@@ -0,0 +1,91 @@
+"""
+分片解码基准：对比 sparse（单进程）与 sharded（多进程按时间分片）在不同时长视频上的抽帧耗时。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_sharded_decode                       # 5 / 20 / 60 分钟合成视频
+    python -m benchmarks.bench_sharded_decode --minutes 5 20 --shards 2 4 8
+    python -m benchmarks.bench_sharded_decode --cache-dir ./bench_videos   # 保留生成的视频，下次直接复用
+
+合成视频由 OpenCV 在本地生成（60 分钟 360p 约需数分钟），不指定 --cache-dir 时放在临时目录并在结束后删除。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_extract_frames import make_synthetic_video
+from utils.sharded_decode import available_cores
+from utils.Video_processing import InterviewProcessor
+
+
+def run_extract(video_path, mode, frame_interval, shards=None):
+    processor = InterviewProcessor(
+        video_path=video_path,
+        appid="",
+        secret_key="",
+        frame_interval=frame_interval,
+        extract_mode=mode,
+        use_cache=False,
+        persist_frames=False,
+        decode_shards=shards,
+    )
+    try:
+        processor.extract_frames()
+        return dict(processor.decode_stats)
+    finally:
+        shutil.rmtree(processor.task_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分片解码基准")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[5, 20, 60], help="合成视频时长（分钟）")
+    parser.add_argument("--shards", type=int, nargs="+", default=None,
+                        help="sharded 模式的分片数，缺省为 2 和可用核数")
+    parser.add_argument("--fps", type=int, default=30, help="合成视频帧率")
+    parser.add_argument("--frame-interval", type=int, default=8, help="抽帧间隔（秒）")
+    parser.add_argument("--cache-dir", help="生成视频的保存目录，已存在的同名视频直接复用")
+    args = parser.parse_args()
+
+    cores = available_cores()
+    shard_counts = args.shards or sorted({2, cores})
+    video_dir = os.path.abspath(args.cache_dir) if args.cache_dir else tempfile.mkdtemp(prefix="bench_shards_")
+    os.makedirs(video_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="bench_shards_out_")
+    cwd = os.getcwd()
+    rows = []
+    try:
+        # InterviewProcessor 的输出写到相对路径 output/，切到临时目录避免污染项目
+        os.chdir(work_dir)
+        for minutes in args.minutes:
+            video_path = os.path.join(video_dir, f"synthetic_{minutes:g}min_{args.fps}fps.mp4")
+            if not os.path.exists(video_path):
+                print(f"生成 {minutes:g} 分钟 {args.fps} FPS 合成视频...")
+                make_synthetic_video(video_path, minutes, args.fps)
+            # 基线固定单进程（decode_shards=1 时 sparse 不会自动切换为 sharded）
+            rows.append((minutes, "sparse", 1, run_extract(video_path, "sparse", args.frame_interval, 1)))
+            for shards in shard_counts:
+                if shards > 1:
+                    stats = run_extract(video_path, "sharded", args.frame_interval, shards)
+                    rows.append((minutes, "sharded", shards, stats))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if not args.cache_dir:
+            shutil.rmtree(video_dir, ignore_errors=True)
+
+    print(f"\n可用 CPU 核数: {cores}")
+    print(f"{'minutes':>8}  {'mode':<9}{'shards':>7}{'decoded':>10}{'seeks':>8}{'saved':>8}{'wall(s)':>10}{'speedup':>9}")
+    baseline = {}
+    for minutes, mode, shards, stats in rows:
+        if mode == "sparse":
+            baseline[minutes] = stats["elapsed"]
+        speedup = baseline[minutes] / stats["elapsed"] if stats["elapsed"] > 0 else 0
+        print(f"{minutes:>8g}  {mode:<9}{shards:>7}{stats['decoded']:>10}{stats['seeks']:>8}"
+              f"{stats['saved']:>8}{stats['elapsed']:>10.2f}{speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
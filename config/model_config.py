@@ -4,7 +4,24 @@
 MODEL_CONFIG = {
     "ImageAnalysisAgent": {
         "model_name": "step-1o-turbo-vision",
-        "base_url": "https://api.stepfun.com/v1"
+        "base_url": "https://api.stepfun.com/v1",
+        # 单张图片的上传预算：先按人脸裁剪，再缩放到 max_pixels 以内，
+        # 最后逐级降低 JPEG 质量直到不超过 max_bytes
+        "payload_budget": {
+            "face_crop": True,
+            "max_pixels": 768 * 1024,
+            "max_bytes": 150 * 1024,
+            "quality_steps": [85, 75, 65, 55]
+        },
+        # 上传方式："images" 每帧一张图；"contact_sheet" 拼成一张带序号和时间戳的网格图，
+        # 视觉接口按图片分块计费，一张网格图比多张整帧便宜且更快
+        "image_mode": "images",
+        "contact_sheet": {
+            "cols": 3,
+            "cell_size": [384, 512],
+            "max_pixels": 1536 * 1024,
+            "max_bytes": 400 * 1024
+        }
     },
     "SpeechAnalysisAgent": {
         "model_name": "step-1o-audio",
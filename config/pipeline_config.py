@@ -0,0 +1,119 @@
+# config/pipeline_config.py
+
+# 帧筛选配置：从全部抽帧中为各个下游消费者挑选信息量最高的帧
+FRAME_SELECTION_CONFIG = {
+    # 每个消费者最多使用的帧数
+    "budgets": {
+        "image_analysis": 5,   # 视觉大模型（按图片计费）
+        "model_inference": 5,  # HireNet 的 ResNet-50 视觉特征
+    },
+    "thumbnail_width": 320,    # 打分时使用的缩略图宽度（像素）
+    "sharpness_weight": 0.4,   # 清晰度（拉普拉斯方差）权重
+    "face_weight": 0.4,        # 检测到人脸的权重
+    "eyes_weight": 0.2,        # 人脸区域内检测到睁开双眼的权重
+    "diversity_weight": 0.3,   # 选帧时多样性（直方图距离）相对质量分的权重
+}
+
+# 分块上传配置（/upload_video/init → PUT 字节区间 → finalize）
+UPLOAD_CONFIG = {
+    "upload_dir": "./user_uploads",          # 视频保存目录
+    "max_file_bytes": 2 * 1024 ** 3,         # 单个文件上限 2 GB
+    "chunk_bytes": 8 * 1024 ** 2,            # 建议客户端使用的分块大小
+    "max_chunk_bytes": 32 * 1024 ** 2,       # 单个 PUT 请求的分块上限
+    "write_buffer_bytes": 1024 ** 2,         # 攒够该大小再交给线程池写盘和哈希
+    "session_ttl_seconds": 24 * 3600,        # 未完成的上传会话保留时长
+    # 这些扩展名的容器可从已收到的前缀开始解析（MediaRecorder 录制的 WebM 等），
+    # 上传过程中即开始抽帧和提取音频；客户端也可在 init 时用 ingest 显式开关
+    "stream_ingest_extensions": (".webm", ".mkv"),
+}
+
+# 上传视频规范化配置：转为 moov 前置、关键帧间隔固定、带 16 kHz 单声道音轨的 MP4，
+# 浏览器录制的 WebM 帧数元数据不可靠且关键帧稀疏，规范化后抽帧可以直接定位
+NORMALIZE_CONFIG = {
+    "after_upload": False,                   # 上传完成后是否在后台预先规范化
+    "suffix": ".norm.mp4",                   # 规范化文件与原文件同目录，文件名追加该后缀
+    "keyframe_interval": 2,                  # 转码时的关键帧间隔（秒）
+    "max_keyframe_gap": 4,                   # H.264 源的最大关键帧间隔不超过该值（秒）时只重新封装
+    "remux_video_codecs": ("h264",),         # 可直接复制进 MP4 的视频编码
+    "preset": "veryfast",                    # libx264 转码预设
+    "crf": 23,                               # libx264 画质参数
+    "audio_sample_rate": 16000,              # 音轨采样率，与 ASR 要求一致
+    "audio_bitrate": "48k",
+}
+
+# 后台任务配置（/interview_jobs/：提交后立即返回 job_id，通过轮询或 SSE 获取进度）
+JOB_CONFIG = {
+    "backend": "memory",                     # 任务状态存储："memory"（进程内）或 "sqlite"（可跨进程查询、重启后保留）
+    "sqlite_path": "./output/jobs.db",       # backend 为 sqlite 时使用的数据库文件
+    "max_workers": 2,                        # 同时执行的面试分析任务数
+    "max_pending": 16,                       # 排队 + 执行中的任务上限，超过时拒绝提交（429）
+    "job_ttl_seconds": 24 * 3600,            # 已结束任务的保留时长
+    "heartbeat_seconds": 30,                 # 执行中和排队的任务按该间隔刷新 updated_at，表明所在进程仍存活
+    "stale_job_seconds": 300,                # 启动时把超过该时长没有心跳的未完成任务视为已中断（需远大于 heartbeat_seconds）
+    "sse_poll_seconds": 0.5,                 # SSE 推送时检查新事件的间隔
+    "sse_keepalive_seconds": 15,             # 没有新事件时发送心跳注释，防止代理断开连接
+}
+
+# 语音转写客户端配置
+ASR_CONFIG = {
+    # 转写服务提供方："xfyun"（讯飞录音文件转写）或 "standin"（本地模拟服务，见 utils/asr_standin.py，
+    # 协议和返回格式与讯飞相同，用于压测和没有讯飞账号的开发/CI 环境）
+    "provider": "xfyun",
+    "host": "https://raasr.xfyun.cn/v2/api",
+    "standin_host": "http://127.0.0.1:8765/v2/api",
+    "connect_timeout": 5,                    # 建立连接超时（秒）
+    "read_timeout": 60,                      # 读取响应超时（秒），上传大文件时为两次收到数据之间的间隔
+    "pool_maxsize": 16,                      # 共享会话中每个主机保持的长连接数
+    "connect_retries": 2,                    # 连接失败时的重试次数（请求尚未发出，重试是安全的）
+    # 轮询节奏：第一次在预计完成时刻查询，之后按指数退避 + 随机抖动
+    "expected_base_seconds": 3,              # 预计完成时间 = base + ratio × 音频时长
+    "expected_ratio": 0.15,
+    "min_poll_interval": 1,                  # 首次查询后的轮询间隔（秒）
+    "max_poll_interval": 15,                 # 退避后的最大轮询间隔（秒）
+    "backoff_factor": 1.6,                   # 每次未完成后间隔放大的倍数
+    "jitter": 0.2,                           # 间隔随机抖动比例（±20%），避免大量任务同时查询
+    "max_wait_seconds": 1800,                # 超过该时长仍未完成视为失败
+}
+
+# 本地模拟转写服务（utils/asr_standin.py）的延迟和结果设置
+ASR_STANDIN_CONFIG = {
+    "base_seconds": 2,                       # 处理耗时 = base + ratio × 音频时长，再加 ±jitter 抖动
+    "ratio": 0.1,
+    "jitter": 0.2,
+    "sentence_seconds": 4,                   # 每多少秒音频生成一句模拟文本
+    "fail_rate": 0.0,                        # 以该概率返回失败订单（status -1），用于测试错误处理
+}
+
+# 转写前的静音压缩（utils/vad.py）：按短时能量检测语音，把长静音缩短后再上传转写，
+# 时间偏移表保存在任务目录的 audio_offsets.json，用于把转写时间戳还原到原始时间轴
+VAD_CONFIG = {
+    "enabled": False,                        # InterviewProcessor(vad=None) 时的默认值
+    "frame_ms": 30,                          # 能量计算的帧长（毫秒）
+    "margin_db": 12,                         # 高于底噪（能量第 10 百分位）多少 dB 视为语音
+    "min_db": -50,                           # 语音帧的最低能量（dBFS），避免全程安静时把底噪当作语音
+    "min_silence_seconds": 0.8,              # 不短于该时长的静音才会被压缩
+    "keep_silence_seconds": 0.3,             # 压缩后保留的静音时长（前后各一半）
+}
+
+# 转写结果缓存：键为送去转写的 16 kHz PCM 数据的哈希（与文件名、任务目录无关），
+# 同一段录音重复上传或重新处理时不再请求转写服务
+TRANSCRIPT_CACHE_CONFIG = {
+    "enabled": True,
+    "cache_dir": "./output/transcript_cache",
+    "max_bytes": 256 * 1024 ** 2,            # 超过后按最近最少使用淘汰
+}
+
+# 面试问题语音（TTS）缓存：键为 (文本, 发音人, 音频格式) 的哈希，与题目序号无关，
+# 相同的问题只合成一次。目录位于 question_audio 下，可直接通过 /audio/questions/ 访问
+TTS_CACHE_CONFIG = {
+    "cache_dir": "question_audio/tts_cache",  # 相对项目根目录
+    "question_bank": "config/question/*.txt", # 离线预合成（python -m utils.tts_cache）读取的题库文件
+    "max_bytes": 512 * 1024 ** 2,            # 超过后按最近最少使用淘汰
+}
+
+# 问题语音的批量合成（utils/tts_cache.synthesize_batch）
+TTS_BATCH_CONFIG = {
+    "max_concurrency": 4,                    # 同时进行的合成请求（websocket 连接）数
+    "rate_per_second": 2,                    # 令牌桶：每秒新建的合成请求数上限，按讯飞账号的并发/QPS 配额调整
+    "burst": 4,                              # 令牌桶容量，允许的突发请求数
+}
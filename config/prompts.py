@@ -3,6 +3,9 @@
 # ---
 # General Analysis Prompts
 # ---
+# 所有面试的第一题（generate_questions 固定放在最前，离线预合成语音时同样包含）
+SELF_INTRODUCTION_QUESTION = "请做个自我介绍"
+
 QUESTION_AGENT_PROMPT = """
 你是一位经验丰富的技术面试官，专精于{job_type}领域。
 请为{job_type}岗位的候选人设计{num_questions}个高质量的面试问题。
@@ -38,6 +41,14 @@ QUESTION_AGENT_PROMPT = """
 IMAGE_ANALYSIS_PROMPT = """请分析这张图片中人物的表情、姿势和眼神交流情况。根据这些非语言线索，判断其当前的**精神状态、自信程度和情绪表现**。
 """
 
+# 联系表模式：多帧拼成一张网格图发送，按格子位置引用画面
+IMAGE_ANALYSIS_CONTACT_SHEET_PROMPT = """下面这张图由面试视频中的 {count} 帧截图拼成，共 {rows} 行 {cols} 列，按从左到右、从上到下的时间顺序排列，每格左上角标有序号和时间戳：
+{frame_index}
+
+请综合各格画面，分析人物的表情、姿势和眼神交流情况及其随时间的变化。根据这些非语言线索，判断其当前的**精神状态、自信程度和情绪表现**。
+引用具体画面时请注明格子位置（如“第1行第2列”）或序号。
+"""
+
 SPEECH_EXPRESSION_PROMPT = """请对以下用户的说话内容进行深入评估：
 - **表达能力**: 语言是否清晰、流畅？是否存在口头禅或不必要的停顿？
 - **逻辑性**: 回答结构是否严谨？论证过程是否连贯、有条理？
@@ -6,5 +6,9 @@ VOICE_CONFIG = {
     'AUDIO_FORMAT': 'audio/L16;rate=16000',  # 音频格式要求 L16 采样率16000 mp3 16k 单声道
     'LANGUAGE': 'zh_cn',  # 识别语言
     'ACCENT': 'mandarin',  # 方言/口音
-    'VAD_EOS': 5000  # 静音检测时长(ms)
+    'VAD_EOS': 5000,  # 静音检测时长(ms)
+    # 语音合成（TTS）参数，同时参与问题语音缓存的键
+    'TTS_VCN': 'xiaoyan',  # 发音人
+    'TTS_AUE': 'raw',  # 音频编码，raw 为 PCM
+    'TTS_AUF': 'audio/L16;rate=16000',  # 音频采样率
 }
@@ -55,7 +55,11 @@ class ModelInference:
         
         features = []
         for path in frame_paths:
-            img = Image.open(path).convert('RGB')
+            # 既支持帧图像文件路径，也支持抽帧阶段直接传来的 BGR numpy 数组（省去 JPEG 编解码）
+            if isinstance(path, np.ndarray):
+                img = Image.fromarray(np.ascontiguousarray(path[:, :, ::-1]))
+            else:
+                img = Image.open(path).convert('RGB')
             img_tensor = transform(img).unsqueeze(0).to(self.device)
             with torch.no_grad(): # 确保特征提取过程不计算梯度
                 feat = self.visual_feature_extractor(img_tensor)
@@ -70,11 +74,11 @@ class ModelInference:
         return torch.tensor(np.array(features)).mean(dim=0).to(self.device) 
 
     def extract_audio_features(self, audio_path, sample_rate=16000):
-        # 读取音频并重采样
+        # 读取音频并重采样（InterviewProcessor 输出的 audio.wav 已是 16 kHz 单声道，不会触发重采样）
         waveform, sr = torchaudio.load(audio_path, normalize=True)
         if sr != sample_rate:
             waveform = torchaudio.transforms.Resample(orig_freq=sr, new_freq=sample_rate)(waveform)
-        
+
         # 确保音频是单通道，并转换为 numpy 数组
         audio_array = waveform.mean(dim=0).cpu().numpy()
         
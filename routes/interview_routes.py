@@ -1,16 +1,18 @@
 from datetime import datetime
 from datetime import datetime
 import functools
+import hashlib
 import json
 import logging
 import os
-import random
-import shutil
+import re
+import time
 from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Header, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from agents.image_analysis import ImageAnalysisAgent
@@ -19,12 +21,18 @@ from agents.integrated_evaluator import IntegratedEvaluator
 from agents.question_agent import InterviewQuestionAgent
 from agents.speech_analysis import SpeechAnalysisAgent
 from agents.text_analysis import TextContentAgent
+from config.pipeline_config import FRAME_SELECTION_CONFIG, NORMALIZE_CONFIG, UPLOAD_CONFIG
+from services.job_service import JobService
+from services.upload_service import UploadService, digest_sidecar_path, known_digest
+from utils.cache_utils import atomic_write_text
+from utils.frame_selection import select_for_consumers
+from utils.media_normalize import normalize_video
 from utils.Video_processing import InterviewProcessor
 from utils.radar_chart_generator import generate_interactive_single_radar_chart
 from utils.to_pdf import PDFGenerator # 导入functools，用于缓存代理实例
 
 # --- 配置与初始化 ---
-UPLOAD_DIR = "./user_uploads"  # 视频保存目录
+UPLOAD_DIR = UPLOAD_CONFIG["upload_dir"]  # 视频保存目录
 # 确保视频上传目录存在，如果不存在则创建
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -40,6 +48,11 @@ XF_SECRET_KEY = os.getenv("XF_SECRET_KEY")
 
 router = APIRouter()
 
+# 分块上传会话管理（会话状态保存在磁盘上，可跨重启续传）
+upload_service = UploadService()
+# 面试分析后台任务（有界线程池 + 可替换的任务状态存储）
+job_service = JobService()
+
 # --- AI代理实例初始化 (优化改进) ---
 # 使用 @functools.lru_cache() 装饰器来缓存代理实例
 # 这样，每个代理只会在首次被调用时初始化一次，后续调用将直接返回缓存的实例，
@@ -77,6 +90,15 @@ class InterviewRequest(BaseModel):
     frame_interval: int = 8 # 视频帧抽取间隔（秒）
     job_type: str = 'python_engineer' # 面试岗位类型，用于定制文本分析提示词
     job_description: Optional[str] = None # 岗位描述，可选，可用于更精细的文本分析
+    use_cache: bool = True # 是否复用同一视频（内容哈希 + 参数相同）已有的抽帧、音频和转写结果
+    normalize: bool = False # 是否先把视频规范化为关键帧密集的 MP4 再抽帧（浏览器录制的 WebM 建议开启）
+
+class UploadInitRequest(BaseModel):
+    """分块上传初始化请求"""
+    filename: str # 原始文件名
+    size: int # 文件总字节数
+    ingest: Optional[bool] = None # 是否边上传边抽帧/提取音频，缺省时按扩展名判断（.webm 等可流式读取的容器）
+    frame_interval: int = 8 # 边上传边抽帧的间隔（秒），与之后 /process_interview/ 的参数一致才能复用结果
 
 class InitialConversationRequest(BaseModel):
     image_result: str
@@ -103,10 +125,16 @@ class ChatRequest(BaseModel):
 
 class GenerateQuestionsResponse(BaseModel):
     questions: List[str]
-    audio_paths: List[str]
+    audio_paths: List[Optional[str]]
 
 # --- API 路由定义 ---
 
+QUESTION_AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "question_audio")
+
+def _question_audio_url(path):
+    """question_audio 目录下的文件 -> /audio/questions/ 下的访问路径"""
+    return "/audio/questions/" + os.path.relpath(path, QUESTION_AUDIO_DIR).replace(os.sep, "/")
+
 @router.post("/generate_questions/")
 @router.post("/generate_questions", response_model=GenerateQuestionsResponse)
 async def generate_questions_endpoint(request: GenerateQuestionsRequest):
@@ -123,115 +151,200 @@ async def generate_questions_endpoint(request: GenerateQuestionsRequest):
         logging.info(f"生成的音频路径: {audio_paths}")
 
         # 将本地文件路径转换为可访问的URL路径
-        base_audio_url = "/audio/questions/"
-        # 假设question_audio_paths中的路径是绝对路径，我们需要将其转换为相对路径
-        # 例如：e:/比赛/挑战杯-ai面试/ai_interview/question_audio/question_0_hash.wav
-        # 转换为：/audio/questions/question_0_hash.wav
-        # 提取文件名部分
-        relative_audio_paths = [base_audio_url + os.path.basename(p) for p in audio_paths]
+        # 语音文件位于 question_audio/tts_cache/<哈希>/audio.wav，按相对 question_audio 的路径拼接：
+        # /audio/questions/tts_cache/<哈希>/audio.wav；合成失败的问题返回 null
+        relative_audio_paths = [_question_audio_url(p) if p else None for p in audio_paths]
 
         return JSONResponse(content={"questions": questions, "audio_paths": relative_audio_paths})
     except Exception as e:
         logging.error(f"生成问题失败: {e}", exc_info=True) # 添加 exc_info=True 打印详细堆栈信息
         raise HTTPException(status_code=500, detail=f"生成问题失败: {e}")
 
-@router.post("/process_interview/")
-async def process_interview_endpoint(request: InterviewRequest):
+@router.post("/generate_questions/stream")
+async def generate_questions_stream_endpoint(request: GenerateQuestionsRequest):
+    """
+    逐条返回面试问题（NDJSON，每行一个 JSON 对象）：自我介绍及其缓存的语音立即返回，
+    其余问题在智能体生成、语音合成完成后逐条返回（按完成顺序，index 为题号下标）。
+
+    行格式：
+        {"type": "question", "index": 0, "question": "...", "audio_path": "/audio/questions/..." 或 null}
+        {"type": "done", "count": 5}
+        {"type": "error", "detail": "..."}（生成过程中出错时的最后一行）
+    """
+    logging.info(f"Received job_type from frontend (stream): {request.job_type}")
+
+    def lines():
+        # 同步生成器：StreamingResponse 会在线程池中迭代，智能体调用和语音合成不阻塞事件循环
+        count = 0
+        try:
+            question_agent = InterviewQuestionAgent(api_key=STEPFUN_API_KEY, job_type=request.job_type)
+            for index, question, audio_path in question_agent.iter_questions():
+                count += 1
+                item = {
+                    "type": "question",
+                    "index": index,
+                    "question": question,
+                    "audio_path": _question_audio_url(audio_path) if audio_path else None,
+                }
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            yield json.dumps({"type": "done", "count": count}) + "\n"
+        except Exception as e:
+            logging.error(f"逐条生成问题失败: {e}", exc_info=True)
+            yield json.dumps({"type": "error", "detail": f"生成问题失败: {e}"}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _run_reported(report, stage, func, *args, **kwargs):
+    """执行一个分析阶段，并通过 report(stage, status, elapsed) 上报开始、完成或失败"""
+    if report is None:
+        return func(*args, **kwargs)
+    report(stage, "started")
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        report(stage, "failed", time.perf_counter() - start)
+        raise
+    report(stage, "finished", time.perf_counter() - start)
+    return result
+
+def _create_processor(request: InterviewRequest):
+    """创建视频处理器（未上传时记录哈希的视频需要先读一遍计算内容哈希，在线程池中调用）"""
+    return InterviewProcessor(
+        video_path=request.video_path,
+        appid=XF_APPID, # 讯飞开放平台 AppID
+        secret_key=XF_SECRET_KEY, # 讯飞开放平台 Secret Key
+        frame_interval=request.frame_interval, # 抽帧间隔
+        use_cache=request.use_cache, # 客户端超时重试同一视频时复用已有处理结果
+        video_digest=known_digest(request.video_path), # 上传时已算好的内容哈希，避免再读一遍视频
+        normalize=request.normalize # 上传后已在后台规范化时直接使用缓存的规范化文件
+    )
+
+async def run_interview_analysis(request: InterviewRequest, report=None):
     """
     处理上传的面试视频：进行视频抽帧、音频提取、语音转写，
     并调用各个AI代理进行初步的图像、语音和文本分析。
-    最后返回各项分析结果及处理后的文件路径。
+    供 /process_interview/ 和后台任务共用。
+
+    视频处理管线以协程方式运行：抽帧等阶段在线程池中执行，语音转写在事件循环中等待，
+    同一 worker 上的其他请求和其他面试的转写不会被阻塞。
+
+    Args:
+        request (InterviewRequest): 处理参数。
+        report (callable, optional): 阶段进度回调 report(stage, status, elapsed)。
+    Returns:
+        dict: 各项分析结果及处理后的文件路径。
     """
+    # --- 1. 视频处理 ---
+    print("--- [步骤 1/3] 开始处理面试视频 ---")
+    processor = await run_in_threadpool(_create_processor, request)
+    await processor.run_pipeline_async(on_event=report) # 执行视频处理管线（抽帧、提取音频、语音转写）
+    # 后续分析包含阻塞的大模型调用和模型推理，放到线程池中执行
+    return await run_in_threadpool(_analyze_processed, request, processor, report)
+
+def _analyze_processed(request: InterviewRequest, processor: InterviewProcessor, report=None):
+    """读取处理结果，调用各AI代理进行多维度评估（同步执行）"""
+    # 获取缓存的AI代理实例
+    image_agent = get_image_analysis_agent()
+    speech_agent = get_speech_analysis_agent()
+    # 根据请求中的 job_type 获取文本分析代理
+    text_agent = get_text_content_agent(request.job_type)
+    # 获取综合评估代理实例，用于辅助模型预测
+    evaluator = get_integrated_evaluator()
+
+    # --- 2. 加载处理后的数据 ---
+    print("\n--- [步骤 2/3] 加载处理后的数据用于分析 ---")
+    # 读取语音转写文本内容
     try:
-        # 获取缓存的AI代理实例
-        image_agent = get_image_analysis_agent()
-        speech_agent = get_speech_analysis_agent()
-        # 根据请求中的 job_type 获取文本分析代理
-        text_agent = get_text_content_agent(request.job_type)
-        # 获取综合评估代理实例，用于辅助模型预测
-        evaluator = get_integrated_evaluator()
-
-        # --- 1. 视频处理 ---
-        print("--- [步骤 1/3] 开始处理面试视频 ---")
-        processor = InterviewProcessor(
-            video_path=request.video_path,
-            appid=XF_APPID, # 讯飞开放平台 AppID
-            secret_key=XF_SECRET_KEY, # 讯飞开放平台 Secret Key
-            frame_interval=request.frame_interval # 抽帧间隔
+        with open(processor.text_output_path, 'r', encoding='utf-8') as f:
+            transcript = f.read()
+        print(f"成功加载语音转写文本，共 {len(transcript)} 字。")
+    except FileNotFoundError:
+        print(f"错误：找不到转写文件 {processor.text_output_path}")
+        transcript = "" # 如果文件不存在，则文本为空
+
+    # 抽取的帧已作为内存数组保存在 processor.frames（按时间排序），无需再从磁盘解码；
+    # 本地打分后为各消费者挑选信息量最高的帧
+    frames = processor.frames
+    if frames is None or len(frames) == 0:
+        print(f"错误：没有抽取到任何帧图像（{processor.frames_output_dir}）。")
+        image_frames, model_frames = [], []
+        image_frame_paths, selected_frame_paths = [], []
+    else:
+        # 清晰度、人脸/睁眼检测和直方图多样性，替代随机采样
+        selection = select_for_consumers(frames, FRAME_SELECTION_CONFIG["budgets"])
+        image_frames = [frames[i] for i in selection["image_analysis"]]
+        model_frames = [frames[i] for i in selection["model_inference"]]
+        # 帧文件由 run_pipeline 写入，路径返回给客户端供报告阶段使用
+        image_frame_paths = [processor.frame_path(processor.frame_timestamps[i]) for i in selection["image_analysis"]]
+        selected_frame_paths = [processor.frame_path(processor.frame_timestamps[i]) for i in selection["model_inference"]]
+        print(f"从 {len(frames)} 帧中为图像分析选择：{image_frame_paths}")
+        print(f"从 {len(frames)} 帧中为辅助模型选择：{selected_frame_paths}")
+
+    # --- 3. 运行AI智能体进行多维度评估 ---
+    print("\n--- [步骤 3/3] 开始进行多维度AI评估 ---")
+
+    # a. 图像分析（表情、姿势、眼神交流）
+    if image_frames:
+        image_timestamps = [processor.frame_timestamps[i] for i in selection["image_analysis"]]
+        image_result = _run_reported(report, "image_analysis", image_agent.analyze, image_frames, timestamps=image_timestamps)
+        print("\n[图像分析结果]:\n", image_result)
+    else:
+        image_result = "无法进行图像分析，因为没有找到帧图像。"
+        print("\n[图像分析结果]:\n", image_result)
+
+    # b. 语音分析（语速、流畅度、情绪）
+    speech_result = _run_reported(report, "speech_analysis", speech_agent.analyze, transcript)
+    print("\n[语音分析结果]:\n", speech_result)
+
+    # c. 文本内容分析（专业能力、逻辑性、切题性）
+    job_description_py = request.job_description if request.job_description else ""
+    # 这里的 'question' 是一个示例问题。在实际多轮面试中，这个问题可能来自LLM或预设。
+    # 目前用于驱动 TextContentAgent 的分析。
+    question = "请根据你的项目经验，谈谈你对Python Web开发、数据库使用以及性能优化方面的理解。"
+    # TextContentAgent 会根据其 job_type 内部选择合适的提示词进行分析
+    text_result = _run_reported(report, "text_analysis", text_agent.analyze, question, transcript, job_description_py)
+    print(f"\n[文本内容评估结果]:\n{text_result}")
+
+    # d. 获取辅助模型的预测结果
+    # 只有当所有必要的输入都存在时才进行预测
+    if model_frames and processor.audio_output_path and processor.text_output_path:
+        model_predictions = _run_reported(
+            report, "model_inference", evaluator.decision_model.predict,
+            frame_paths=model_frames, # 直接传入内存中的帧数组
+            audio_path=processor.speech_audio_path, # 开启 VAD 时为压缩静音后的音频，序列更短
+            text_content_path=processor.text_output_path
         )
-        processor.run_pipeline() # 执行视频处理管线（抽帧、提取音频、语音转写）
+        print(f"\n[辅助模型预测结果]:\n{model_predictions}")
+    else:
+        model_predictions = {}
+        print("\n[辅助模型预测结果]: 缺少必要输入，跳过预测。")
+
+    # 将所有初步分析结果、处理后的文件路径和辅助模型预测结果返回给客户端。
+    # 客户端随后会使用这些数据来调用 /start_conversation/ 以启动综合评估和多轮对话。
+    return {
+        "image_result": image_result,
+        "speech_result": speech_result,
+        "text_result": text_result,
+        "transcript": transcript, # 原始语音转写文本（内容）
+        "selected_frame_paths": selected_frame_paths, # 供辅助模型使用的帧图像路径列表
+        "image_frame_paths": image_frame_paths, # 供图像分析使用的帧图像路径列表
+        "audio_output_path": processor.audio_output_path, # 供辅助模型使用的音频文件路径
+        "text_output_path": processor.text_output_path, # 供辅助模型使用的转写文本文件路径
+        "segments_output_path": processor.segments_output_path if os.path.exists(processor.segments_output_path) else None, # 逐句/逐词时间索引（npz）
+        "model_predictions": model_predictions # 添加辅助模型的预测结果
+    }
 
-        # --- 2. 加载处理后的数据 ---
-        print("\n--- [步骤 2/3] 加载处理后的数据用于分析 ---")
-        # 读取语音转写文本内容
-        try:
-            with open(processor.text_output_path, 'r', encoding='utf-8') as f:
-                transcript = f.read()
-            print(f"成功加载语音转写文本，共 {len(transcript)} 字。")
-        except FileNotFoundError:
-            print(f"错误：找不到转写文件 {processor.text_output_path}")
-            transcript = "" # 如果文件不存在，则文本为空
-
-        # 获取抽取的帧图像文件路径，并随机选择最多5张用于分析
-        frame_files = os.listdir(processor.frames_output_dir)
-        if not frame_files:
-            print(f"错误：在 {processor.frames_output_dir} 中找不到任何帧图像。")
-            selected_frame_paths = []
-        else:
-            num_images_to_select = min(5, len(frame_files)) # 最多选择5张
-            selected_frames = random.sample(frame_files, num_images_to_select) # 随机采样
-            selected_frame_paths = [os.path.join(processor.frames_output_dir, f) for f in selected_frames]
-            print(f"随机选择 {num_images_to_select} 张帧图像进行分析：{selected_frame_paths}")
-
-        # --- 3. 运行AI智能体进行多维度评估 ---
-        print("\n--- [步骤 3/3] 开始进行多维度AI评估 ---")
-
-        # a. 图像分析（表情、姿势、眼神交流）
-        if selected_frame_paths:
-            image_result = image_agent.analyze(selected_frame_paths)
-            print("\n[图像分析结果]:\n", image_result)
-        else:
-            image_result = "无法进行图像分析，因为没有找到帧图像。"
-            print("\n[图像分析结果]:\n", image_result)
-
-        # b. 语音分析（语速、流畅度、情绪）
-        speech_result = speech_agent.analyze(transcript)
-        print("\n[语音分析结果]:\n", speech_result)
-
-        # c. 文本内容分析（专业能力、逻辑性、切题性）
-        job_description_py = request.job_description if request.job_description else ""
-        # 这里的 'question' 是一个示例问题。在实际多轮面试中，这个问题可能来自LLM或预设。
-        # 目前用于驱动 TextContentAgent 的分析。
-        question = "请根据你的项目经验，谈谈你对Python Web开发、数据库使用以及性能优化方面的理解。"
-        # TextContentAgent 会根据其 job_type 内部选择合适的提示词进行分析
-        text_result = text_agent.analyze(question, transcript, job_description_py)
-        print(f"\n[文本内容评估结果]:\n{text_result}")
-
-        # d. 获取辅助模型的预测结果
-        # 只有当所有必要的输入都存在时才进行预测
-        if selected_frame_paths and processor.audio_output_path and processor.text_output_path:
-            model_predictions = evaluator.decision_model.predict(
-                frame_paths=selected_frame_paths,
-                audio_path=processor.audio_output_path,
-                text_content_path=processor.text_output_path
-            )
-            print(f"\n[辅助模型预测结果]:\n{model_predictions}")
-        else:
-            model_predictions = {}
-            print("\n[辅助模型预测结果]: 缺少必要输入，跳过预测。")
-
-        # 将所有初步分析结果、处理后的文件路径和辅助模型预测结果返回给客户端。
-        # 客户端随后会使用这些数据来调用 /start_conversation/ 以启动综合评估和多轮对话。
-        return JSONResponse(content={
-            "image_result": image_result,
-            "speech_result": speech_result,
-            "text_result": text_result,
-            "transcript": transcript, # 原始语音转写文本（内容）
-            "selected_frame_paths": selected_frame_paths, # 供辅助模型使用的帧图像路径列表
-            "audio_output_path": processor.audio_output_path, # 供辅助模型使用的音频文件路径
-            "text_output_path": processor.text_output_path, # 供辅助模型使用的转写文本文件路径
-            "model_predictions": model_predictions # 添加辅助模型的预测结果
-        })
+@router.post("/process_interview/")
+async def process_interview_endpoint(request: InterviewRequest):
+    """
+    同步处理面试视频，处理完成后返回各项分析结果及处理后的文件路径。
+    长视频请使用 /interview_jobs/ 提交后台任务，避免请求超时。
+    """
+    try:
+        result = await run_interview_analysis(request)
+        return JSONResponse(content=result)
     except Exception as e:
         # 打印完整的错误栈，有助于调试
         import traceback
@@ -239,24 +352,82 @@ async def process_interview_endpoint(request: InterviewRequest):
         # 抛出HTTP异常，返回500状态码和错误信息
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _interview_job(report, request: InterviewRequest):
+    """JobService 以 func(report, *args) 调用任务函数，这里转换为 run_interview_analysis 的参数顺序"""
+    return await run_interview_analysis(request, report)
+
+@router.post("/interview_jobs/")
+async def submit_interview_job_endpoint(request: InterviewRequest):
+    """
+    提交后台面试分析任务，立即返回 job_id。
+    通过 GET /interview_jobs/{job_id} 轮询，或 GET /interview_jobs/{job_id}/events 订阅 SSE 获取阶段进度和最终结果。
+    """
+    job_id = await run_in_threadpool(job_service.submit, "process_interview", _interview_job, request)
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status_url": f"/interview_jobs/{job_id}",
+        "events_url": f"/interview_jobs/{job_id}/events"
+    })
+
+@router.get("/interview_jobs/{job_id}")
+async def get_interview_job_endpoint(job_id: str, since: int = 0):
+    """查询任务状态；since 为已收到的最后一个事件序号，只返回其后的进度事件"""
+    job = await run_in_threadpool(job_service.get_job, job_id)
+    events = await run_in_threadpool(job_service.get_events, job_id, since)
+    return JSONResponse(content={**job, "events": events})
+
+@router.get("/interview_jobs/{job_id}/events")
+async def interview_job_events_endpoint(job_id: str, last_event_id: Optional[int] = Header(None)):
+    """以 Server-Sent Events 推送任务的阶段进度，任务结束时推送 result 事件"""
+    await run_in_threadpool(job_service.get_job, job_id)
+    return StreamingResponse(
+        job_service.stream_events(job_id, last_event_id or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _normalize_in_background(file_location):
+    """上传完成后预先规范化视频，结果缓存在原文件旁，处理请求开启 normalize 时直接使用"""
+    try:
+        normalize_video(file_location)
+    except Exception as e:
+        logging.warning(f"上传后预先规范化视频失败: {e}")
+
+def _copy_upload(source, file_location, chunk_size):
+    """在线程池中执行：把上传的临时文件拷贝到目标位置，同时计算 sha256"""
+    hasher = hashlib.sha256()
+    with open(file_location, "wb") as buffer:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            buffer.write(chunk)
+    digest = hasher.hexdigest()
+    atomic_write_text(digest_sidecar_path(file_location), digest)
+    return digest
+
 @router.post("/upload_video/")
-async def upload_video_endpoint(file: UploadFile = File(...)):
+async def upload_video_endpoint(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     接收客户端上传的视频文件，并将其保存到指定目录。
     返回保存后的文件路径。
+    大文件请使用 /upload_video/init 开始的分块上传接口，可断点续传。
     """
     try:
         # 生成一个唯一的文件名，防止文件覆盖冲突
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        unique_filename = f"{timestamp}_{file.filename}"
+        unique_filename = f"{timestamp}_{os.path.basename(file.filename)}"
         file_location = os.path.join(UPLOAD_DIR, unique_filename)
 
-        # 将上传的文件内容写入到本地文件
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer) # 使用 shutil.copyfileobj 进行高效文件拷贝
+        # 拷贝和哈希放到线程池里执行，不阻塞事件循环
+        digest = await run_in_threadpool(_copy_upload, file.file, file_location, UPLOAD_CONFIG["write_buffer_bytes"])
+        if NORMALIZE_CONFIG["after_upload"]:
+            background_tasks.add_task(_normalize_in_background, file_location)
         return JSONResponse(content={
             "message": f"文件 '{file.filename}' 上传成功",
-            "file_path": file_location # 返回保存的文件路径
+            "file_path": file_location, # 返回保存的文件路径
+            "sha256": digest
         })
     except Exception as e:
         import traceback
@@ -264,6 +435,56 @@ async def upload_video_endpoint(file: UploadFile = File(...)):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"文件上传失败: {str(e)}")
 
+@router.post("/upload_video/init")
+async def upload_video_init_endpoint(request: UploadInitRequest):
+    """
+    开始一次分块上传，返回 upload_id 和建议的分块大小。
+    之后按顺序 PUT /upload_video/{upload_id}（Content-Range: bytes start-end/size），
+    最后 POST /upload_video/{upload_id}/finalize 得到服务器端文件路径。
+    """
+    # 清理过期会话和启动 ffmpeg 都是阻塞操作，放到线程池里执行
+    return JSONResponse(content=await run_in_threadpool(
+        upload_service.init_upload,
+        request.filename, request.size, ingest=request.ingest, frame_interval=request.frame_interval
+    ))
+
+@router.get("/upload_video/{upload_id}")
+async def upload_video_status_endpoint(upload_id: str):
+    """查询上传进度；断线后客户端从返回的 received 处继续上传"""
+    return JSONResponse(content=await run_in_threadpool(upload_service.get_status, upload_id))
+
+@router.put("/upload_video/{upload_id}")
+async def upload_video_chunk_endpoint(upload_id: str, request: Request, content_range: Optional[str] = Header(None)):
+    """
+    上传一个分块，请求体为原始字节。
+    Content-Range 的起始位置必须等于已接收的字节数，否则返回 409 和当前的 received；
+    请求体长度与区间不符或总大小与 init 时的 size 不符时返回 416。
+    """
+    match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", (content_range or "").strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="缺少或无法解析 Content-Range 请求头，格式为 bytes start-end/size")
+    start, end = int(match.group(1)), int(match.group(2))
+    total = None if match.group(3) == "*" else int(match.group(3))
+    return JSONResponse(content=await upload_service.write_chunk(
+        upload_id, start, request.stream(), end=end, total=total))
+
+@router.post("/upload_video/{upload_id}/finalize")
+async def upload_video_finalize_endpoint(upload_id: str, background_tasks: BackgroundTasks):
+    """
+    所有分块到齐后完成上传，返回服务器端文件路径和内容 sha256。
+    ingested 列出上传过程中已完成的处理产物（frames / audio），处理请求会直接复用。
+    """
+    result = await upload_service.finalize(upload_id)
+    if NORMALIZE_CONFIG["after_upload"]:
+        background_tasks.add_task(_normalize_in_background, result["file_path"])
+    return JSONResponse(content={
+        "message": f"文件 '{result['session']['filename']}' 上传成功",
+        "file_path": result["file_path"],
+        "sha256": result["sha256"],
+        "size": result["size"],
+        "ingested": result["ingested"]
+    })
+
 @router.post("/start_conversation/")
 async def start_conversation_endpoint(
     request: InitialConversationRequest,
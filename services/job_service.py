@@ -0,0 +1,325 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from config.pipeline_config import JOB_CONFIG
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class InMemoryJobStore:
+    """
+    进程内的任务存储：任务状态和进度事件保存在字典里，重启后丢失。
+    适合单进程部署；多 worker 部署请使用 SQLiteJobStore。
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, kind):
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": JOB_QUEUED,
+                "stage": None,
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            self._events[job_id] = []
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields, updated_at=time.time())
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def touch(self, job_ids):
+        """心跳：刷新一组任务的 updated_at"""
+        now = time.time()
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job["updated_at"] = now
+
+    def add_event(self, job_id, event):
+        """追加一条进度事件，返回事件序号（从 1 开始）"""
+        with self._lock:
+            events = self._events.setdefault(job_id, [])
+            events.append(dict(event, seq=len(events) + 1))
+            return len(events)
+
+    def events_since(self, job_id, seq):
+        with self._lock:
+            return list(self._events.get(job_id, [])[seq:])
+
+    def count_active(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] not in FINISHED_STATUSES)
+
+    def fail_unfinished(self, error, before):
+        """进程内存储随进程一起消失，没有遗留任务"""
+
+    def purge(self, before):
+        """删除 updated_at 早于 before 的已结束任务"""
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job["status"] in FINISHED_STATUSES and job["updated_at"] < before]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+                self._events.pop(job_id, None)
+
+
+class SQLiteJobStore:
+    """
+    基于 SQLite 的任务存储：多个 worker 进程共享同一个数据库文件，
+    任意进程都能查询任务进度，服务重启后已完成任务的结果仍可获取。
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, kind TEXT, status TEXT, stage TEXT, "
+                "result TEXT, error TEXT, created_at REAL, updated_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "job_id TEXT, seq INTEGER, data TEXT, PRIMARY KEY (job_id, seq))"
+            )
+
+    def create(self, job_id, kind):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, JOB_QUEUED, now, now),
+            )
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def touch(self, job_ids):
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET updated_at = ? WHERE job_id IN ({placeholders})",
+                               (time.time(), *job_ids))
+
+    def add_event(self, job_id, event):
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, seq, data) VALUES (?, ?, ?)",
+                (job_id, seq, json.dumps(dict(event, seq=seq), ensure_ascii=False)),
+            )
+        return seq
+
+    def events_since(self, job_id, seq):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, seq)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def count_active(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()[0]
+
+    def fail_unfinished(self, error, before):
+        """
+        把 before 之前就不再更新的排队/执行中任务标记为失败（通常是进程退出时遗留的），
+        避免客户端无限等待。存活的 worker 会定期为自己的任务刷新 updated_at（见 JobService 心跳），
+        即使单个阶段执行很久，其他 worker 启动时也不会把这些任务误判为已中断。
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?) AND updated_at < ?",
+                (JOB_FAILED, error, time.time(), JOB_QUEUED, JOB_RUNNING, before),
+            )
+
+    def purge(self, before):
+        with self._lock, self._conn:
+            expired = "SELECT job_id FROM jobs WHERE status IN (?, ?) AND updated_at < ?"
+            params = (JOB_SUCCEEDED, JOB_FAILED, before)
+            self._conn.execute(f"DELETE FROM job_events WHERE job_id IN ({expired})", params)
+            self._conn.execute(f"DELETE FROM jobs WHERE job_id IN ({expired})", params)
+
+
+def make_job_store(config=None):
+    """按配置创建任务存储"""
+    config = config or JOB_CONFIG
+    if config["backend"] == "sqlite":
+        return SQLiteJobStore(config["sqlite_path"])
+    if config["backend"] == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"未知的任务存储类型: {config['backend']}")
+
+
+class JobService:
+    """
+    后台任务执行器：提交后立即返回 job_id，任务在有界线程池中执行。
+
+    任务函数的签名为 func(report, *args)，其中 report(stage, status, elapsed=None, **extra)
+    用于上报阶段进度；返回值（需可 JSON 序列化）作为任务结果保存。
+    func 也可以是协程函数，此时在工作线程中用独立的事件循环执行。
+
+    本进程提交、尚未结束的任务由心跳线程每 heartbeat_seconds 刷新一次 updated_at，
+    启动时只有超过 stale_job_seconds 没有心跳的任务（所在进程已退出）才会被标记为失败。
+    """
+
+    def __init__(self, store=None, config=None):
+        self.config = config or JOB_CONFIG
+        self.store = store or make_job_store(self.config)
+        self.store.fail_unfinished("任务长时间没有进展，可能因服务重启而中断，请重新提交",
+                                   time.time() - self.config["stale_job_seconds"])
+        self._executor = ThreadPoolExecutor(max_workers=self.config["max_workers"], thread_name_prefix="interview-job")
+        self._active = set()  # 本进程提交、尚未结束的任务
+        self._active_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="interview-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.config["heartbeat_seconds"]):
+            with self._active_lock:
+                job_ids = list(self._active)
+            try:
+                self.store.touch(job_ids)
+            except Exception as e:
+                logging.warning(f"刷新任务心跳失败: {e}")
+
+    def submit(self, kind, func, *args):
+        """提交任务，返回 job_id；排队的任务过多时返回 429"""
+        self.store.purge(time.time() - self.config["job_ttl_seconds"])
+        if self.store.count_active() >= self.config["max_pending"]:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="排队的任务过多，请稍后再试")
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, kind)
+        self.store.add_event(job_id, {"type": "status", "status": JOB_QUEUED})
+        with self._active_lock:
+            self._active.add(job_id)
+        self._executor.submit(self._run, job_id, func, args)
+        return job_id
+
+    def _run(self, job_id, func, args):
+        try:
+            self._execute(job_id, func, args)
+        finally:
+            with self._active_lock:
+                self._active.discard(job_id)
+
+    def _execute(self, job_id, func, args):
+        self.store.update(job_id, status=JOB_RUNNING)
+        self.store.add_event(job_id, {"type": "status", "status": JOB_RUNNING})
+
+        def report(stage, stage_status, elapsed=None, **extra):
+            self.store.add_event(job_id, {"type": "stage", "stage": stage, "status": stage_status,
+                                          "elapsed": elapsed, **extra})
+            if stage_status == "started":
+                self.store.update(job_id, stage=stage)
+
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = asyncio.run(func(report, *args))
+            else:
+                result = func(report, *args)
+        except Exception as e:
+            logging.error(f"任务 {job_id} 执行失败: {e}", exc_info=True)
+            error = getattr(e, "detail", None) or str(e)
+            self.store.update(job_id, status=JOB_FAILED, error=str(error))
+            self.store.add_event(job_id, {"type": "status", "status": JOB_FAILED, "error": str(error)})
+            return
+        self.store.update(job_id, status=JOB_SUCCEEDED, result=result, stage=None)
+        self.store.add_event(job_id, {"type": "status", "status": JOB_SUCCEEDED})
+
+    def get_job(self, job_id):
+        job = self.store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="任务不存在或已过期")
+        return job
+
+    def get_events(self, job_id, since=0):
+        self.get_job(job_id)
+        return self.store.events_since(job_id, since)
+
+    async def stream_events(self, job_id, last_event_id=0):
+        """
+        以 Server-Sent Events 格式逐条推送任务事件，任务结束后推送最终结果并关闭。
+        last_event_id 对应浏览器断线重连时携带的 Last-Event-ID，从该序号之后继续推送。
+        """
+        self.get_job(job_id)
+        seq = last_event_id
+        idle = 0.0
+        while True:
+            events = await asyncio.to_thread(self.store.events_since, job_id, seq)
+            for event in events:
+                seq = event["seq"]
+                yield f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if events:
+                idle = 0.0
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job is None:
+                return
+            if job["status"] in FINISHED_STATUSES and not events:
+                payload = {"status": job["status"], "result": job["result"], "error": job["error"]}
+                yield f"event: result\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                return
+            await asyncio.sleep(self.config["sse_poll_seconds"])
+            idle += self.config["sse_poll_seconds"]
+            if idle >= self.config["sse_keepalive_seconds"]:
+                idle = 0.0
+                yield ": keepalive\n\n"
+
+    def shutdown(self):
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,360 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from config.pipeline_config import UPLOAD_CONFIG
+from utils.cache_utils import HASH_CHUNK_SIZE, atomic_write_json, atomic_write_text
+from utils.stream_ingest import StreamingIngestor
+from utils.Video_processing import InterviewProcessor
+
+
+def digest_sidecar_path(file_path):
+    """服务端在上传时算好的 sha256 保存在同名 .sha256 文件中"""
+    return file_path + ".sha256"
+
+
+def known_digest(file_path):
+    """
+    读取上传阶段记录的视频 sha256；文件在记录之后被改动过或没有记录时返回 None。
+    只信任服务端自己写的记录，不接受客户端传入的哈希。
+    """
+    sidecar = digest_sidecar_path(file_path)
+    try:
+        if os.path.getmtime(sidecar) < os.path.getmtime(file_path):
+            return None
+        with open(sidecar, "r", encoding="utf-8") as f:
+            digest = f.read().strip()
+        return digest if len(digest) == 64 else None
+    except (FileNotFoundError, OSError):
+        return None
+
+
+class UploadService:
+    """
+    可续传的分块上传：init 创建会话 → 按顺序 PUT 字节区间 → finalize 得到服务器端路径。
+
+    未完成的数据写在 upload_dir/.partial/<upload_id>.part，会话元数据保存在同名 .json，
+    因此服务重启或由另一个 worker 接手后仍可续传。内容哈希随分块增量计算，
+    进程内没有对应的哈希状态时（例如重启后续传）会先对已接收的前缀补算一次。
+
+    可流式读取的容器（WebM 等）还会边上传边抽帧、提取音频（见 StreamingIngestor），
+    finalize 时把结果放入该视频的内容寻址任务目录，随后的 /process_interview/ 直接复用。
+    StreamingIngestor 只存在于创建会话的进程内，不能由其他 worker 或重启后的进程接手：
+    只有全部字节都按顺序经过同一个 ingestor 时才采用其结果，否则丢弃，处理时照常读取完整文件。
+    """
+
+    def __init__(self, config=None):
+        self.config = config or UPLOAD_CONFIG
+        self.upload_dir = self.config["upload_dir"]
+        self.partial_dir = os.path.join(self.upload_dir, ".partial")
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self._hashers = {}  # upload_id -> (hasher, 已哈希字节数)
+        self._ingestors = {}  # upload_id -> StreamingIngestor
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    # --- 会话元数据 ---
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.partial_dir, f"{upload_id}.json")
+
+    def _part_path(self, upload_id):
+        return os.path.join(self.partial_dir, f"{upload_id}.part")
+
+    def _ingest_dir(self, upload_id):
+        return os.path.join(self.partial_dir, f"{upload_id}.ingest")
+
+    def _load_session(self, upload_id):
+        if not upload_id.isalnum():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="上传会话不存在")
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="上传会话不存在或已过期")
+
+    def _received(self, upload_id):
+        try:
+            return os.path.getsize(self._part_path(upload_id))
+        except FileNotFoundError:
+            return 0
+
+    def _session_lock(self, upload_id):
+        with self._registry_lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    async def _acquire_session_lock(self, upload_id):
+        """同一会话的分块写入和 finalize 串行执行；锁放在线程池里获取，不阻塞事件循环"""
+        lock = self._session_lock(upload_id)
+        acquired = await run_in_threadpool(lock.acquire, True, 30)
+        if not acquired:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="该上传会话正在写入其他分块")
+        return lock
+
+    def cleanup_expired(self):
+        """删除超过 session_ttl_seconds 仍未完成的上传会话"""
+        cutoff = time.time() - self.config["session_ttl_seconds"]
+        for name in os.listdir(self.partial_dir):
+            path = os.path.join(self.partial_dir, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                upload_id = name.split(".", 1)[0]
+                ingestor = self._ingestors.pop(upload_id, None)
+                if ingestor is not None:
+                    ingestor.abort()
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _wants_ingest(self, filename, ingest):
+        """ingest 为 None 时按扩展名判断容器是否可流式读取"""
+        if ingest is not None:
+            return ingest
+        return os.path.splitext(filename)[1].lower() in self.config["stream_ingest_extensions"]
+
+    # --- 上传流程 ---
+
+    def init_upload(self, filename, size, ingest=None, frame_interval=8, **extra):
+        """
+        创建上传会话，size 为文件总字节数；extra 中的字段原样保存在会话元数据中。
+
+        Args:
+            ingest (bool, optional): 是否边上传边抽帧和提取音频，缺省时按扩展名判断。
+            frame_interval (int): 边上传边抽帧时的间隔（秒），应与之后 /process_interview/ 的参数一致才能复用。
+        """
+        if size <= 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="文件大小必须大于 0")
+        if size > self.config["max_file_bytes"]:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"文件超过大小上限 {self.config['max_file_bytes']} 字节",
+            )
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        # 只保留文件名部分，防止路径穿越
+        filename = os.path.basename(filename) or "video"
+        ingest = self._wants_ingest(filename, ingest)
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "created_at": time.time(),
+            "ingest": ingest,
+            "frame_interval": frame_interval,
+            **extra,
+        }
+        atomic_write_json(self._meta_path(upload_id), session)
+        open(self._part_path(upload_id), "wb").close()
+        if ingest:
+            try:
+                self._ingestors[upload_id] = StreamingIngestor(self._ingest_dir(upload_id), frame_interval)
+            except OSError as e:
+                logging.warning(f"无法启动边上传边处理，改为上传完成后再处理: {e}")
+        return {"upload_id": upload_id, "received": 0, "size": size, "chunk_size": self.config["chunk_bytes"],
+                "ingest": upload_id in self._ingestors}
+
+    def get_status(self, upload_id):
+        session = self._load_session(upload_id)
+        status_info = {"upload_id": upload_id, "received": self._received(upload_id), "size": session["size"]}
+        ingestor = self._ingestors.get(upload_id)
+        if ingestor is not None:
+            status_info["frames_ready"] = ingestor.frames_ready()
+        return status_info
+
+    def _hasher_at(self, upload_id, offset):
+        """取得已哈希到 offset 的增量哈希器；进程内没有时从磁盘上的前缀补算"""
+        hasher, hashed = self._hashers.get(upload_id, (None, -1))
+        if hashed != offset:
+            hasher = hashlib.sha256()
+            with open(self._part_path(upload_id), "rb") as f:
+                remaining = offset
+                while remaining > 0:
+                    chunk = f.read(min(HASH_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    remaining -= len(chunk)
+        return hasher
+
+    def _append(self, upload_id, offset, data):
+        """在线程池中执行：追加写入并更新哈希"""
+        hasher = self._hasher_at(upload_id, offset)
+        with open(self._part_path(upload_id), "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+        hasher.update(data)
+        self._hashers[upload_id] = (hasher, offset + len(data))
+        return offset + len(data)
+
+    def _truncate(self, upload_id, offset):
+        """撤回 offset 之后写入的数据。增量哈希按已哈希字节数自动重算；
+        已送入 ingestor 的数据使其 bytes_fed 超过 received，下一个分块会丢弃该 ingestor"""
+        with open(self._part_path(upload_id), "r+b") as f:
+            f.truncate(offset)
+
+    async def write_chunk(self, upload_id, start, stream, on_data=None, end=None, total=None):
+        """
+        写入从 start 开始的一段字节。start 必须等于已接收的字节数（按顺序上传），
+        否则返回 409，客户端据 get_status 的 received 续传。
+        给出 end（含）时请求体长度必须恰好为 end - start + 1，给出 total 时必须等于会话的 size，
+        不一致返回 416；长度不符的分块不会保留在已接收的数据中。
+
+        Args:
+            stream: 异步字节迭代器（request.stream()）。
+            on_data (callable, optional): 每段数据写盘后回调 on_data(bytes)；
+                                          缺省时交给该会话的 StreamingIngestor（如果有）。
+        """
+        session = await run_in_threadpool(self._load_session, upload_id)
+        if total is not None and total != session["size"]:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail={"message": "Content-Range 中的总大小与会话的 size 不一致", "size": session["size"]},
+            )
+        if end is not None and end < start:
+            raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                                detail="Content-Range 的结束位置小于起始位置")
+        if end is not None and end >= session["size"]:
+            # 读取请求体之前就拒绝，客户端得到区间错误而不是写到一半的 413
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail={"message": "Content-Range 的结束位置超出文件大小", "size": session["size"]},
+            )
+        expected = end - start + 1 if end is not None else None
+        ingestor = self._ingestors.get(upload_id) if on_data is None else None
+        lock = await self._acquire_session_lock(upload_id)
+        try:
+            # 等锁期间会话可能已被 finalize，重新读取一次（不存在时返回 404）
+            await run_in_threadpool(self._load_session, upload_id)
+            received = await run_in_threadpool(self._received, upload_id)
+            if start != received:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail={"message": "分块起始位置与已接收字节数不一致", "received": received},
+                )
+            if ingestor is not None:
+                if ingestor.bytes_fed == received:
+                    on_data = ingestor.feed
+                else:
+                    # 之前的分块没有经过本进程的 ingestor（其他 worker 处理、重启后续传等），
+                    # 它看到的是不连续的字节流，结果不可用
+                    logging.info(f"上传 {upload_id} 的分块不连续（已送入 {ingestor.bytes_fed}，已接收 {received}），停止边上传边处理")
+                    await run_in_threadpool(self._discard_ingestor, upload_id)
+            offset = received
+            written = 0
+            buffer = bytearray()
+            async for piece in stream:
+                written += len(piece)
+                if expected is not None and written > expected:
+                    await run_in_threadpool(self._truncate, upload_id, received)
+                    raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                                        detail="请求体长度超过 Content-Range 声明的区间")
+                if written > self.config["max_chunk_bytes"] or offset + len(buffer) + len(piece) > session["size"]:
+                    # 本分块已写入的部分同样撤回，received 不会停在分块中间
+                    await run_in_threadpool(self._truncate, upload_id, received)
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="分块超出允许的大小")
+                buffer.extend(piece)
+                if len(buffer) >= self.config["write_buffer_bytes"]:
+                    data = bytes(buffer)
+                    buffer.clear()
+                    offset = await run_in_threadpool(self._append, upload_id, offset, data)
+                    if on_data is not None:
+                        await run_in_threadpool(on_data, data)
+            if expected is not None and written != expected:
+                # 已写入的部分撤回到分块起点，客户端重新发送整个分块
+                await run_in_threadpool(self._truncate, upload_id, received)
+                raise HTTPException(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    detail={"message": "请求体长度与 Content-Range 声明的区间不一致", "received": received},
+                )
+            if buffer:
+                data = bytes(buffer)
+                offset = await run_in_threadpool(self._append, upload_id, offset, data)
+                if on_data is not None:
+                    await run_in_threadpool(on_data, data)
+            return {"upload_id": upload_id, "received": offset, "size": session["size"]}
+        finally:
+            lock.release()
+
+    async def finalize(self, upload_id):
+        """
+        所有字节到齐后把文件移动到 upload_dir，返回服务器端路径和内容 sha256。
+        与 write_chunk 持有同一把会话锁，仍在写入的分块不会与移动 .part 文件交错。
+        """
+        await run_in_threadpool(self._load_session, upload_id)
+        lock = await self._acquire_session_lock(upload_id)
+        try:
+            session, received, file_location, digest = await run_in_threadpool(self._complete, upload_id)
+            ingestor = self._ingestors.get(upload_id)
+            if ingestor is not None and ingestor.bytes_fed != received:
+                # ffmpeg 只看到了被截断或有缺口的字节流，不能以完整文件的哈希缓存其结果
+                logging.info(f"上传 {upload_id} 只有 {ingestor.bytes_fed}/{received} 字节经过边上传边处理，丢弃其结果")
+                await run_in_threadpool(self._discard_ingestor, upload_id)
+            ingestor = self._ingestors.pop(upload_id, None)
+            with self._registry_lock:
+                self._locks.pop(upload_id, None)
+        finally:
+            lock.release()
+
+        ingested = []
+        if ingestor is not None:
+            ingested = await run_in_threadpool(self._adopt_ingested, ingestor, file_location, digest, session)
+        return {"file_path": file_location, "sha256": digest, "size": received, "session": session,
+                "ingested": ingested}
+
+    def _complete(self, upload_id):
+        """在线程池中执行（持有会话锁）：校验已接收完整，把 .part 移到 upload_dir 并删除会话元数据"""
+        session = self._load_session(upload_id)
+        received = self._received(upload_id)
+        if received != session["size"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "文件尚未上传完整", "received": received, "size": session["size"]},
+            )
+        digest = self._hasher_at(upload_id, received).hexdigest()
+
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        file_location = os.path.join(self.upload_dir, f"{timestamp}_{upload_id[:8]}_{session['filename']}")
+        os.replace(self._part_path(upload_id), file_location)
+        atomic_write_text(digest_sidecar_path(file_location), digest)
+        os.remove(self._meta_path(upload_id))
+        self._hashers.pop(upload_id, None)
+        return session, received, file_location, digest
+
+    def _discard_ingestor(self, upload_id):
+        ingestor = self._ingestors.pop(upload_id, None)
+        if ingestor is not None:
+            ingestor.abort()
+            shutil.rmtree(ingestor.work_dir, ignore_errors=True)
+
+    def _adopt_ingested(self, ingestor, file_location, digest, session):
+        """在线程池中执行：等待边上传边处理收尾，把抽帧和音频放入该视频的内容寻址任务目录"""
+        try:
+            frames_dir, audio_path = ingestor.finish()
+            processor = InterviewProcessor(
+                video_path=file_location,
+                appid=None,
+                secret_key=None,
+                frame_interval=session["frame_interval"],
+                video_digest=digest,
+            )
+            return processor.adopt_artifacts(frames_dir, audio_path)
+        except Exception as e:
+            # 容器不可流式读取等情况：不影响上传结果，之后照常处理整个文件
+            logging.warning(f"边上传边处理未能完成，将在处理请求时重新抽帧和提取音频: {e}")
+            return []
+        finally:
+            shutil.rmtree(ingestor.work_dir, ignore_errors=True)
@@ -0,0 +1,76 @@
+import os
+import time
+import wave
+
+from utils.cache_utils import DiskLRUCache, pcm_digest
+
+
+def _write_wav(path, frames, sample_rate=16000):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(frames)
+
+
+def test_pcm_digest_ignores_header_but_not_format(tmp_path):
+    frames = bytes(range(256)) * 8
+    a, b, c = (str(tmp_path / name) for name in ("a.wav", "b.wav", "c.wav"))
+    _write_wav(a, frames)
+    _write_wav(b, frames)
+    _write_wav(c, frames, sample_rate=8000)
+    assert pcm_digest(a) == pcm_digest(b)
+    assert pcm_digest(a) != pcm_digest(c)
+
+
+def _age(cache, key, seconds):
+    path = os.path.join(cache.root, key)
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_get_put_and_stats(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1024)
+    assert cache.get("k", ["a.txt"]) is None
+    cache.put("k", {"a.txt": b"hello"})
+    assert cache.get("k", ["a.txt"]) == {"a.txt": b"hello"}
+    # 已存在的条目保持不变
+    cache.put("k", {"a.txt": b"other"})
+    assert cache.get("k", ["a.txt"]) == {"a.txt": b"hello"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (2, 1, 1, 5)
+    assert stats["hit_rate"] == 2 / 3
+
+
+def test_evicts_least_recently_used_but_not_pinned(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=25)
+    cache.pin(["pinned"])  # 固定的条目不计入 max_bytes
+    for key in ("old", "pinned", "used"):
+        cache.put(key, {"data": b"x" * 10})
+    _age(cache, "old", 300)
+    _age(cache, "pinned", 400)
+    _age(cache, "used", 500)
+    assert cache.path("used", "data")  # 读取刷新最近使用时间
+    cache.put("new", {"data": b"x" * 10})
+    assert cache.path("old", "data") is None
+    assert cache.path("pinned", "data")
+    assert cache.path("used", "data")
+    assert cache.path("new", "data")
+
+
+def test_put_file_moves_into_entry(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1024)
+    src = os.path.join(cache.root, ".tmp_audio.wav")
+    with open(src, "wb") as f:
+        f.write(b"RIFF")
+    cache.put_file("k", "audio.wav", src)
+    assert not os.path.exists(src)
+    with open(cache.path("k", "audio.wav"), "rb") as f:
+        assert f.read() == b"RIFF"
+    # 条目已存在时丢弃新文件，保留原条目
+    with open(src, "wb") as f:
+        f.write(b"NEW!")
+    cache.put_file("k", "audio.wav", src)
+    assert not os.path.exists(src)
+    assert cache.get("k", ["audio.wav"]) == {"audio.wav": b"RIFF"}
+    assert [name for name in os.listdir(cache.root) if name.startswith(".tmp_")] == []
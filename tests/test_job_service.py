@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from config.pipeline_config import JOB_CONFIG
+from services.job_service import (JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, InMemoryJobStore,
+                                  JobService, SQLiteJobStore)
+
+
+def _wait_finished(service, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = service.get_job(job_id)
+        if job["status"] in (JOB_SUCCEEDED, JOB_FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"任务 {job_id} 未在 {timeout} 秒内结束")
+
+
+@pytest.fixture
+def config():
+    return dict(JOB_CONFIG, heartbeat_seconds=0.05, stale_job_seconds=0.5)
+
+
+def test_job_runs_with_report_then_succeeds(config):
+    service = JobService(store=InMemoryJobStore(), config=config)
+
+    def job(report, value):
+        report("asr", "started")
+        report("asr", "finished", 0.1)
+        return {"value": value}
+
+    job_id = service.submit("test", job, 42)
+    job = _wait_finished(service, job_id)
+    assert job["status"] == JOB_SUCCEEDED
+    assert job["result"] == {"value": 42}
+    events = service.get_events(job_id)
+    assert [e["seq"] for e in events] == list(range(1, len(events) + 1))
+    assert [(e.get("stage"), e["status"]) for e in events] == [
+        (None, JOB_QUEUED), (None, JOB_RUNNING), ("asr", "started"), ("asr", "finished"), (None, JOB_SUCCEEDED)]
+    service.shutdown()
+
+
+def test_coroutine_job_and_failure(config):
+    service = JobService(store=InMemoryJobStore(), config=config)
+
+    async def job(report):
+        raise ValueError("boom")
+
+    job = _wait_finished(service, service.submit("test", job))
+    assert job["status"] == JOB_FAILED
+    assert job["error"] == "boom"
+    service.shutdown()
+
+
+def test_submit_rejects_when_too_many_pending(config):
+    store = InMemoryJobStore()
+    service = JobService(store=store, config=dict(config, max_pending=1))
+    release = threading.Event()
+    service.submit("test", lambda report: release.wait())
+    try:
+        with pytest.raises(HTTPException) as exc:
+            service.submit("test", lambda report: None)
+    finally:
+        release.set()
+    assert exc.value.status_code == 429
+    service.shutdown()
+
+
+def test_sqlite_fail_unfinished_only_stale_jobs(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    store.create("old", "test")
+    store.update("old", status=JOB_RUNNING)
+    store.create("done", "test")
+    store.update("done", status=JOB_SUCCEEDED, result={"ok": True})
+    cutoff = time.time()
+    time.sleep(0.01)
+    store.create("fresh", "test")
+
+    store.fail_unfinished("interrupted", cutoff)
+    assert store.get("old")["status"] == JOB_FAILED
+    assert store.get("old")["error"] == "interrupted"
+    assert store.get("done")["status"] == JOB_SUCCEEDED
+    assert store.get("done")["result"] == {"ok": True}
+    assert store.get("fresh")["status"] == JOB_QUEUED
+
+
+def test_long_stage_survives_another_worker_starting(tmp_path, config):
+    """一个阶段的执行时间超过 stale_job_seconds 时，心跳使其他 worker 启动时不会把它标记为失败"""
+    path = str(tmp_path / "jobs.db")
+    service = JobService(store=SQLiteJobStore(path), config=config)
+    release = threading.Event()
+
+    def job(report):
+        report("asr", "started")
+        release.wait()
+        return "done"
+
+    running = service.submit("test", job)
+    try:
+        time.sleep(config["stale_job_seconds"] * 2)
+        other = JobService(store=SQLiteJobStore(path), config=config)
+        assert other.get_job(running)["status"] == JOB_RUNNING
+        other.shutdown()
+    finally:
+        release.set()
+    assert _wait_finished(service, running)["status"] == JOB_SUCCEEDED
+    service.shutdown()
+
+
+def test_jobs_of_dead_worker_are_failed_on_start(tmp_path, config):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    store.create("orphan", "test")
+    store.update("orphan", status=JOB_RUNNING, stage="asr")
+    time.sleep(config["stale_job_seconds"] * 2)
+    service = JobService(store=SQLiteJobStore(path), config=config)
+    job = service.get_job("orphan")
+    assert job["status"] == JOB_FAILED
+    service.shutdown()
@@ -0,0 +1,44 @@
+import pytest
+
+from utils.segment_index import SegmentIndex
+from utils.vad import to_original_time
+
+SEGMENTS = [
+    {"start": 1.0, "end": 2.5, "text": "你好。", "words": [("你好", 1.0, 1.5, "n"), ("。", 1.5, 1.5, "p")]},
+    {"start": 4.0, "end": 5.0, "text": "我是小明", "words": [("我", 4.1, 4.3, "n"), ("是", 4.3, 4.6, "n"),
+                                                          ("小明", 4.6, 5.0, "n")]},
+]
+# 压缩后 [0, 3) 秒对应原始 [0, 3)，压缩后 [3, 6) 秒对应原始 [10, 13)
+OFFSETS = [[0.0, 0.0, 3.0], [3.0, 10.0, 3.0]]
+
+
+def test_to_original_time():
+    assert to_original_time(1.5, None) == 1.5
+    assert to_original_time(1.5, OFFSETS) == 1.5
+    assert to_original_time(4.0, OFFSETS) == 11.0
+    # 超出最后一段时截断到该段末尾
+    assert to_original_time(9.0, OFFSETS) == 13.0
+
+
+def test_from_segments_remaps_times(tmp_path):
+    index = SegmentIndex.from_segments(SEGMENTS, OFFSETS)
+    assert len(index) == 2
+    assert list(index.sentence_start) == [1.0, 11.0]
+    assert list(index.sentence_words) == [0, 2, 5]
+    assert index.sentence_text(1) == "我是小明"
+    assert list(index.word_punct) == [False, True, False, False, False]
+
+    path = str(tmp_path / "segments.npz")
+    index.save(path)
+    loaded = SegmentIndex.load(path)
+    assert list(loaded.word_text) == ["你好", "。", "我", "是", "小明"]
+    assert list(loaded.word_end) == list(index.word_end)
+
+
+def test_text_between_and_speech_rate():
+    index = SegmentIndex.from_segments(SEGMENTS)
+    assert list(index.sentences_between(2.0, 4.5)) == [0, 1]
+    assert index.text_between(3.0, 6.0) == "我是小明"
+    # 第二句 4 个字、1 秒 -> 240 字/分钟；标点不计入
+    assert index.speech_rate(3.0, 6.0) == pytest.approx(240)
+    assert index.speech_rate(6.0, 7.0) == 0.0
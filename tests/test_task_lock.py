@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+import utils.Video_processing as video_processing
+from utils.stage_graph import StageGraph
+from utils.Video_processing import InterviewProcessor
+
+
+@pytest.fixture
+def make_processor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def make():
+        return InterviewProcessor(video_path=str(tmp_path / "video.mp4"), appid=None, secret_key=None,
+                                  video_digest="ab" * 32)
+    return make
+
+
+def _age(path):
+    return time.time() - os.path.getmtime(path)
+
+
+def test_lock_is_exclusive_and_released(make_processor):
+    first, second = make_processor(), make_processor()
+    assert first.lock_path == second.lock_path
+    first._acquire_task_lock()
+    with open(first.lock_path) as f:
+        assert f.read() == str(os.getpid())
+    with pytest.raises(TimeoutError):
+        second._acquire_task_lock(timeout=0.2)
+    first._release_task_lock()
+    second._acquire_task_lock(timeout=0.2)
+    second._release_task_lock()
+    assert not os.path.exists(first.lock_path)
+
+
+def test_waiter_acquires_after_holder_releases(make_processor):
+    holder, waiter = make_processor(), make_processor()
+    holder._acquire_task_lock()
+    timer = threading.Timer(0.3, holder._release_task_lock)
+    timer.start()
+    waiter._acquire_task_lock(timeout=5)
+    waiter._release_task_lock()
+    timer.join()
+
+
+def test_stale_lock_is_taken_over(make_processor, monkeypatch):
+    monkeypatch.setattr(video_processing, "TASK_LOCK_STALE_SECONDS", 60)
+    holder, waiter = make_processor(), make_processor()
+    holder._acquire_task_lock()
+    old = time.time() - 120
+    os.utime(holder.lock_path, (old, old))
+    waiter._acquire_task_lock(timeout=1)
+    assert _age(waiter.lock_path) < 60
+    waiter._release_task_lock()
+
+
+def test_refreshed_lock_is_not_stale(make_processor, monkeypatch):
+    monkeypatch.setattr(video_processing, "TASK_LOCK_STALE_SECONDS", 60)
+    holder, waiter = make_processor(), make_processor()
+    holder._acquire_task_lock()
+    old = time.time() - 120
+    os.utime(holder.lock_path, (old, old))
+    holder._refresh_task_lock()
+    with pytest.raises(TimeoutError):
+        waiter._acquire_task_lock(timeout=0.2)
+    holder._release_task_lock()
+
+
+def test_stage_graph_heartbeat_while_stage_runs():
+    beats = []
+    graph = StageGraph(heartbeat=lambda: beats.append(time.monotonic()), heartbeat_seconds=0.05)
+    graph.add_stage("slow", lambda: time.sleep(0.5) or "done")
+    assert graph.run() == {"slow": "done"}
+    assert len(beats) >= 5
+
+
+def test_stage_graph_async_heartbeat_while_stage_runs():
+    beats = []
+    graph = StageGraph(heartbeat=lambda: beats.append(time.monotonic()), heartbeat_seconds=0.05)
+
+    async def slow():
+        await asyncio.sleep(0.5)
+        return "done"
+
+    graph.add_stage("slow", slow)
+    assert asyncio.run(graph.arun()) == {"slow": "done"}
+    assert len(beats) >= 5
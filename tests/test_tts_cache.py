@@ -0,0 +1,17 @@
+from config.prompts import SELF_INTRODUCTION_QUESTION
+from config.voice_config import VOICE_CONFIG
+from utils.tts_cache import load_question_bank, tts_cache_key
+
+
+def test_cache_key_depends_on_text_and_voice_only():
+    assert tts_cache_key("你好") == tts_cache_key("你好")
+    assert tts_cache_key("你好") != tts_cache_key("你好。")
+    other_voice = dict(VOICE_CONFIG, TTS_VCN="aisjiuxu")
+    assert tts_cache_key("你好", other_voice) != tts_cache_key("你好")
+
+
+def test_question_bank_starts_with_self_introduction(tmp_path):
+    (tmp_path / "a.txt").write_text("问题一\n\n  问题二  \n", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("问题一\n问题三\n", encoding="utf-8")
+    texts = load_question_bank(str(tmp_path / "*.txt"))
+    assert texts == [SELF_INTRODUCTION_QUESTION, "问题一", "问题二", "问题三"]
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from config.pipeline_config import UPLOAD_CONFIG
+from services.upload_service import UploadService
+
+
+async def _pieces(data, size=4):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.fixture
+def service(tmp_path):
+    config = dict(UPLOAD_CONFIG, upload_dir=str(tmp_path), max_chunk_bytes=16, write_buffer_bytes=4)
+    return UploadService(config)
+
+
+def _init(service, size):
+    return service.init_upload("video.mp4", size, ingest=False)["upload_id"]
+
+
+def _put(service, upload_id, start, data, end=None, total=None):
+    return asyncio.run(service.write_chunk(upload_id, start, _pieces(data), end=end, total=total))
+
+
+def test_chunks_in_order_then_finalize(service):
+    upload_id = _init(service, 10)
+    assert _put(service, upload_id, 0, b"01234", end=4, total=10)["received"] == 5
+    assert _put(service, upload_id, 5, b"56789", end=9, total=10)["received"] == 10
+    result = asyncio.run(service.finalize(upload_id))
+    with open(result["file_path"], "rb") as f:
+        assert f.read() == b"0123456789"
+    assert result["sha256"] == hashlib.sha256(b"0123456789").hexdigest()
+    assert not os.path.exists(service._part_path(upload_id))
+
+
+def test_out_of_order_start_returns_409(service):
+    upload_id = _init(service, 10)
+    with pytest.raises(HTTPException) as exc:
+        _put(service, upload_id, 3, b"345", end=5, total=10)
+    assert exc.value.status_code == 409
+    assert exc.value.detail["received"] == 0
+
+
+def test_total_mismatch_returns_416(service):
+    upload_id = _init(service, 10)
+    with pytest.raises(HTTPException) as exc:
+        _put(service, upload_id, 0, b"01234", end=4, total=11)
+    assert exc.value.status_code == 416
+
+
+def test_end_beyond_size_rejected_before_reading_body(service):
+    upload_id = _init(service, 10)
+
+    async def never_read():
+        raise AssertionError("不应读取请求体")
+        yield b""
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(service.write_chunk(upload_id, 0, never_read(), end=10, total=None))
+    assert exc.value.status_code == 416
+    assert service.get_status(upload_id)["received"] == 0
+
+
+@pytest.mark.parametrize("data", [b"012", b"0123456"])
+def test_body_length_mismatch_truncates_to_chunk_start(service, data):
+    upload_id = _init(service, 10)
+    _put(service, upload_id, 0, b"ab", end=1, total=10)
+    with pytest.raises(HTTPException) as exc:
+        _put(service, upload_id, 2, data, end=6, total=10)
+    assert exc.value.status_code == 416
+    assert service.get_status(upload_id)["received"] == 2
+
+
+def test_oversized_chunk_returns_413_and_truncates(service):
+    upload_id = _init(service, 40)
+    _put(service, upload_id, 0, b"ab")
+    with pytest.raises(HTTPException) as exc:
+        _put(service, upload_id, 2, b"x" * 20)
+    assert exc.value.status_code == 413
+    assert service.get_status(upload_id)["received"] == 2
+    # 撤回后从分块起点重新发送，文件内容和哈希都不包含被拒绝的分块
+    _put(service, upload_id, 2, b"y" * 16)
+    _put(service, upload_id, 18, b"z" * 16)
+    _put(service, upload_id, 34, b"z" * 6)
+    result = asyncio.run(service.finalize(upload_id))
+    with open(result["file_path"], "rb") as f:
+        assert f.read() == b"ab" + b"y" * 16 + b"z" * 22
+    assert result["sha256"] == hashlib.sha256(b"ab" + b"y" * 16 + b"z" * 22).hexdigest()
+
+
+def test_finalize_incomplete_returns_409(service):
+    upload_id = _init(service, 10)
+    _put(service, upload_id, 0, b"01234")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(service.finalize(upload_id))
+    assert exc.value.status_code == 409
+    assert exc.value.detail["received"] == 5
+
+
+def test_finalize_waits_for_chunk_in_flight(service):
+    upload_id = _init(service, 10)
+    _put(service, upload_id, 0, b"01234")
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow_body():
+            yield b"567"
+            await release.wait()
+            yield b"89"
+
+        writing = asyncio.create_task(service.write_chunk(upload_id, 5, slow_body(), end=9, total=10))
+        await asyncio.sleep(0.1)
+        finalizing = asyncio.create_task(service.finalize(upload_id))
+        await asyncio.sleep(0.1)
+        # 分块还没写完，finalize 不能移动 .part 文件
+        assert not finalizing.done()
+        release.set()
+        return await writing, await finalizing
+
+    written, result = asyncio.run(run())
+    assert written["received"] == 10
+    with open(result["file_path"], "rb") as f:
+        assert f.read() == b"0123456789"
+    with pytest.raises(HTTPException) as exc:
+        _put(service, upload_id, 10, b"x")
+    assert exc.value.status_code == 404
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from utils.Video_processing import InterviewProcessor
+
+
+@pytest.fixture
+def make_processor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def make(**kwargs):
+        return InterviewProcessor(video_path=str(tmp_path / "video.mp4"), appid=None, secret_key=None,
+                                  video_digest="cd" * 32, **kwargs)
+    return make
+
+
+def _stages(processor):
+    return set(processor.build_stage_graph()._stages)
+
+
+def test_parallel_branches_without_cached_transcript(make_processor):
+    assert _stages(make_processor()) == {"frames", "audio", "asr"}
+
+
+def test_single_pass_when_transcript_is_cached(make_processor):
+    processor = make_processor()
+    with open(processor.text_output_path, "w", encoding="utf-8") as f:
+        f.write("你好")
+    processor._mark_artifacts_done(["asr"])
+    assert _stages(make_processor()) == {"demux", "asr"}
+    # 显式指定时不自动切换
+    assert _stages(make_processor(single_pass=False)) == {"frames", "audio", "asr"}
+
+
+def test_explicit_single_pass(make_processor):
+    assert _stages(make_processor(single_pass=True)) == {"demux", "asr"}
+
+
+def test_task_id_depends_on_content_and_processing_params(make_processor):
+    base = make_processor()
+    assert make_processor().task_id == base.task_id
+    assert make_processor(frame_interval=4).task_id != base.task_id
+    normalized = make_processor(normalize=True)
+    assert normalized.task_id != base.task_id
+    assert "normalize" not in base.cache_params()
+    # 参数经 JSON 读回后与当前参数相同（元组已转为列表），manifest 中的参数比较不会误判为变化
+    assert json.loads(json.dumps(normalized.cache_params())) == normalized.cache_params()
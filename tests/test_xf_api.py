@@ -0,0 +1,62 @@
+import json
+import random
+
+import pytest
+
+from config.pipeline_config import ASR_CONFIG
+from utils.xf_api import parse_order_result, parse_order_segments, poll_delays, result_segments
+
+
+def test_poll_delays_without_jitter():
+    config = dict(ASR_CONFIG, expected_base_seconds=3, expected_ratio=0.1, min_poll_interval=1,
+                  max_poll_interval=4, backoff_factor=2, jitter=0, max_wait_seconds=20)
+    delays = list(poll_delays(100, config))
+    # 先等到预计完成时刻，再从 1 秒开始翻倍退避到上限，累计等待截断在 max_wait_seconds
+    assert delays == [13, 1, 2, 4]
+    config["max_wait_seconds"] = 25
+    delays = list(poll_delays(100, config))
+    assert delays == [13, 1, 2, 4, 4, 1]
+    assert sum(delays) == pytest.approx(25)
+
+
+def test_poll_delays_jitter_stays_in_bounds():
+    config = dict(ASR_CONFIG, jitter=0.2, max_wait_seconds=300)
+    delays = list(poll_delays(60, config, rng=random.Random(0)))
+    expected = config["expected_base_seconds"] + config["expected_ratio"] * 60
+    assert expected * 0.8 <= delays[0] <= expected * 1.2
+    assert all(delay <= config["max_poll_interval"] * 1.2 for delay in delays[1:])
+    assert sum(delays) == pytest.approx(300)
+
+
+def _sentence(bg, ed, words):
+    """words: [(词, wb, we, wp)]，wb/we 为相对句首的帧（10 毫秒）"""
+    st = {"bg": str(bg), "ed": str(ed), "rt": [{"ws": [
+        {"wb": wb, "we": we, "cw": [{"w": w, "wp": wp}]} for w, wb, we, wp in words
+    ]}]}
+    return {"json_1best": json.dumps({"st": st})}
+
+
+def _order_result():
+    return json.dumps({"lattice": [
+        _sentence(1000, 2500, [("你好", 0, 50, "n"), ("。", 50, 50, "p")]),
+        {"other": "ignored"},
+        _sentence(3000, 3100, [("", 0, 5, "n")]),
+        _sentence(4000, 5200, [("我", 10, 30, "n"), ("是", 30, 60, "n"), ("小明", 60, 110, "n")]),
+    ]})
+
+
+def test_parse_order_segments_times_and_words():
+    segments = parse_order_segments(_order_result())
+    assert [s["text"] for s in segments] == ["你好。", "我是小明"]
+    first, second = segments
+    assert (first["start"], first["end"]) == (1.0, 2.5)
+    assert first["words"] == [("你好", 1.0, 1.5, "n"), ("。", 1.5, 1.5, "p")]
+    assert second["words"][2] == ("小明", pytest.approx(4.6), pytest.approx(5.1), "n")
+    assert parse_order_result(_order_result()) == "你好。\n我是小明"
+
+
+def test_result_segments_handles_missing_or_broken_results():
+    assert result_segments(None) is None
+    assert result_segments({"content": {"orderResult": ""}}) is None
+    assert result_segments({"content": {"orderResult": "{broken"}}) is None
+    assert len(result_segments({"content": {"orderResult": _order_result()}})) == 2
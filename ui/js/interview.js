@@ -16,7 +16,8 @@ document.addEventListener('DOMContentLoaded', function() {
         this.disabled = true;
         this.textContent = '正在生成问题...';
         try {
-            const response = await fetch('/generate_questions', {
+            // 逐条接收问题（NDJSON）：自我介绍立即返回，收到第一题就进入面试界面，其余问题陆续追加
+            const response = await fetch('/generate_questions/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -29,11 +30,38 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            const data = await response.json();
-            console.log('Generated Questions:', data.questions);
-            console.log('Audio Paths:', data.audio_paths);
-            // 显示问题列表
-            displayQuestions(data.questions, data.audio_paths);
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let received = 0;
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop(); // 最后一段可能不完整，留到下次
+                for (const line of lines) {
+                    if (!line.trim()) continue;
+                    const item = JSON.parse(line);
+                    if (item.type === 'question') {
+                        console.log(`Question ${item.index + 1}:`, item.question, item.audio_path);
+                        if (received === 0) {
+                            showQuestionsView();
+                        }
+                        appendQuestion(item.index, item.question, item.audio_path);
+                        received++;
+                    } else if (item.type === 'error') {
+                        // 已经收到的问题照常使用，只有一题都没有时才提示失败
+                        if (received === 0) {
+                            throw new Error(item.detail);
+                        }
+                        console.error('部分问题生成失败:', item.detail);
+                    }
+                }
+            }
+            if (received === 0) {
+                throw new Error('没有收到任何问题');
+            }
         } catch (error) {
             console.error('生成问题失败:', error);
             alert('生成问题失败，请稍后再试。');
@@ -45,7 +73,7 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
-function displayQuestions(questions, audioPaths) {
+function showQuestionsView() {
     const questionsContainer = document.getElementById('questions-container');
     const interviewSettings = document.getElementById('interview-settings');
     const initialView = document.getElementById('initial-view');
@@ -57,20 +85,27 @@ function displayQuestions(questions, audioPaths) {
     interviewView.classList.remove('hidden'); // 显示面试视图
     interviewSettings.classList.add('hidden');
     questionsContainer.classList.remove('hidden');
-    questions.forEach((question, index) => {
-        const audioPath = audioPaths[index].replace(/\\/g, '/');
-        const questionElement = document.createElement('div');
-        questionElement.className = 'bg-white rounded-xl shadow-card p-6 mb-4';
-        questionElement.innerHTML = `
-            <div class="flex items-center justify-between">
-                <p class="text-lg font-medium text-dark">${index + 1}. ${question}</p>
+}
+
+function appendQuestion(index, question, audioPath) {
+    const questionsContainer = document.getElementById('questions-container');
+    // 语音合成失败的问题没有音频，不显示播放按钮
+    audioPath = audioPath ? audioPath.replace(/\\/g, '/') : null;
+    const playButton = audioPath ? `
                 <button onclick="playQuestion('${audioPath}')" class="p-2 rounded-full text-primary hover:bg-primary/10 focus:outline-none">
                     <i class="fa fa-play"></i>
-                </button>
+                </button>` : '';
+    const questionElement = document.createElement('div');
+    questionElement.className = 'bg-white rounded-xl shadow-card p-6 mb-4';
+    questionElement.dataset.index = index;
+    questionElement.innerHTML = `
+            <div class="flex items-center justify-between">
+                <p class="text-lg font-medium text-dark">${index + 1}. ${question}</p>${playButton}
             </div>
         `;
-        questionsContainer.appendChild(questionElement);
-    });
+    // 问题按合成完成的顺序到达，按题号插入到正确位置
+    const next = Array.from(questionsContainer.children).find(el => Number(el.dataset.index) > index);
+    questionsContainer.insertBefore(questionElement, next || null);
 }
 
 function playQuestion(audioPath) {
@@ -227,26 +262,35 @@ document.getElementById('submit-video-btn').addEventListener('click', function()
     window.location.href = 'reports.html';
 });
 
+// 分块上传和后台分析任务的参数
+const UPLOAD_FRAME_INTERVAL = 8; // 与 /interview_jobs/ 的 frame_interval 一致，边上传边抽帧的结果才能复用
+const UPLOAD_MAX_RETRIES = 3; // 单个分块失败（断网等）后的重试次数
+const STAGE_LABELS = {
+    normalize: '视频规范化',
+    demux: '视频解码',
+    frames: '抽取画面',
+    audio: '提取音频',
+    asr: '语音转写',
+    image_analysis: '画面分析',
+    speech_analysis: '语音表达分析',
+    text_analysis: '回答内容分析',
+    model_inference: '模型评估'
+};
+
 async function uploadVideo(videoBlob, filename) {
-    const formData = new FormData();
-    formData.append('file', videoBlob, filename);
     const progressBar = document.getElementById('progress-bar');
     const statusText = document.getElementById('processing-status');
     // 重置进度条
     progressBar.style.width = '0%';
     statusText.textContent = '正在上传视频...';
     try {
-        const uploadResponse = await fetch('/upload_video/', {
-            method: 'POST',
-            body: formData,
+        const filePath = await uploadInChunks(videoBlob, filename, (received, size) => {
+            // 上传占进度条的前 30%
+            progressBar.style.width = `${Math.round(received / size * 30)}%`;
+            statusText.textContent = `正在上传视频... ${Math.round(received / size * 100)}%`;
         });
-        if (!uploadResponse.ok) {
-            throw new Error(`HTTP error! status: ${uploadResponse.status}`);
-        }
-        const uploadData = await uploadResponse.json();
-        console.log('视频上传成功:', uploadData);
-        // 视频上传成功后，调用后端接口进行AI分析
-        processInterview(uploadData.file_path.replace(/\\/g, '/'));
+        // 视频上传成功后，提交后台分析任务
+        processInterview(filePath.replace(/\\/g, '/'));
     } catch (error) {
         console.error('视频上传失败:', error);
         alert('视频上传失败，请检查网络或稍后再试。');
@@ -255,6 +299,96 @@ async function uploadVideo(videoBlob, filename) {
     }
 }
 
+// 分块上传：init → 按顺序 PUT 各分块（Content-Range）→ finalize，返回服务器端文件路径。
+// 录制的 WebM 在上传过程中服务端即开始抽帧和提取音频；分块失败时按服务端的 received 续传
+async function uploadInChunks(blob, filename, onProgress) {
+    const initResponse = await fetch('/upload_video/init', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            filename: filename,
+            size: blob.size,
+            frame_interval: UPLOAD_FRAME_INTERVAL
+        })
+    });
+    if (!initResponse.ok) {
+        throw new Error(`HTTP error! status: ${initResponse.status}`);
+    }
+    const session = await initResponse.json();
+    const uploadUrl = `/upload_video/${session.upload_id}`;
+    let received = 0;
+    let retries = 0;
+    while (received < blob.size) {
+        const end = Math.min(received + session.chunk_size, blob.size) - 1;
+        let response = null;
+        try {
+            response = await fetch(uploadUrl, {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Range': `bytes ${received}-${end}/${blob.size}`
+                },
+                body: blob.slice(received, end + 1)
+            });
+        } catch (error) {
+            console.warn('分块上传中断，准备续传:', error);
+        }
+        if (response && response.ok) {
+            received = (await response.json()).received;
+            retries = 0;
+            onProgress(received, blob.size);
+            continue;
+        }
+        if (response && ![409, 416].includes(response.status) && response.status < 500) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        // 起始位置不一致、分块被拒绝或网络错误：查询服务端已接收的字节数后从该处重传
+        if (++retries > UPLOAD_MAX_RETRIES) {
+            throw new Error(`分块上传失败，已重试 ${UPLOAD_MAX_RETRIES} 次`);
+        }
+        const statusResponse = await fetch(uploadUrl);
+        if (!statusResponse.ok) {
+            throw new Error(`HTTP error! status: ${statusResponse.status}`);
+        }
+        received = (await statusResponse.json()).received;
+    }
+    const finalizeResponse = await fetch(`${uploadUrl}/finalize`, { method: 'POST' });
+    if (!finalizeResponse.ok) {
+        throw new Error(`HTTP error! status: ${finalizeResponse.status}`);
+    }
+    const finalizeData = await finalizeResponse.json();
+    console.log('视频上传成功:', finalizeData);
+    return finalizeData.file_path;
+}
+
+// 订阅后台任务的 SSE 进度，任务结束时返回结果；onStage(stage, status) 在每个阶段开始/结束时调用
+function waitForJob(eventsUrl, onStage) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(eventsUrl);
+        source.addEventListener('stage', (event) => {
+            const data = JSON.parse(event.data);
+            onStage(data.stage, data.status);
+        });
+        source.addEventListener('result', (event) => {
+            source.close();
+            const data = JSON.parse(event.data);
+            if (data.status === 'succeeded') {
+                resolve(data.result);
+            } else {
+                reject(new Error(data.error || '任务执行失败'));
+            }
+        });
+        source.onerror = () => {
+            // 网络中断时浏览器会携带 Last-Event-ID 自动重连；连接被服务端拒绝（如任务已过期）时不再重试
+            if (source.readyState === EventSource.CLOSED) {
+                reject(new Error('任务进度连接已关闭'));
+            }
+        };
+    });
+}
+
 async function processInterview(videoPath) {
     const progressBar = document.getElementById('progress-bar');
     const statusText = document.getElementById('processing-status');
@@ -264,21 +398,33 @@ async function processInterview(videoPath) {
     progressBar.style.width = '30%';
     statusText.textContent = 'AI分析中... (视频处理中)';
     try {
-        const processResponse = await fetch('/process_interview/', {
+        // 提交后台任务，长视频不会因请求超时而失败
+        const jobResponse = await fetch('/interview_jobs/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
                 video_path: videoPath,
-                frame_interval: 8, // 默认值
+                frame_interval: UPLOAD_FRAME_INTERVAL,
                 job_type: document.getElementById('position-type').value || 'python_engineer' // 从下拉菜单获取或使用默认值
             })
         });
-        if (!processResponse.ok) {
-            throw new Error(`HTTP error! status: ${processResponse.status}`);
+        if (!jobResponse.ok) {
+            throw new Error(`HTTP error! status: ${jobResponse.status}`);
         }
-        const processData = await processResponse.json();
+        const job = await jobResponse.json();
+        let finishedStages = 0;
+        const processData = await waitForJob(job.events_url, (stage, stageStatus) => {
+            const label = STAGE_LABELS[stage] || stage;
+            if (stageStatus === 'started') {
+                statusText.textContent = `AI分析中... (${label})`;
+            } else if (stageStatus === 'finished') {
+                // 分析阶段在 30% 到 70% 之间推进
+                finishedStages += 1;
+                progressBar.style.width = `${Math.min(70, 30 + finishedStages * 5)}%`;
+            }
+        });
         console.log('面试处理结果:', processData);
         // 视频处理完成，进度条设置为70%
         progressBar.style.width = '70%';
@@ -1,141 +1,789 @@
+import asyncio
 import cv2
+import json
+import math
 import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from moviepy import VideoFileClip
 from dotenv import load_dotenv
-from .xf_api import RequestApi
+from .cache_utils import DiskLRUCache, atomic_write_json, atomic_write_text, file_digest, params_digest, pcm_digest
+from .media_demux import AUDIO_SAMPLE_RATE, demux_video
+from .media_normalize import normalize_video
+from .sharded_decode import available_cores, decode_sharded
+from .stage_graph import StageGraph
+from .asr_client import make_asr_client
+from .segment_index import SegmentIndex
+from .vad import compact_silence
+from config.pipeline_config import NORMALIZE_CONFIG, TRANSCRIPT_CACHE_CONFIG, VAD_CONFIG
+
+
+# 抽帧/音频逻辑发生不兼容变化时递增，使旧缓存目录失效
+CACHE_VERSION = 2
+
+# 持有任务锁期间每隔该时长（秒）刷新一次锁文件的修改时间
+TASK_LOCK_REFRESH_SECONDS = 30
+# 锁文件超过该时长（秒）没有刷新视为残留锁（持有进程已崩溃）
+TASK_LOCK_STALE_SECONDS = 300
+# 等待其他请求释放任务锁的最长时间（秒），超时抛出 TimeoutError
+TASK_LOCK_WAIT_SECONDS = 3600
+
+# ULID 使用的 Crockford Base32 字母表
+_CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# 各阶段依赖的产物；demux 一次产出抽帧和音频
+STAGE_ARTIFACTS = {
+    "frames": ("frames",),
+    "audio": ("audio",),
+    "demux": ("frames", "audio"),
+    "asr": ("asr",),
+}
+
+
+def new_task_id():
+    """
+    生成 ULID 风格的任务 ID：48 位毫秒时间戳 + 80 位随机数，共 26 个字符。
+    按创建时间排序、跨进程无需协调即可保证唯一，不再依赖共享的序号文件。
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+_transcript_cache = None
+_transcript_cache_lock = threading.Lock()
+
+
+def get_transcript_cache(config=None):
+    """进程内共享的转写结果缓存（DiskLRUCache），未启用时返回 None"""
+    global _transcript_cache
+    config = config or TRANSCRIPT_CACHE_CONFIG
+    if not config["enabled"]:
+        return None
+    with _transcript_cache_lock:
+        if _transcript_cache is None:
+            _transcript_cache = DiskLRUCache(config["cache_dir"], config["max_bytes"])
+        return _transcript_cache
 
 
 class InterviewProcessor:
-    def __init__(self, video_path, appid, secret_key, frame_interval=8, fps_target=8):
-        """初始化处理器，所有输出统一到output文件夹"""
+    def __init__(self, video_path, appid, secret_key, frame_interval=8, fps_target=8,
+                 extract_mode="sparse", seek_threshold=2.0, single_pass=None,
+                 use_cache=True, video_digest=None, persist_frames=True, memory_max_side=1280,
+                 normalize=False, decode_shards=None, shard_min_duration=600, asr_client=None,
+                 vad=None):
+        """初始化处理器，所有输出统一到output文件夹
+
+        extract_mode: "sparse" 只解码需要保留的帧（按目标时间定位），
+                      "sharded" 把时间轴切成多段由多个进程并行按 sparse 方式解码，
+                      "sequential" 为逐帧解码的原始方式。
+        seek_threshold: 与下一目标帧的距离（秒）不超过该值时直接向前 grab，
+                        否则执行 seek（定位会回退到前一个关键帧再解码）。
+        single_pass: 为 True 时 run_pipeline 只读取一次容器，同时得到抽样帧和
+                     16 kHz 单声道音频（见 demux），但语音识别要等整个容器解码完才能开始；
+                     为 False 时抽帧与“提取音频 → 语音识别”两条支路并发执行。
+                     缺省（None）时自动选择：任务目录中已有转写结果时语音识别无需等待音频，使用单次解封装，
+                     否则两条支路并发。
+        use_cache: 为 True 时任务目录以视频内容哈希 + 处理参数命名，
+                   重复请求同一视频会直接复用已有的抽帧、音频和转写结果。
+        video_digest: 已知的视频内容 sha256（例如上传时已计算），传入可省去重新哈希。
+        persist_frames: 是否把抽取的帧（原始分辨率 JPEG）写入 frames 目录；
+                        写入在后台线程进行，调用 flush_frames() 等待完成。
+        memory_max_side: 内存中帧数组的最长边上限（像素），超过时等比缩小。
+        normalize: 为 True 时先把视频规范化为关键帧密集、moov 前置的 MP4（见 media_normalize），
+                   后续抽帧和音频提取读取规范化后的文件；结果缓存在原文件旁。
+        decode_shards: sharded 模式的分片（进程）数，缺省为可用 CPU 核数。
+        shard_min_duration: sparse 模式下视频时长（秒）不短于该值且分片数大于 1 时自动改用 sharded；
+                            短视频进程启动和重复打开容器的开销抵消了并行收益。
+        asr_client: 语音转写客户端（utils.asr_client.AsrClient），缺省按 ASR_CONFIG["provider"] 创建。
+        vad: 为 True 时在提取音频后压缩长静音（见 utils.vad），转写和辅助模型使用压缩后的 audio_speech.wav，
+             时间偏移表写入 audio_offsets.json；缺省取 VAD_CONFIG["enabled"]。
+        """
         self.video_path = video_path
+        self.source_path = video_path  # 原始上传文件；规范化后 video_path 指向规范化文件
+        self.normalize = normalize
         self.appid = appid
         self.secret_key = secret_key
+        self.asr_client = asr_client or make_asr_client(appid=appid, secret_key=secret_key)
+        self.transcript_cache = get_transcript_cache()
         self.frame_interval = frame_interval
         self.fps_target = fps_target
+        self.extract_mode = extract_mode
+        self.seek_threshold = seek_threshold
+        self.single_pass = single_pass
+        self.decode_shards = decode_shards or available_cores()
+        self.shard_min_duration = shard_min_duration
+        self.vad = VAD_CONFIG["enabled"] if vad is None else vad
+        self.audio_sample_rate = None
+        # 最近一次 run_pipeline 各阶段耗时（秒），total 为端到端耗时
+        self.stage_timings = {}
+        # 最近一次抽帧的解码统计：decoded 为解码帧数，seeks 为定位次数
+        self.decode_stats = {}
+
+        # 抽取的帧直接以内存数组交给下游：N×H×W×3 的连续 uint8 数组（BGR）及对应秒数
+        self.persist_frames = persist_frames
+        self.memory_max_side = memory_max_side
+        self.frames = None
+        self.frame_timestamps = []
+        self._frame_buffer = []
+        self._persist_pool = None
+        self._persist_futures = []
 
-        # 生成递增序号（从文件记录中读取并更新）
-        self.sequence = self.get_next_sequence()
+        self.use_cache = use_cache
+        # 本次运行中命中缓存而被跳过的阶段
+        self.cache_hits = []
+        self._manifest_lock = threading.Lock()
 
         # 定义主输出文件夹
         self.main_output_dir = "output"
-        # 按序号和类型细分的子路径
-        self.task_dir = os.path.join(self.main_output_dir, f"task_{self.sequence}")  # 每个任务的根目录
-        self.audio_output_path = os.path.join(self.task_dir, "audio.wav")  # 音频文件
+        os.makedirs(self.main_output_dir, exist_ok=True)
+
+        if use_cache:
+            # 内容寻址：同一视频、同一参数总是落到同一个任务目录，并发写入由锁文件串行化
+            self.video_digest = video_digest or file_digest(video_path)
+            self.task_id = f"{self.video_digest[:32]}_{params_digest(self.cache_params())}"
+            os.makedirs(os.path.join(self.main_output_dir, f"task_{self.task_id}"), exist_ok=True)
+        else:
+            # 每次处理一个新目录：os.mkdir 在 ID 冲突时失败（原子操作），换一个 ID 重试
+            self.video_digest = video_digest
+            while True:
+                self.task_id = new_task_id()
+                try:
+                    os.mkdir(os.path.join(self.main_output_dir, f"task_{self.task_id}"))
+                    break
+                except FileExistsError:
+                    continue
+
+        # 按任务 ID 和类型细分的子路径
+        self.task_dir = os.path.join(self.main_output_dir, f"task_{self.task_id}")  # 每个任务的根目录
+        self.audio_output_path = os.path.join(self.task_dir, "audio.wav")  # 音频文件（16 kHz 单声道）
+        self.speech_output_path = os.path.join(self.task_dir, "audio_speech.wav")  # 压缩静音后的音频（vad 开启时）
+        self.offsets_output_path = os.path.join(self.task_dir, "audio_offsets.json")  # 压缩音频 -> 原始时间的偏移表
         self.frames_output_dir = os.path.join(self.task_dir, "frames")      # 帧图像目录
         self.text_output_path = os.path.join(self.task_dir, "transcript.txt")  # 文本文件
+        self.segments_output_path = os.path.join(self.task_dir, "transcript_segments.npz")  # 逐句/逐词时间索引
+        self.manifest_path = os.path.join(self.task_dir, "manifest.json")  # 已完成阶段记录
+        self.lock_path = os.path.join(self.task_dir, ".lock")  # 内容寻址目录的写锁
 
-        # 确保主输出目录和任务目录存在
-        os.makedirs(self.task_dir, exist_ok=True)
+        # 确保帧图像目录存在
         os.makedirs(self.frames_output_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
 
-    @staticmethod
-    def get_next_sequence():
-        """从序号记录文件获取下一个序号"""
-        seq_file = os.path.join("output", "processing_sequence.txt")  # 序号文件也放入output
-        # 确保output目录存在（首次运行时）
-        os.makedirs("output", exist_ok=True)
-        
-        if not os.path.exists(seq_file):
-            with open(seq_file, "w", encoding="utf-8") as f:
-                f.write("0")  # 初始序号为0
-            return 0
-        # 读取当前序号并递增
-        with open(seq_file, "r", encoding="utf-8") as f:
+    def cache_params(self):
+        """影响处理产物的参数，参与任务目录的缓存键"""
+        params = {
+            "version": CACHE_VERSION,
+            "frame_interval": self.frame_interval,
+            "fps_target": self.fps_target,
+        }
+        if self.normalize:
+            # 规范化会重新编码音轨（AAC）并可能转码画面，抽帧、音频和转写都随之变化；
+            # 与 vad 一样只在开启时加入，未规范化的任务目录保持不变
+            # （元组转为列表，与 manifest.json 读回的参数可以直接比较）
+            params["normalize"] = {key: list(value) if isinstance(value, tuple) else value
+                                   for key, value in NORMALIZE_CONFIG.items()
+                                   if key not in ("after_upload", "suffix")}
+        if self.vad:
+            # 只在开启时加入，关闭 VAD 的任务目录与之前保持一致
+            params["vad"] = {key: value for key, value in VAD_CONFIG.items() if key != "enabled"}
+        return params
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("params") == self.cache_params():
+                return manifest
+        except (FileNotFoundError, ValueError):
+            pass
+        return {"video_digest": self.video_digest, "params": self.cache_params(), "artifacts": {}}
+
+    def _artifact_exists(self, artifact):
+        if artifact == "frames":
+            return bool(os.listdir(self.frames_output_dir))
+        if artifact == "audio":
+            paths = [self.audio_output_path] + ([self.speech_output_path] if self.vad else [])
+            return all(os.path.exists(path) and os.path.getsize(path) > 0 for path in paths)
+        if artifact == "asr":
+            return os.path.exists(self.text_output_path)
+        return False
+
+    def _mark_artifacts_done(self, artifacts):
+        with self._manifest_lock:
+            for artifact in artifacts:
+                self.manifest["artifacts"][artifact] = {"completed_at": time.time()}
+            atomic_write_json(self.manifest_path, self.manifest)
+
+    def _cached_stage(self, name, func):
+        """
+        阶段包装：manifest 记录该阶段的产物已完成且文件仍在时直接复用，
+        否则执行阶段函数，成功后把产物记录到 manifest。
+        """
+        artifacts = STAGE_ARTIFACTS[name]
+
+        def cached():
+            """命中缓存时返回 (True, 结果)"""
+            if self.use_cache and all(
+                a in self.manifest["artifacts"] and self._artifact_exists(a) for a in artifacts
+            ):
+                print(f"[{name}] 命中缓存，复用 {self.task_dir} 中的结果")
+                self.cache_hits.append(name)
+                if "frames" in artifacts:
+                    self.load_frames()
+                if name == "asr":
+                    with open(self.text_output_path, "r", encoding="utf-8") as f:
+                        return True, f.read()
+                return True, None
+            return False, None
+
+        def record(result):
+            if self.use_cache and "frames" in artifacts:
+                self.flush_frames()  # 帧写完才能记为已完成
+            if self.use_cache and (name != "asr" or result is not None):
+                done = [a for a in artifacts if self._artifact_exists(a)]
+                if done:
+                    self._mark_artifacts_done(done)
+            return result
+
+        if asyncio.iscoroutinefunction(func):
+            async def stage():
+                hit, result = cached()
+                return result if hit else record(await func())
+        else:
+            def stage():
+                hit, result = cached()
+                return result if hit else record(func())
+
+        return stage
+
+    def _acquire_task_lock(self, timeout=None):
+        """
+        以 O_CREAT | O_EXCL 创建锁文件（跨进程原子操作），保证同一内容寻址目录
+        同时只有一个 worker 在写。锁被占用时等待持有者完成后复用其结果。
+        持有者在处理期间定期刷新锁文件（见 _refresh_task_lock），长时间没有刷新才视为残留锁。
+
+        Raises:
+            TimeoutError: 等待超过 timeout 秒（缺省 TASK_LOCK_WAIT_SECONDS）锁仍被占用。
+        """
+        timeout = TASK_LOCK_WAIT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
             try:
-                current = int(f.read().strip())
-            except ValueError:
-                current = 0  # 若文件内容无效，从0开始
-        next_seq = current + 1
-        with open(seq_file, "w", encoding="utf-8") as f:
-            f.write(str(next_seq))
-        return next_seq
-
-    def extract_frames(self):
-        """提取视频帧到 task_{序号}/frames 目录"""
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    age = time.time() - os.path.getmtime(self.lock_path)
+                except FileNotFoundError:
+                    continue  # 持有者刚好释放，立即重试
+                if age > TASK_LOCK_STALE_SECONDS:
+                    print(f"发现残留任务锁（{age:.0f} 秒未释放），予以清除")
+                    try:
+                        os.remove(self.lock_path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待任务目录 {self.task_dir} 的锁超过 {timeout} 秒")
+                if not waited:
+                    print(f"任务目录 {self.task_dir} 正被其他请求处理，等待其完成...")
+                    waited = True
+                time.sleep(min(1, max(0, deadline - time.monotonic())))
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            break
+        # 等待期间其他 worker 可能已完成部分阶段
+        self.manifest = self._load_manifest()
+
+    def _refresh_task_lock(self):
+        """持有锁期间调用：更新锁文件的修改时间，其他 worker 不会把它当作残留锁清除"""
+        try:
+            os.utime(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _release_task_lock(self):
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def adopt_artifacts(self, frames_dir=None, audio_path=None):
+        """
+        把预先得到的抽帧和音频（例如上传过程中边传边解出的结果）移入任务目录并记入 manifest，
+        之后 run_pipeline 会直接复用。已完成的产物不会被覆盖。需要 use_cache=True。
+
+        Returns:
+            list: 实际采用的产物名称。
+        """
+        if not self.use_cache:
+            raise ValueError("adopt_artifacts 需要内容寻址的任务目录（use_cache=True）")
+        self._acquire_task_lock()
+        try:
+            adopted = []
+            if frames_dir and "frames" not in self.manifest["artifacts"]:
+                for name in os.listdir(frames_dir):
+                    if re.fullmatch(r"frame_(\d+)s\.jpg", name):
+                        shutil.move(os.path.join(frames_dir, name), os.path.join(self.frames_output_dir, name))
+                if self._artifact_exists("frames"):
+                    adopted.append("frames")
+            if audio_path and os.path.exists(audio_path) and "audio" not in self.manifest["artifacts"]:
+                shutil.move(audio_path, self.audio_output_path)
+                self.compact_audio()
+                if self._artifact_exists("audio"):
+                    adopted.append("audio")
+            if adopted:
+                self._mark_artifacts_done(adopted)
+            return adopted
+        finally:
+            self._release_task_lock()
+
+    def extract_frames(self, mode=None):
+        """提取视频帧：结果保存在 self.frames / self.frame_timestamps，并异步写入 frames 目录
+
+        mode 缺省时使用 self.extract_mode。sparse 模式只解码保留的帧，
+        容器无法定位或元数据不可靠时自动退回 grab/retrieve 方式。
+        """
+        mode = mode or self.extract_mode
         cap = cv2.VideoCapture(self.video_path)
         if not cap.isOpened():
             raise FileNotFoundError("无法打开视频文件")
 
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
+        duration = total_frames / fps if fps > 0 else 0
 
         print(f"视频总时长: {duration:.2f} 秒")
         print(f"原始帧率: {fps:.2f} FPS")
 
-        frame_count = 0
-        second = 0
+        if mode == "sparse" and self.decode_shards > 1 and duration >= self.shard_min_duration:
+            mode = "sharded"
+        self.decode_stats = {"mode": mode, "decoded": 0, "seeks": 0, "saved": 0}
+        self._frame_buffer = []
+        start = time.perf_counter()
+        try:
+            if mode == "sequential":
+                self._extract_frames_sequential(cap)
+            elif fps > 0 and total_frames > 0 and mode == "sharded":
+                cap.release()  # 各子进程自行打开容器
+                self._extract_frames_sharded(fps, total_frames)
+            elif fps > 0 and total_frames > 0:
+                self._extract_frames_sparse(cap, fps, total_frames)
+            else:
+                print("视频元数据不可靠，改用 grab/retrieve 方式抽帧")
+                self._extract_frames_grab(cap)
+        finally:
+            cap.release()
+        self._finish_frames()
+        self.decode_stats["elapsed"] = time.perf_counter() - start
+
+        print(f"共提取 {self.decode_stats['saved']} 帧图像（保存目录：{self.frames_output_dir}），"
+              f"解码 {self.decode_stats['decoded']} 帧，定位 {self.decode_stats['seeks']} 次")
+
+    def frame_path(self, second):
+        """某一秒对应的帧图像文件路径"""
+        return os.path.join(self.frames_output_dir, f"frame_{second}s.jpg")
+
+    def _fit_memory(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.memory_max_side / max(height, width)
+        if scale >= 1:
+            return frame
+        return cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    def _keep_frame(self, second, frame):
+        """保留一帧：内存中保存（必要时缩小的）副本，原图交给后台线程写盘"""
+        if self.persist_frames:
+            if self._persist_pool is None:
+                self._persist_pool = ThreadPoolExecutor(max_workers=2)
+            future = self._persist_pool.submit(cv2.imwrite, self.frame_path(second), frame)
+            self._persist_futures.append((second, future))
+        self._frame_buffer.append((second, self._fit_memory(frame)))
+        self.decode_stats["saved"] += 1
+        print(f"已保留帧: {second}s")
 
+    def _finish_frames(self):
+        """把抽帧过程中收集的帧合并为一个连续数组"""
+        self._frame_buffer.sort(key=lambda item: item[0])
+        self.frame_timestamps = [second for second, _ in self._frame_buffer]
+        if self._frame_buffer:
+            self.frames = np.stack([frame for _, frame in self._frame_buffer])
+        else:
+            self.frames = np.empty((0, 0, 0, 3), dtype=np.uint8)
+        self._frame_buffer = []
+
+    def flush_frames(self):
+        """等待后台写盘全部完成；任一帧写入失败时抛出 IOError"""
+        futures, self._persist_futures = self._persist_futures, []
+        failed = [second for second, future in futures if not future.result()]
+        if self._persist_pool is not None:
+            self._persist_pool.shutdown(wait=True)
+            self._persist_pool = None
+        if failed:
+            raise IOError(f"以下帧写入 {self.frames_output_dir} 失败: {failed}")
+
+    def load_frames(self):
+        """从 frames 目录重新载入帧（缓存命中时使用）"""
+        self._frame_buffer = []
+        for name in os.listdir(self.frames_output_dir):
+            match = re.fullmatch(r"frame_(\d+)s\.jpg", name)
+            if not match:
+                continue
+            frame = cv2.imread(os.path.join(self.frames_output_dir, name))
+            if frame is not None:
+                self._frame_buffer.append((int(match.group(1)), self._fit_memory(frame)))
+        self._finish_frames()
+
+    def _extract_frames_sequential(self, cap):
+        """逐帧解码，每隔 frame_interval 秒保存一帧"""
+        second = 0
         while True:
             ret, frame = cap.read()
             if not ret:
                 break
+            self.decode_stats["decoded"] += 1
 
             current_second = int(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
 
             # 每隔指定秒数保存一帧
             if current_second % self.frame_interval == 0 and current_second != second:
-                frame_count += 1
                 second = current_second
-                frame_filename = os.path.join(self.frames_output_dir, f"frame_{second}s.jpg")
-                cv2.imwrite(frame_filename, frame)
-                print(f"已保存帧: {frame_filename}")
+                self._keep_frame(second, frame)
 
-        cap.release()
-        print(f"共提取 {frame_count} 帧图像（保存目录：{self.frames_output_dir}）")
+    def _extract_frames_grab(self, cap, last_second=0):
+        """不可定位容器的兜底：grab 逐帧推进，只对保留的帧 retrieve（省去颜色转换和拷贝）"""
+        while cap.grab():
+            self.decode_stats["decoded"] += 1
+            current_second = int(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+            if current_second % self.frame_interval == 0 and current_second > last_second:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                last_second = current_second
+                self._keep_frame(current_second, frame)
+
+    def _extract_frames_sparse(self, cap, fps, total_frames):
+        """按目标时间点 frame_interval, 2*frame_interval, ... 定位并只解码保留的帧"""
+        seek_gap = max(1, int(self.seek_threshold * fps))
+        position = 0  # 解码器下一次将返回的帧序号
+        second = self.frame_interval
+        while True:
+            target = math.ceil(second * fps - 1e-6)
+            if target >= total_frames:
+                break
+            if target - position > seek_gap:
+                # 距离较远：seek 回退到目标前的关键帧后解码到目标，比逐帧推进便宜
+                if not cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                    print("容器不支持定位，改用 grab/retrieve 方式抽帧")
+                    self._extract_frames_grab(cap, last_second=second - self.frame_interval)
+                    return
+                self.decode_stats["seeks"] += 1
+                position = target
+            else:
+                # 距离较近（同一 GOP 内）：直接 grab 跳过，避免重复解码关键帧
+                while position < target and cap.grab():
+                    self.decode_stats["decoded"] += 1
+                    position += 1
+            ret, frame = cap.read()
+            if not ret:
+                break
+            self.decode_stats["decoded"] += 1
+            position += 1
+            self._keep_frame(second, frame)
+            second += self.frame_interval
+
+    def _extract_frames_sharded(self, fps, total_frames):
+        """把目标时间点切成 decode_shards 段，在进程池中并行解码后按时间顺序合并"""
+        seconds = []
+        second = self.frame_interval
+        while math.ceil(second * fps - 1e-6) < total_frames:
+            seconds.append(second)
+            second += self.frame_interval
+        # 原图由子进程直接写盘，只把缩小后的内存副本传回
+        frames_dir = self.frames_output_dir if self.persist_frames else None
+        kept, stats = decode_sharded(self.video_path, seconds, fps, self.decode_shards,
+                                     seek_threshold=self.seek_threshold, frames_dir=frames_dir,
+                                     memory_max_side=self.memory_max_side)
+        self.decode_stats.update(stats)
+        self.decode_stats["saved"] = len(kept)
+        self._frame_buffer.extend(kept)
+        print(f"分 {stats['shards']} 段并行解码，保留 {len(kept)} 帧")
+
+    def demux(self):
+        """单次解封装：抽样帧保存在 self.frames（并写入 frames 目录），16 kHz 单声道音频写入 audio.wav"""
+        self.decode_stats = {"mode": "demux", "decoded": 0, "seeks": 0, "saved": 0}
+        self._frame_buffer = []
+        start = time.perf_counter()
+        result = demux_video(self.video_path, self.frame_interval, self.audio_output_path)
+        for second, frame in zip(result.timestamps, result.frames):
+            self._keep_frame(second, frame)
+        self._finish_frames()
+        self.decode_stats["elapsed"] = time.perf_counter() - start
+
+        print(f"视频总时长: {result.duration:.2f} 秒")
+        print(f"共提取 {self.decode_stats['saved']} 帧图像（保存目录：{self.frames_output_dir}）")
+        if result.audio_path:
+            self.audio_sample_rate = result.sample_rate
+            print(f"音频已保存至 {self.audio_output_path}（{result.sample_rate} Hz 单声道）")
+            self.compact_audio()
+        else:
+            print("视频中没有音轨，跳过音频提取")
+        return result
 
     def extract_audio(self):
-        """提取音频到 task_{序号}/audio.wav"""
+        """提取音频到 task_{序号}/audio.wav：统一为 16 kHz 单声道，转写和 wav2vec2 都不再需要重采样"""
         try:
             clip = VideoFileClip(self.video_path)
-            clip.audio.write_audiofile(self.audio_output_path, codec='pcm_s16le')
-            print(f"音频已保存至 {self.audio_output_path}")
+            clip.audio.write_audiofile(self.audio_output_path, fps=AUDIO_SAMPLE_RATE, codec='pcm_s16le',
+                                       ffmpeg_params=["-ac", "1"])
+            self.audio_sample_rate = AUDIO_SAMPLE_RATE
+            print(f"音频已保存至 {self.audio_output_path}（{AUDIO_SAMPLE_RATE} Hz 单声道）")
         except Exception as e:
             print(f"提取音频失败: {e}")
+            return
+        self.compact_audio()
+
+    def compact_audio(self):
+        """vad 开启时把 audio.wav 中的长静音缩短，写入 audio_speech.wav 和时间偏移表"""
+        if not self.vad or not os.path.exists(self.audio_output_path):
+            return None
+        try:
+            result = compact_silence(self.audio_output_path, self.speech_output_path)
+        except Exception as e:
+            print(f"静音压缩失败，转写使用完整音频: {e}")
+            return None
+        atomic_write_json(self.offsets_output_path, result)
+        ratio = result["compact_seconds"] / result["original_seconds"] if result["original_seconds"] else 1
+        print(f"静音压缩：{result['original_seconds']:.1f} 秒 -> {result['compact_seconds']:.1f} 秒（{ratio:.0%}）")
+        return result
+
+    @property
+    def speech_audio_path(self):
+        """转写和辅助模型使用的音频：vad 开启且压缩成功时为 audio_speech.wav，否则为 audio.wav"""
+        if self.vad and os.path.exists(self.speech_output_path):
+            return self.speech_output_path
+        return self.audio_output_path
 
     def audio_to_text(self) -> str | None:
-        """语音转写并保存到 task_{序号}/transcript.txt"""
-        try:
-            api = RequestApi(
-                appid=self.appid,
-                secret_key=self.secret_key,
-                upload_file_path=self.audio_output_path,
-            )
-            transcribed_text = api.get_result()
-
-            if transcribed_text is not None:
-                with open(self.text_output_path, "w", encoding="utf-8") as f:
-                    f.write(transcribed_text)
-                print(f"转写文本已保存到 {self.text_output_path}")
-                return transcribed_text
-            else:
-                print("讯飞 API 未返回有效转写文本")
-                return None
+        """语音转写并保存到 task_{序号}/transcript.txt（同步版本，在线程中运行）"""
+        audio_path = self.speech_audio_path
+        key, cached = self._lookup_transcript(audio_path)
+        if cached:
+            return self._save_transcript(*cached)
+        try:
+            transcribed_text, segments = self.asr_client.transcribe_segments_sync(audio_path)
         except Exception as e:
-            print(f"请求讯飞 API 失败: {e}")
+            print(f"请求语音转写服务失败: {e}")
             return None
+        self._store_transcript(key, transcribed_text, segments)
+        return self._save_transcript(transcribed_text, segments)
 
-    def run_pipeline(self):
-        """运行完整处理流程"""
-        print(f"开始处理视频（任务序号：{self.sequence}）...")
-        print(f"所有结果将保存至：{self.task_dir}\n")
+    async def audio_to_text_async(self) -> str | None:
+        """语音转写的协程版本：等待转写结果期间不占用线程"""
+        audio_path = self.speech_audio_path
+        key, cached = await asyncio.to_thread(self._lookup_transcript, audio_path)
+        if cached:
+            return self._save_transcript(*cached)
+        try:
+            transcribed_text, segments = await self.asr_client.transcribe_segments(audio_path)
+        except Exception as e:
+            print(f"请求语音转写服务失败: {e}")
+            return None
+        self._store_transcript(key, transcribed_text, segments)
+        return self._save_transcript(transcribed_text, segments)
 
-        print("[1/3] 正在提取视频帧...")
-        self.extract_frames()
+    def _lookup_transcript(self, audio_path):
+        """
+        按音频 PCM 数据的哈希查找转写缓存，返回 (缓存键, (文本, 分段) 或 None)。
+        键同时包含转写客户端类型和接口地址，模拟服务的结果不会当作讯飞的结果复用。
+        """
+        if self.transcript_cache is None or not os.path.exists(audio_path):
+            return None, None
+        try:
+            key = params_digest({
+                "pcm": pcm_digest(audio_path),
+                "client": type(self.asr_client).__name__,
+                "host": getattr(self.asr_client, "host", None),
+            }, length=40)
+        except Exception as e:
+            print(f"计算音频指纹失败，跳过转写缓存: {e}")
+            return None, None
+        files = self.transcript_cache.get(key, ("transcript.txt", "segments.json"))
+        if files is None:
+            return key, None
+        print(f"转写缓存命中（{key[:12]}），跳过语音转写服务")
+        return key, (files["transcript.txt"].decode("utf-8"), json.loads(files["segments.json"]))
 
-        print("\n[2/3] 正在提取音频...")
-        self.extract_audio()
+    def _store_transcript(self, key, transcribed_text, segments):
+        if key is None or transcribed_text is None:
+            return
+        try:
+            # 分段保存转写音频上的原始时间，命中时再按本任务的偏移表还原
+            self.transcript_cache.put(key, {
+                "transcript.txt": transcribed_text.encode("utf-8"),
+                "segments.json": json.dumps(segments, ensure_ascii=False).encode("utf-8"),
+            })
+        except Exception as e:
+            print(f"写入转写缓存失败: {e}")
 
-        print("\n[3/3] 正在进行语音识别...")
-        text_result = self.audio_to_text()
-        
+    def _save_transcript(self, transcribed_text, segments=None):
+        if transcribed_text is not None:
+            # 先写时间索引再写文本：transcript.txt 存在即表示 asr 阶段完成
+            if segments:
+                self._save_segment_index(segments)
+            atomic_write_text(self.text_output_path, transcribed_text)
+            print(f"转写文本已保存到 {self.text_output_path}")
+            return transcribed_text
+        print("语音转写服务未返回有效转写文本")
+        return None
+
+    def _save_segment_index(self, segments):
+        offsets = None
+        if self.speech_audio_path == self.speech_output_path and os.path.exists(self.offsets_output_path):
+            with open(self.offsets_output_path, "r", encoding="utf-8") as f:
+                offsets = json.load(f)["offsets"]
+        try:
+            SegmentIndex.from_segments(segments, offsets).save(self.segments_output_path)
+            print(f"转写时间索引已保存到 {self.segments_output_path}（{len(segments)} 句）")
+        except Exception as e:
+            print(f"保存转写时间索引失败: {e}")
+
+    def load_segment_index(self):
+        """读取转写时间索引（SegmentIndex），转写服务没有返回时间信息时返回 None"""
+        if not os.path.exists(self.segments_output_path):
+            return None
+        return SegmentIndex.load(self.segments_output_path)
+
+    def normalize_input(self):
+        """把 self.video_path 换成规范化后的文件，失败时继续使用原文件"""
+        try:
+            self.video_path = normalize_video(self.source_path)
+        except Exception as e:
+            print(f"视频规范化失败，继续使用原文件: {e}")
+        return self.video_path
+
+    def _demux_or_fallback(self):
+        try:
+            return self.demux()
+        except Exception as e:
+            print(f"单次解封装失败，改为分别抽帧和提取音频: {e}")
+            self.extract_frames()
+            self.extract_audio()
+
+    def _use_single_pass(self, decoded):
+        """
+        single_pass 缺省时：转写已缓存则语音识别不依赖音频提取，两条支路并发没有收益，
+        只读取一次容器即可同时得到帧和音频；否则保留“提取音频 → 语音识别”与抽帧的并发。
+        """
+        if self.single_pass is not None:
+            return self.single_pass
+        return (self.use_cache and not decoded
+                and "asr" in self.manifest["artifacts"] and self._artifact_exists("asr"))
+
+    def build_stage_graph(self, asynchronous=False):
+        """
+        构建处理阶段依赖图：语音识别只依赖音频，可与抽帧并发。
+        asynchronous 为 True 时语音识别使用协程版本，供 StageGraph.arun 使用。
+        """
+        graph = StageGraph(heartbeat=self._refresh_task_lock if self.use_cache else None,
+                           heartbeat_seconds=TASK_LOCK_REFRESH_SECONDS)
+        asr = self._cached_stage("asr", self.audio_to_text_async if asynchronous else self.audio_to_text)
+        # 抽帧和音频都已缓存时不需要读取视频，也就不必规范化
+        decoded = self.use_cache and all(a in self.manifest["artifacts"] for a in ("frames", "audio"))
+        deps = ()
+        if self.normalize and not decoded:
+            graph.add_stage("normalize", self.normalize_input)
+            deps = ("normalize",)
+        if self._use_single_pass(decoded):
+            graph.add_stage("demux", self._cached_stage("demux", self._demux_or_fallback), deps=deps)
+            graph.add_stage("asr", asr, deps=("demux",))
+        else:
+            graph.add_stage("frames", self._cached_stage("frames", self.extract_frames), deps=deps)
+            graph.add_stage("audio", self._cached_stage("audio", self.extract_audio), deps=deps)
+            graph.add_stage("asr", asr, deps=("audio",))
+        return graph
+
+    @staticmethod
+    def _print_stage_event(stage, status, elapsed):
+        if status == "started":
+            print(f"[{stage}] 开始")
+        elif status == "skipped":
+            print(f"[{stage}] 上游阶段失败，已跳过")
+        else:
+            print(f"[{stage}] {'完成' if status == 'finished' else '失败'}，耗时 {elapsed:.2f} 秒")
+
+    def run_pipeline(self, on_event=None):
+        """
+        运行完整处理流程。各阶段按依赖图并发执行，耗时记录在 self.stage_timings。
+
+        Args:
+            on_event (callable, optional): 阶段事件回调 on_event(stage, status, elapsed)，
+                                           缺省时打印到控制台。
+        """
+        self._print_pipeline_start()
+        self.cache_hits = []
+        graph = self.build_stage_graph()
+        if self.use_cache:
+            self._acquire_task_lock()
+        try:
+            results = graph.run(on_event=on_event or self._print_stage_event)
+            if self.use_cache:
+                self._refresh_task_lock()
+            # 帧写盘与语音识别并行进行，到这里通常早已完成
+            self.flush_frames()
+        finally:
+            self.stage_timings = dict(graph.timings)
+            if self.use_cache:
+                self._release_task_lock()
+        self._print_pipeline_summary(results.get("asr"))
+
+    async def run_pipeline_async(self, on_event=None):
+        """
+        run_pipeline 的协程版本：抽帧、音频提取等 CPU/IO 阶段在线程中执行，
+        语音转写在事件循环中等待，一个 worker 可以同时处理多个面试的转写。
+        """
+        self._print_pipeline_start()
+        self.cache_hits = []
+        graph = self.build_stage_graph(asynchronous=True)
+        if self.use_cache:
+            await asyncio.to_thread(self._acquire_task_lock)
+        try:
+            results = await graph.arun(on_event=on_event or self._print_stage_event)
+            if self.use_cache:
+                self._refresh_task_lock()
+            await asyncio.to_thread(self.flush_frames)
+        finally:
+            self.stage_timings = dict(graph.timings)
+            if self.use_cache:
+                self._release_task_lock()
+        self._print_pipeline_summary(results.get("asr"))
+
+    def _print_pipeline_start(self):
+        print(f"开始处理视频（任务 ID：{self.task_id}）...")
+        print(f"所有结果将保存至：{self.task_dir}\n")
+
+    def _print_pipeline_summary(self, text_result):
+        timings = "，".join(f"{name} {seconds:.2f}s" for name, seconds in self.stage_timings.items())
+        print(f"\n阶段耗时：{timings}")
+        if self.transcript_cache is not None:
+            print(f"转写缓存：命中 {self.transcript_cache.hits} 次，未命中 {self.transcript_cache.misses} 次（进程内累计）")
         if text_result:
             print(f"\n✅ 所有任务已完成！结果汇总：")
             print(f" - 任务根目录：{self.task_dir}")
             print(f" - 音频文件：{self.audio_output_path}")
             print(f" - 帧图像目录：{self.frames_output_dir}")
             print(f" - 转写文本：{self.text_output_path}")
+            if os.path.exists(self.segments_output_path):
+                print(f" - 转写时间索引：{self.segments_output_path}")
         else:
             print("\n⚠️ 视频处理完成，但语音转写失败或未返回结果。")
 
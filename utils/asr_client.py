@@ -0,0 +1,87 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+from config.pipeline_config import ASR_CONFIG
+from .xf_api import RequestApi, result_segments
+
+
+class AsrClient(ABC):
+    """
+    语音转写客户端接口。transcribe 是协程：等待服务端处理期间不占用线程，
+    一个 worker 可以同时进行多路转写。脚本中可使用同步包装 transcribe_sync。
+    """
+
+    @abstractmethod
+    async def transcribe(self, audio_path):
+        """转写音频文件，返回文本；服务端失败或没有结果时返回 None"""
+
+    async def transcribe_segments(self, audio_path):
+        """
+        转写并返回 (文本, 逐句分段)，分段格式见 xf_api.parse_order_segments。
+        不提供时间信息的实现只需实现 transcribe，分段为 None。
+        """
+        return await self.transcribe(audio_path), None
+
+    def transcribe_sync(self, audio_path):
+        """同步包装：在没有运行中事件循环的线程（脚本、线程池中的阶段函数）里调用"""
+        return asyncio.run(self.transcribe(audio_path))
+
+    def transcribe_segments_sync(self, audio_path):
+        return asyncio.run(self.transcribe_segments(audio_path))
+
+
+class XfyunAsrClient(AsrClient):
+    """
+    讯飞录音文件转写（长音频）的异步实现。上传和轮询委托给 RequestApi.fetch_order_result
+    （共享 keep-alive 会话，轮询节奏见 xf_api.poll_delays），这里只负责解析结果。
+    """
+
+    def __init__(self, appid, secret_key, config=None, host=None):
+        self.appid = appid
+        self.secret_key = secret_key
+        self.config = config or ASR_CONFIG
+        self.host = host or self.config["host"]
+        # 最近一次 transcribe 的轮询统计
+        self.poll_stats = {}
+
+    async def transcribe(self, audio_path):
+        text, _ = await self.transcribe_segments(audio_path)
+        return text
+
+    async def transcribe_segments(self, audio_path):
+        api = RequestApi(appid=self.appid, secret_key=self.secret_key,
+                         upload_file_path=audio_path, config=self.config, host=self.host)
+        result = await api.fetch_order_result()
+        self.poll_stats = api.poll_stats
+        if result is None:
+            return None, None
+        segments = result_segments(result)
+        if segments is None:
+            return None, None
+        return "\n".join(segment["text"] for segment in segments), segments
+
+
+def _standin_client(appid, secret_key, config):
+    """本地模拟服务与讯飞协议相同，只替换接口地址；未配置账号时使用占位凭据"""
+    return XfyunAsrClient(appid or "standin", secret_key or "standin", config=config, host=config["standin_host"])
+
+
+# 提供方名称 -> 工厂函数 factory(appid, secret_key, config)
+ASR_PROVIDERS = {
+    "xfyun": lambda appid, secret_key, config: XfyunAsrClient(appid, secret_key, config=config),
+    "standin": _standin_client,
+}
+
+
+def register_asr_provider(name, factory):
+    """注册新的转写服务提供方，factory(appid, secret_key, config) 返回 AsrClient"""
+    ASR_PROVIDERS[name] = factory
+
+
+def make_asr_client(appid=None, secret_key=None, config=None, provider=None):
+    """按配置（ASR_CONFIG["provider"]）创建转写客户端"""
+    config = config or ASR_CONFIG
+    provider = provider or config["provider"]
+    if provider not in ASR_PROVIDERS:
+        raise ValueError(f"未知的语音转写服务提供方: {provider}（可选：{', '.join(ASR_PROVIDERS)}）")
+    return ASR_PROVIDERS[provider](appid, secret_key, config)
@@ -0,0 +1,118 @@
+"""
+本地模拟的录音文件转写服务：接口路径、参数、返回结构与讯飞 raasr v2 相同
+（/v2/api/upload 与 /v2/api/getResult，orderResult 为 lattice / json_1best 结构的 JSON 字符串），
+处理耗时按音频时长模拟。用于压测和没有讯飞账号的开发/CI 环境，不校验签名。
+
+启动（在项目根目录执行），并把 ASR_CONFIG["provider"] 设为 "standin"：
+    python -m utils.asr_standin --port 8765
+"""
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import uuid
+import wave
+
+from fastapi import FastAPI, Request
+
+from config.pipeline_config import ASR_STANDIN_CONFIG
+
+# 模拟转写结果使用的句子，按顺序循环
+SAMPLE_SENTENCES = [
+    "您好，我叫张三，毕业于计算机科学与技术专业。",
+    "我在上一家公司主要负责后端服务的开发和维护。",
+    "项目中使用 Python 和 FastAPI 搭建接口，数据库用的是 MySQL。",
+    "遇到性能问题时，我会先定位瓶颈，再考虑缓存和异步处理。",
+    "我平时也会关注开源社区，学习新的技术和工程实践。",
+]
+
+
+def _wav_duration(data):
+    try:
+        with wave.open(io.BytesIO(data), "rb") as f:
+            return f.getnframes() / float(f.getframerate())
+    except (wave.Error, EOFError):
+        # 不是 WAV：按 16 kHz 16 位单声道估算
+        return len(data) / 32000.0
+
+
+def build_order_result(duration, sentence_seconds):
+    """按音频时长生成 lattice 结构的转写结果（JSON 字符串），每句带起止时间（毫秒）"""
+    lattice = []
+    count = max(1, int(duration // sentence_seconds))
+    for i in range(count):
+        sentence = SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]
+        bg = int(i * sentence_seconds * 1000)
+        ed = int(min(duration, (i + 1) * sentence_seconds) * 1000)
+        # 逐字作为一个词，与讯飞 json_1best 的 st.rt[].ws[].cw[] 层级一致
+        words = [{"wb": j, "we": j + 1, "cw": [{"w": ch, "wp": "n"}]} for j, ch in enumerate(sentence)]
+        best = {"st": {"bg": str(bg), "ed": str(ed), "rl": "0", "rt": [{"ws": words}]}}
+        lattice.append({"json_1best": json.dumps(best, ensure_ascii=False)})
+    return json.dumps({"lattice": lattice, "lattice2": []}, ensure_ascii=False)
+
+
+def create_app(config=None):
+    config = config or ASR_STANDIN_CONFIG
+    app = FastAPI(title="ASR stand-in", description="本地模拟的录音文件转写服务")
+    orders = {}
+    lock = threading.Lock()
+
+    @app.post("/v2/api/upload")
+    async def upload(request: Request):
+        data = await request.body()
+        duration = _wav_duration(data)
+        processing = config["base_seconds"] + config["ratio"] * duration
+        processing *= 1 + random.uniform(-config["jitter"], config["jitter"])
+        order_id = "DKHJQ" + uuid.uuid4().hex[:20]
+        with lock:
+            # 清理一小时前的订单，长时间压测时内存不会持续增长
+            expired = [key for key, order in orders.items() if order["ready_at"] < time.time() - 3600]
+            for key in expired:
+                del orders[key]
+            orders[order_id] = {
+                "ready_at": time.time() + processing,
+                "duration": duration,
+                "failed": random.random() < config["fail_rate"],
+            }
+        return {
+            "code": "000000",
+            "descInfo": "success",
+            "content": {"orderId": order_id, "taskEstimateTime": int(processing * 1000)},
+        }
+
+    @app.post("/v2/api/getResult")
+    async def get_result(orderId: str):
+        with lock:
+            order = orders.get(orderId)
+        if order is None:
+            return {"code": "26620", "descInfo": "订单不存在", "content": None}
+        order_info = {"orderId": orderId, "failType": 0, "status": 3,
+                      "originalDuration": int(order["duration"] * 1000), "realDuration": int(order["duration"] * 1000)}
+        content = {"orderInfo": order_info, "orderResult": "", "taskEstimateTime": 0}
+        remaining = order["ready_at"] - time.time()
+        if remaining > 0:
+            content["taskEstimateTime"] = int(remaining * 1000)
+        elif order["failed"]:
+            order_info.update(status=-1, failType=99)
+        else:
+            order_info["status"] = 4
+            content["orderResult"] = build_order_result(order["duration"], config["sentence_seconds"])
+        return {"code": "000000", "descInfo": "success", "content": content}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="本地模拟的录音文件转写服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,87 @@
 import wave
 import os
+import struct
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# 流式写入时 RIFF/data 长度的占位值：按“长度未知、读到文件末尾为止”处理，close 时改为真实长度
+_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+class StreamingWavWriter:
+    """
+    流式 WAV 写入器：打开时先写 44 字节文件头，PCM 数据到达后直接追加，close 时回填 RIFF 和 data 长度。
+    不需要临时 PCM 文件，也不需要再整体读回内存转换；写入过程中其他客户端即可开始读取文件。
+
+    用法：
+        with StreamingWavWriter(path) as writer:
+            writer.write(pcm_bytes)
+    """
+
+    def __init__(self, path, sample_rate=16000, channels=1, sample_width=2):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.data_bytes = 0
+        self._pending = b""  # 不足一个采样帧的尾部字节，等下一块数据补齐
+        target_dir = os.path.dirname(path)
+        if target_dir and not os.path.exists(target_dir):
+            os.makedirs(target_dir, exist_ok=True)
+        self._file = open(path, "wb")
+        self._write_header(_UNKNOWN_SIZE, _UNKNOWN_SIZE)
+        self._file.flush()
+
+    def _write_header(self, riff_size, data_size):
+        block_align = self.channels * self.sample_width
+        self._file.write(struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", riff_size, b"WAVE",
+            b"fmt ", 16, 1, self.channels, self.sample_rate,
+            self.sample_rate * block_align, block_align, self.sample_width * 8,
+            b"data", data_size,
+        ))
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def write(self, data):
+        """追加 PCM 数据并立即 flush，只写入完整的采样帧"""
+        data = self._pending + data
+        frame_size = self.channels * self.sample_width
+        usable = len(data) - len(data) % frame_size
+        self._pending = data[usable:]
+        if usable:
+            self._file.write(data[:usable])
+            self._file.flush()
+            self.data_bytes += usable
+
+    def close(self):
+        """回填文件头中的长度并关闭文件，丢弃不完整的尾部字节"""
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._write_header(36 + self.data_bytes, self.data_bytes)
+        self._file.close()
+
+    def abort(self):
+        """放弃写入：关闭并删除文件"""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
 def pcm_to_wav(pcm_path, output_path=None):
     """
     将PCM文件转换为WAV文件。
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import wave
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 流式哈希每次读取 1 MB，避免大文件整体载入内存
+
+
+def file_digest(path, algorithm="sha256", chunk_size=HASH_CHUNK_SIZE):
+    """流式计算文件内容的哈希（十六进制字符串）"""
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def pcm_digest(path, algorithm="sha256", chunk_frames=HASH_CHUNK_SIZE // 2):
+    """
+    WAV 中 PCM 数据（连同采样率、声道数、位宽）的哈希，不包含文件头的其他字段，
+    同一段音频无论文件名、写入工具如何都得到相同结果。
+    """
+    hasher = hashlib.new(algorithm)
+    with wave.open(path, "rb") as f:
+        hasher.update(f"{f.getframerate()}:{f.getnchannels()}:{f.getsampwidth()}:".encode("ascii"))
+        for chunk in iter(lambda: f.readframes(chunk_frames), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def params_digest(params, length=8):
+    """处理参数字典的短哈希，用于区分同一内容在不同参数下的产物"""
+    encoded = json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:length]
+
+
+def atomic_write_bytes(path, data):
+    """先写同目录临时文件再 os.replace，读者不会看到写了一半的文件"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_text(path, text, encoding="utf-8"):
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def atomic_write_json(path, obj):
+    atomic_write_text(path, json.dumps(obj, ensure_ascii=False, indent=2))
+
+
+class DiskLRUCache:
+    """
+    磁盘上按总大小淘汰的键值缓存：每个条目是 root 下以键命名的目录，可包含多个文件。
+    读取时刷新目录的修改时间，超过 max_bytes 时从最久未使用的条目开始删除。
+    条目先写到临时目录再整体 rename，多个进程共享同一目录也不会读到写了一半的条目。
+    hits / misses 为本进程内的命中和未命中次数。pin 过的条目不会被淘汰，也不计入 max_bytes。
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.pinned = set()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def pin(self, keys):
+        """固定条目（例如离线预先生成的内容），本进程淘汰时跳过"""
+        with self._lock:
+            self.pinned.update(keys)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key, names):
+        """读取条目中的文件，返回 {文件名: bytes}；条目不存在或不完整时返回 None"""
+        path = self._entry_dir(key)
+        try:
+            os.utime(path, None)
+            files = {}
+            for name in names:
+                with open(os.path.join(path, name), "rb") as f:
+                    files[name] = f.read()
+        except OSError:
+            # 不存在，或刚被其他进程淘汰
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return files
+
+    def path(self, key, name):
+        """条目中某个文件的路径（供直接读取或静态文件服务）；不存在时返回 None。同样计入命中统计"""
+        path = os.path.join(self._entry_dir(key), name)
+        try:
+            os.utime(self._entry_dir(key), None)
+            found = os.path.isfile(path)
+        except OSError:
+            found = False
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return path if found else None
+
+    def put(self, key, files):
+        """写入条目 {文件名: bytes}，已存在的条目保持不变"""
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=".tmp_")
+        try:
+            for name, data in files.items():
+                with open(os.path.join(tmp_dir, name), "wb") as f:
+                    f.write(data)
+            os.rename(tmp_dir, self._entry_dir(key))
+        except OSError:
+            # 其他进程已写入同一条目
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def put_file(self, key, name, src_path):
+        """
+        把已写好的文件移入条目（os.replace，不复制内容）。src_path 须与缓存目录在同一文件系统上；
+        条目已存在时删除 src_path，保留原条目。
+        """
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=".tmp_")
+        try:
+            os.replace(src_path, os.path.join(tmp_dir, name))
+            os.rename(tmp_dir, self._entry_dir(key))
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if os.path.exists(src_path):
+                os.remove(src_path)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                continue
+        return entries
+
+    def evict(self):
+        """删除最久未使用的条目，直到总大小不超过 max_bytes"""
+        with self._lock:
+            entries = sorted(e for e in self._entries() if os.path.basename(e[2]) not in self.pinned)
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def stats(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,146 @@
+import cv2
+import numpy as np
+
+from config.pipeline_config import FRAME_SELECTION_CONFIG
+
+_face_cascade = None
+_eye_cascade = None
+
+
+def _cascades():
+    """延迟加载 OpenCV 自带的 Haar 级联检测器（人脸 + 眼睛）"""
+    global _face_cascade, _eye_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        _eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
+    return _face_cascade, _eye_cascade
+
+
+def _thumbnail(frame, width):
+    """
+    得到用于打分的小尺寸 BGR 图。frame 可以是图片路径或 numpy 数组；
+    路径用 IMREAD_REDUCED_COLOR_4 读取，JPEG 在解码阶段直接按 1/4 缩放，开销很小。
+    """
+    if isinstance(frame, str):
+        image = cv2.imread(frame, cv2.IMREAD_REDUCED_COLOR_4)
+        if image is None:
+            raise FileNotFoundError(f"无法读取帧图像: {frame}")
+    else:
+        image = frame
+    height, w = image.shape[:2]
+    if w > width:
+        image = cv2.resize(image, (width, int(height * width / w)), interpolation=cv2.INTER_AREA)
+    return image
+
+
+def detect_faces(gray):
+    """在灰度图上检测人脸，返回 (x, y, w, h) 数组，按面积从大到小排序"""
+    face_cascade, _ = _cascades()
+    min_side = max(24, gray.shape[0] // 8)
+    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+    if len(faces) == 0:
+        return np.empty((0, 4), dtype=np.int32)
+    faces = np.asarray(faces)
+    return faces[np.argsort(-(faces[:, 2] * faces[:, 3]), kind="stable")]
+
+
+def score_frames(frames, config=None):
+    """
+    对每一帧计算质量分。
+
+    Args:
+        frames (list): 帧图像路径列表或 BGR numpy 数组列表（也可以是 N×H×W×3 数组）。
+    Returns:
+        dict: 各项指标数组（长度均为 N）：
+              sharpness（拉普拉斯方差）、face（是否有人脸）、eyes（是否检测到双眼）、
+              quality（加权后的综合质量分，0~1）和 histograms（N×B 的 HSV 直方图，用于多样性）。
+    """
+    config = config or FRAME_SELECTION_CONFIG
+    _, eye_cascade = _cascades()
+    count = len(frames)
+    sharpness = np.zeros(count, dtype=np.float64)
+    face = np.zeros(count, dtype=np.float64)
+    eyes = np.zeros(count, dtype=np.float64)
+    histograms = np.zeros((count, 16 * 8), dtype=np.float64)
+
+    for i, frame in enumerate(frames):
+        thumb = _thumbnail(frame, config["thumbnail_width"])
+        gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        sharpness[i] = cv2.Laplacian(gray, cv2.CV_64F).var()
+
+        faces = detect_faces(gray)
+        if len(faces):
+            face[i] = 1.0
+            x, y, w, h = faces[0]
+            # 只在人脸上半部分找眼睛：Haar 眼睛检测器对闭眼基本不响应
+            eye_roi = gray[y:y + h // 2, x:x + w]
+            detected = eye_cascade.detectMultiScale(eye_roi, scaleFactor=1.1, minNeighbors=4)
+            eyes[i] = 1.0 if len(detected) >= 2 else 0.5 if len(detected) == 1 else 0.0
+
+        hsv = cv2.cvtColor(thumb, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256]).ravel()
+        histograms[i] = hist / max(hist.sum(), 1.0)
+
+    # 清晰度跨度很大，取对数后按本批帧归一化到 0~1
+    log_sharpness = np.log1p(sharpness)
+    span = log_sharpness.max() - log_sharpness.min() if count else 0.0
+    sharpness_norm = (log_sharpness - log_sharpness.min()) / span if span > 0 else np.ones(count)
+
+    quality = (config["sharpness_weight"] * sharpness_norm
+               + config["face_weight"] * face
+               + config["eyes_weight"] * eyes)
+    return {
+        "sharpness": sharpness,
+        "face": face,
+        "eyes": eyes,
+        "quality": quality,
+        "histograms": histograms,
+    }
+
+
+def _rank_frames(scores, limit, diversity_weight):
+    """
+    贪心选帧：先取质量最高的一帧，之后每次选 (1-λ)·质量 + λ·与已选帧的最小直方图距离 最大的一帧。
+    结果是确定性的（并列时取序号小的），较小预算的选择是较大预算选择的前缀。
+    """
+    quality = scores["quality"]
+    count = len(quality)
+    if count == 0 or limit <= 0:
+        return []
+    # Hellinger 距离：sqrt(1 - Σ sqrt(p·q))，一次矩阵乘法算出全部帧两两距离
+    roots = np.sqrt(scores["histograms"])
+    distances = np.sqrt(np.clip(1.0 - roots @ roots.T, 0.0, 1.0))
+
+    order = [int(np.argmax(quality))]
+    min_distance = distances[order[0]].copy()
+    chosen = np.zeros(count, dtype=bool)
+    chosen[order[0]] = True
+    while len(order) < min(limit, count):
+        gain = (1 - diversity_weight) * quality + diversity_weight * min_distance
+        gain[chosen] = -np.inf
+        best = int(np.argmax(gain))
+        order.append(best)
+        chosen[best] = True
+        np.minimum(min_distance, distances[best], out=min_distance)
+    return order
+
+
+def select_frames(frames, k, config=None, scores=None):
+    """从 frames 中选出最多 k 帧，返回按时间顺序排列的帧序号列表"""
+    config = config or FRAME_SELECTION_CONFIG
+    scores = scores if scores is not None else score_frames(frames, config)
+    return sorted(_rank_frames(scores, k, config["diversity_weight"]))
+
+
+def select_for_consumers(frames, budgets=None, config=None):
+    """
+    只打分一次，按各消费者的帧预算分别选帧。
+
+    Returns:
+        dict: 消费者名称 -> 按时间顺序排列的帧序号列表。
+    """
+    config = config or FRAME_SELECTION_CONFIG
+    budgets = budgets or config["budgets"]
+    scores = score_frames(frames, config)
+    ranked = _rank_frames(scores, max(budgets.values(), default=0), config["diversity_weight"])
+    return {name: sorted(ranked[:budget]) for name, budget in budgets.items()}
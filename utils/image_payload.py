@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+
+from utils.frame_selection import detect_faces
+
+
+def face_centered_crop(image, height_factor=3.2, aspect=0.75):
+    """
+    以最大的人脸为中心裁出“头肩”区域，去掉大部分背景像素。
+
+    Args:
+        image: BGR numpy 数组。
+        height_factor (float): 裁剪框高度相对人脸高度的倍数。
+        aspect (float): 裁剪框宽高比（宽/高），默认 3:4 竖图。
+    Returns:
+        裁剪后的数组；没有检测到人脸时原样返回。
+    """
+    height, width = image.shape[:2]
+    # 在缩小的灰度图上检测，坐标再换算回原图
+    scale = min(1.0, 320 / width)
+    small = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA) if scale < 1 else image
+    faces = detect_faces(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+    if len(faces) == 0:
+        return image
+    x, y, w, h = (faces[0] / scale).astype(int)
+
+    crop_h = min(height, int(h * height_factor))
+    crop_w = min(width, int(crop_h * aspect))
+    # 人脸位于裁剪框上部三分之一附近，向下留出肩部和手势
+    center_x = x + w // 2
+    center_y = y + h // 2 + crop_h // 6
+    left = min(max(0, center_x - crop_w // 2), width - crop_w)
+    top = min(max(0, center_y - crop_h // 2), height - crop_h)
+    return image[top:top + crop_h, left:left + crop_w]
+
+
+def fit_to_budget(image, max_pixels, max_bytes, quality_steps=(85, 75, 65, 55), min_side=64):
+    """
+    把图片缩放并逐级降低 JPEG 质量，直到满足像素数和字节数上限。
+
+    Returns:
+        tuple[bytes, dict]: JPEG 字节和编码信息（width、height、quality、bytes）。
+                            实在无法满足字节上限时返回最小的一次编码结果。
+    """
+    height, width = image.shape[:2]
+    if width * height > max_pixels:
+        scale = (max_pixels / (width * height)) ** 0.5
+        image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    best = None
+    while True:
+        height, width = image.shape[:2]
+        for quality in quality_steps:
+            ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                continue
+            data = buffer.tobytes()
+            info = {"width": width, "height": height, "quality": quality, "bytes": len(data)}
+            if best is None or len(data) < len(best[0]):
+                best = (data, info)
+            if len(data) <= max_bytes:
+                return data, info
+        # 最低质量仍超出字节上限：再缩小 25% 重试
+        if min(width, height) * 0.75 < min_side:
+            return best
+        image = cv2.resize(image, (int(width * 0.75), int(height * 0.75)), interpolation=cv2.INTER_AREA)
+
+
+def format_timestamp(seconds):
+    """秒数格式化为 mm:ss"""
+    seconds = int(seconds)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def build_contact_sheet(images, labels, cols=3, cell_size=(384, 512), face_crop=True):
+    """
+    把多帧拼成一张带标注的网格图（联系表），每格左上角烧录序号和时间戳。
+
+    Args:
+        images (list): BGR numpy 数组列表，按时间顺序排列。
+        labels (list[str]): 每格的标注文字，例如 "#1 00:08"。
+        cols (int): 列数；行数按帧数向上取整。
+        cell_size (tuple): 每格的 (宽, 高)，默认 3:4 竖图。
+        face_crop (bool): 填入格子前是否先按人脸裁剪。
+    Returns:
+        tuple: (网格图数组, 行数, 列数)
+    """
+    cols = max(1, min(cols, len(images)))
+    rows = -(-len(images) // cols)
+    cell_w, cell_h = cell_size
+    sheet = np.full((rows * cell_h, cols * cell_w, 3), 32, dtype=np.uint8)
+
+    for index, (image, label) in enumerate(zip(images, labels)):
+        if face_crop:
+            image = face_centered_crop(image)
+        # 等比缩放后居中放入格子，空白处保留深灰底色
+        height, width = image.shape[:2]
+        scale = min(cell_w / width, cell_h / height)
+        new_w, new_h = max(1, int(width * scale)), max(1, int(height * scale))
+        resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        row, col = divmod(index, cols)
+        top = row * cell_h + (cell_h - new_h) // 2
+        left = col * cell_w + (cell_w - new_w) // 2
+        sheet[top:top + new_h, left:left + new_w] = resized
+
+        # 标注：黑底白字，位于格子左上角
+        origin_x, origin_y = col * cell_w, row * cell_h
+        (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+        cv2.rectangle(sheet, (origin_x, origin_y), (origin_x + text_w + 12, origin_y + text_h + baseline + 12), (0, 0, 0), -1)
+        cv2.putText(sheet, label, (origin_x + 6, origin_y + text_h + 6), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    return sheet, rows, cols
+
+
+def estimate_image_tokens(width, height, detail="high"):
+    """
+    按 OpenAI 兼容视觉接口常见的分块计费规则估算单张图片的 token 数：
+    先缩放到 2048×2048 以内，再把短边缩到 768，每个 512×512 分块 170 token，另加 85 基础 token。
+    各家实际计费会有差异，仅用于比较不同上传方式的相对成本。
+    """
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = -(-int(width) // 512) * -(-int(height) // 512)
+    return 85 + 170 * tiles
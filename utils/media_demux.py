@@ -0,0 +1,93 @@
+import subprocess
+import tempfile
+
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+# ASR（讯飞）与 wav2vec2 都要求 16 kHz 单声道
+AUDIO_SAMPLE_RATE = 16000
+
+
+class DemuxResult:
+    """单次解封装的输出：抽样帧（BGR uint8，形状 N×H×W×3）、对应秒数和音频文件"""
+
+    def __init__(self, frames, timestamps, audio_path, sample_rate, duration):
+        self.frames = frames
+        self.timestamps = timestamps
+        self.audio_path = audio_path
+        self.sample_rate = sample_rate
+        self.duration = duration
+
+
+def probe_video(video_path):
+    """读取容器头信息（不解码），返回 ffmpeg_parse_infos 的结果字典"""
+    return ffmpeg_parse_infos(video_path)
+
+
+def _frame_size(infos):
+    width, height = infos["video_size"]
+    # ffmpeg 输出时会按旋转元数据自动旋转画面
+    if infos.get("video_rotation", 0) in (90, 270):
+        width, height = height, width
+    return width, height
+
+
+def demux_video(video_path, frame_interval, audio_output_path, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    只读取一次容器，同时输出抽样帧和 16 kHz 单声道 PCM 音频。
+
+    一个 ffmpeg 进程带两个输出：音频转为 pcm_s16le 写入 audio_output_path，
+    视频经 select 过滤器只保留 frame_interval, 2*frame_interval, ... 秒处的帧，
+    以 bgr24 原始像素通过管道返回，仅被保留的帧做像素格式转换。
+
+    Returns:
+        DemuxResult: 没有音轨时 audio_path 为 None。
+    Raises:
+        FileNotFoundError: 视频中没有可用的视频流。
+        RuntimeError: ffmpeg 执行失败。
+    """
+    infos = probe_video(video_path)
+    if not infos.get("video_found"):
+        raise FileNotFoundError(f"视频中没有可用的视频流: {video_path}")
+    width, height = _frame_size(infos)
+    frame_bytes = width * height * 3
+
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-nostdin", "-i", video_path]
+    has_audio = bool(infos.get("audio_found"))
+    if has_audio:
+        cmd += ["-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(sample_rate),
+                "-c:a", "pcm_s16le", "-y", audio_output_path]
+    cmd += ["-map", "0:v:0", "-an",
+            "-vf", f"select='gte(t,{frame_interval}*(selected_n+1))'",
+            "-vsync", "vfr", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+
+    frames = []
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        try:
+            while True:
+                buf = proc.stdout.read(frame_bytes)
+                if len(buf) < frame_bytes:
+                    break
+                frames.append(np.frombuffer(buf, dtype=np.uint8).reshape(height, width, 3))
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            stderr_file.seek(0)
+            message = stderr_file.read().decode("utf-8", errors="ignore").strip()
+            raise RuntimeError(f"ffmpeg 解封装失败（返回码 {returncode}）: {message}")
+
+    if frames:
+        frames = np.stack(frames)
+    else:
+        frames = np.empty((0, height, width, 3), dtype=np.uint8)
+    timestamps = [frame_interval * (i + 1) for i in range(len(frames))]
+    return DemuxResult(
+        frames=frames,
+        timestamps=timestamps,
+        audio_path=audio_output_path if has_audio else None,
+        sample_rate=sample_rate,
+        duration=infos.get("duration") or 0,
+    )
@@ -0,0 +1,104 @@
+import os
+import re
+import subprocess
+import uuid
+
+from moviepy.config import FFMPEG_BINARY
+
+from config.pipeline_config import NORMALIZE_CONFIG
+
+
+def normalized_path(video_path, config=None):
+    """规范化后的文件与原文件放在同一目录：<原文件名>.norm.mp4"""
+    config = config or NORMALIZE_CONFIG
+    return video_path + config["suffix"]
+
+
+def probe_streams(video_path):
+    """
+    读取容器头（不解码），返回 {"video_codec": ..., "audio_codec": ..., "container": ...}，
+    没有对应流时值为 None。解析 ffmpeg -i 的输出，不依赖 ffprobe。
+    """
+    proc = subprocess.run([FFMPEG_BINARY, "-hide_banner", "-nostdin", "-i", video_path],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    output = proc.stderr.decode("utf-8", errors="ignore")
+    video = re.search(r"Stream #\S+.*?: Video: (\w+)", output)
+    audio = re.search(r"Stream #\S+.*?: Audio: (\w+)", output)
+    container = re.search(r"Input #0, ([\w,]+), from", output)
+    if container is None:
+        raise RuntimeError(f"无法读取视频文件: {video_path}")
+    return {
+        "video_codec": video.group(1) if video else None,
+        "audio_codec": audio.group(1) if audio else None,
+        "container": container.group(1),
+    }
+
+
+def keyframe_times(video_path):
+    """只解码关键帧（-skip_frame nokey），返回各关键帧的时间（秒）"""
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-nostdin", "-skip_frame", "nokey", "-i", video_path,
+           "-map", "0:v:0", "-vf", "showinfo", "-vsync", "0", "-f", "null", "-"]
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    output = proc.stderr.decode("utf-8", errors="ignore")
+    return [float(t) for t in re.findall(r"pts_time:([\d.]+)", output)]
+
+
+def _can_remux(video_path, streams, config):
+    """H.264 且关键帧足够密时只需重新封装视频流，否则需要转码"""
+    if streams["video_codec"] not in config["remux_video_codecs"]:
+        return False
+    times = keyframe_times(video_path)
+    if len(times) < 2:
+        return False
+    max_gap = max(b - a for a, b in zip(times, times[1:]))
+    return max_gap <= config["max_keyframe_gap"]
+
+
+def normalize_video(video_path, output_path=None, config=None):
+    """
+    把上传的视频规范化为可随机访问的 MP4：moov 前置（faststart）、固定关键帧间隔、
+    16 kHz 单声道 AAC 音轨。视频流能直接复用时只重新封装，否则用 libx264 转码。
+
+    结果缓存在原文件旁，原文件未变化时直接返回已有结果。
+
+    Returns:
+        str: 规范化后的文件路径。
+    Raises:
+        RuntimeError: ffmpeg 执行失败。
+    """
+    config = config or NORMALIZE_CONFIG
+    output_path = output_path or normalized_path(video_path, config)
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(video_path):
+        return output_path
+
+    streams = probe_streams(video_path)
+    if streams["video_codec"] is None:
+        raise RuntimeError(f"视频中没有可用的视频流: {video_path}")
+
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-nostdin", "-i", video_path, "-map", "0:v:0"]
+    if _can_remux(video_path, streams, config):
+        mode = "remux"
+        cmd += ["-c:v", "copy"]
+    else:
+        mode = "transcode"
+        interval = config["keyframe_interval"]
+        # 按时间强制关键帧，与源帧率无关；关闭场景切换插入的额外关键帧，间隔固定
+        cmd += ["-c:v", "libx264", "-preset", config["preset"], "-crf", str(config["crf"]),
+                "-pix_fmt", "yuv420p", "-force_key_frames", f"expr:gte(t,n_forced*{interval})",
+                "-sc_threshold", "0"]
+    if streams["audio_codec"] is not None:
+        cmd += ["-map", "0:a:0", "-c:a", "aac", "-b:a", config["audio_bitrate"],
+                "-ac", "1", "-ar", str(config["audio_sample_rate"])]
+    # 先写临时文件再原子替换，并发请求或中途失败都不会留下半成品
+    temp_path = f"{output_path}.{uuid.uuid4().hex[:8]}.tmp"
+    cmd += ["-movflags", "+faststart", "-f", "mp4", "-y", temp_path]
+
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        message = proc.stderr.decode("utf-8", errors="ignore").strip()
+        raise RuntimeError(f"视频规范化（{mode}）失败（返回码 {proc.returncode}）: {message}")
+    os.replace(temp_path, output_path)
+    print(f"视频已规范化（{mode}）: {output_path}")
+    return output_path
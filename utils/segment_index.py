@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+import numpy as np
+
+from .vad import to_original_time
+
+
+class SegmentIndex:
+    """
+    转写结果的时间索引：按列存储的句子和词（numpy 数组），与 transcript.txt 放在同一目录。
+
+    sentence_start / sentence_end: 每句起止时间（秒，原始音频时间轴）
+    sentence_words: 长度为句数 + 1 的偏移数组，第 i 句的词为 words[sentence_words[i]:sentence_words[i+1]]
+    word_text / word_start / word_end / word_punct: 每个词的文本、起止时间（秒）和是否为标点
+    """
+
+    def __init__(self, sentence_start, sentence_end, sentence_words, word_text, word_start, word_end, word_punct):
+        self.sentence_start = sentence_start
+        self.sentence_end = sentence_end
+        self.sentence_words = sentence_words
+        self.word_text = word_text
+        self.word_start = word_start
+        self.word_end = word_end
+        self.word_punct = word_punct
+
+    @classmethod
+    def from_segments(cls, segments, offsets=None):
+        """
+        由 xf_api.parse_order_segments 的结果构建。
+        offsets 为 vad.compact_silence 的时间偏移表：转写的是压缩静音后的音频时，把时间还原到原始时间轴。
+        """
+        remap = (lambda t: to_original_time(t, offsets)) if offsets else (lambda t: t)
+        words = [word for segment in segments for word in segment["words"]]
+        counts = [len(segment["words"]) for segment in segments]
+        return cls(
+            sentence_start=np.array([remap(s["start"]) for s in segments], dtype=np.float64),
+            sentence_end=np.array([remap(s["end"]) for s in segments], dtype=np.float64),
+            sentence_words=np.concatenate(([0], np.cumsum(counts, dtype=np.int64))).astype(np.int64),
+            word_text=np.array([w[0] for w in words], dtype=str),
+            word_start=np.array([remap(w[1]) for w in words], dtype=np.float64),
+            word_end=np.array([remap(w[2]) for w in words], dtype=np.float64),
+            word_punct=np.array([w[3] == "p" for w in words], dtype=bool),
+        )
+
+    def save(self, path):
+        """写入 .npz（先写临时文件再替换，读取方不会看到半个文件）"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, sentence_start=self.sentence_start, sentence_end=self.sentence_end,
+                         sentence_words=self.sentence_words, word_text=self.word_text,
+                         word_start=self.word_start, word_end=self.word_end, word_punct=self.word_punct)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    def __len__(self):
+        return len(self.sentence_start)
+
+    def sentence_text(self, i):
+        return "".join(self.word_text[self.sentence_words[i]:self.sentence_words[i + 1]])
+
+    def sentences_between(self, start, end):
+        """与时间窗 [start, end)（秒）有重叠的句子下标"""
+        return np.flatnonzero((self.sentence_start < end) & (self.sentence_end > start))
+
+    def text_between(self, start, end):
+        return "\n".join(self.sentence_text(i) for i in self.sentences_between(start, end))
+
+    def speech_rate(self, start=None, end=None):
+        """
+        时间窗内的语速（字/分钟）：按词的起止时间统计，不计标点，时长只算句子覆盖的发声时间。
+        不指定时间窗时统计全部转写内容。
+        """
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        chosen = (self.word_start >= start) & (self.word_end <= end) & ~self.word_punct
+        chars = sum(len(word) for word in self.word_text[chosen])
+        indices = self.sentences_between(start, end)
+        spoken = np.sum(np.minimum(self.sentence_end[indices], end) - np.maximum(self.sentence_start[indices], start))
+        return chars / spoken * 60 if spoken > 0 else 0.0
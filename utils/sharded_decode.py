@@ -0,0 +1,103 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+
+def available_cores():
+    """当前进程可用的 CPU 核数（考虑容器/taskset 的 CPU 亲和性限制）"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def split_shards(seconds, shards):
+    """把按时间排序的目标秒数切成至多 shards 段连续区间，各段数量尽量均衡"""
+    shards = max(1, min(shards, len(seconds)))
+    size = math.ceil(len(seconds) / shards) if seconds else 0
+    return [seconds[i:i + size] for i in range(0, len(seconds), size)] if size else []
+
+
+def _fit_max_side(frame, max_side):
+    height, width = frame.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def decode_shard(video_path, seconds, fps, seek_threshold, frames_dir=None, memory_max_side=1280):
+    """
+    在子进程中解码一个时间分片：先定位到分片的第一个目标帧，之后与 sparse 模式相同，
+    近的目标直接 grab 推进、远的目标重新定位。
+
+    Args:
+        seconds (list[int]): 本分片需要保留的秒数（升序）。
+        frames_dir (str, optional): 给定时在子进程内直接把原图写成 frame_{秒}s.jpg，
+                                    避免把全分辨率帧传回主进程。
+    Returns:
+        tuple: ([(秒, 缩小后的帧), ...], {"decoded": 解码帧数, "seeks": 定位次数})
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"无法打开视频文件: {video_path}")
+    seek_gap = max(1, int(seek_threshold * fps))
+    stats = {"decoded": 0, "seeks": 0}
+    kept = []
+    position = 0
+    can_seek = True
+    try:
+        for second in seconds:
+            target = math.ceil(second * fps - 1e-6)
+            if can_seek and target - position > seek_gap:
+                if cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                    stats["seeks"] += 1
+                    position = target
+                else:
+                    can_seek = False  # 容器不支持定位：本分片退化为顺序 grab
+            while position < target and cap.grab():
+                stats["decoded"] += 1
+                position += 1
+            ret, frame = cap.read()
+            if not ret:
+                break
+            stats["decoded"] += 1
+            position += 1
+            if frames_dir is not None:
+                path = os.path.join(frames_dir, f"frame_{second}s.jpg")
+                if not cv2.imwrite(path, frame):
+                    raise IOError(f"帧写入失败: {path}")
+            kept.append((second, _fit_max_side(frame, memory_max_side)))
+    finally:
+        cap.release()
+    return kept, stats
+
+
+def decode_sharded(video_path, seconds, fps, shards, seek_threshold=2.0, frames_dir=None, memory_max_side=1280):
+    """
+    把目标秒数按时间切成 shards 段，由进程池并行解码后按时间顺序合并。
+
+    Returns:
+        tuple: ([(秒, 帧), ...] 按时间排序, 合并后的解码统计（含实际分片数 shards）)
+    """
+    parts = split_shards(seconds, shards)
+    stats = {"decoded": 0, "seeks": 0, "shards": len(parts)}
+    if not parts:
+        return [], stats
+    kept = []
+    # 用 spawn 启动子进程：调用方是 uvicorn/torch/OpenCV 的多线程进程中的阶段线程，
+    # fork 会把其他线程持有的锁原样复制到子进程，可能导致死锁。decode_shard 必须保持为模块级函数
+    with ProcessPoolExecutor(max_workers=len(parts), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(decode_shard, video_path, part, fps, seek_threshold, frames_dir, memory_max_side)
+            for part in parts
+        ]
+        # 按提交顺序取结果，分片本身按时间排列，合并后自然有序
+        for future in futures:
+            shard_frames, shard_stats = future.result()
+            kept.extend(shard_frames)
+            stats["decoded"] += shard_stats["decoded"]
+            stats["seeks"] += shard_stats["seeks"]
+    return kept, stats
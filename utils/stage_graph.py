@@ -0,0 +1,157 @@
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class StageGraph:
+    """
+    处理阶段的依赖图：依赖已满足的阶段在线程池中并发执行，并记录每个阶段的耗时。
+
+    用法：
+        graph = StageGraph()
+        graph.add_stage("frames", extract_frames)
+        graph.add_stage("audio", extract_audio)
+        graph.add_stage("asr", audio_to_text, deps=("audio",))
+        results = graph.run()
+
+    某个阶段抛出异常时，依赖它的阶段会被跳过，其余阶段照常执行；
+    全部结束后重新抛出第一个异常。
+
+    在事件循环中使用 await graph.arun()：协程阶段直接 await，普通函数放到线程中执行。
+
+    给出 heartbeat 时，阶段执行期间每隔 heartbeat_seconds 调用一次 heartbeat()
+    （例如刷新任务锁文件的修改时间，表明持有者仍在工作）。
+    """
+
+    def __init__(self, max_workers=None, heartbeat=None, heartbeat_seconds=30):
+        self.max_workers = max_workers
+        self.heartbeat = heartbeat
+        self.heartbeat_seconds = heartbeat_seconds
+        self._stages = {}  # name -> (func, deps)
+        self.timings = {}
+        self.errors = {}
+
+    def add_stage(self, name, func, deps=()):
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"阶段 {name} 依赖的阶段 {dep} 尚未定义")
+        self._stages[name] = (func, tuple(deps))
+        return self
+
+    def _wait_timeout(self):
+        return self.heartbeat_seconds if self.heartbeat is not None else None
+
+    def _beat(self):
+        if self.heartbeat is not None:
+            self.heartbeat()
+
+    def run(self, on_event=None):
+        """
+        执行所有阶段。
+
+        Args:
+            on_event (callable, optional): on_event(stage, status, elapsed)，
+                status 为 "started" / "finished" / "failed" / "skipped"。
+        Returns:
+            dict: 阶段名 -> 阶段函数返回值。
+        """
+        def notify(stage, status, elapsed=None):
+            if on_event is not None:
+                on_event(stage, status, elapsed)
+
+        def execute(name, func):
+            start = time.perf_counter()
+            try:
+                return func()
+            finally:
+                self.timings[name] = time.perf_counter() - start
+
+        results = {}
+        self.timings = {}
+        self.errors = {}
+        pending = dict(self._stages)
+        running = {}
+        pipeline_start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(self._stages) or 1) as pool:
+            while pending or running:
+                for name, (func, deps) in list(pending.items()):
+                    if any(dep in self.errors for dep in deps):
+                        del pending[name]
+                        self.errors[name] = None  # 因上游失败被跳过
+                        notify(name, "skipped")
+                    elif all(dep in results for dep in deps):
+                        del pending[name]
+                        notify(name, "started")
+                        running[pool.submit(execute, name, func)] = name
+
+                if not running:
+                    break
+                done, _ = wait(running, timeout=self._wait_timeout(), return_when=FIRST_COMPLETED)
+                self._beat()
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        notify(name, "finished", self.timings[name])
+                    except Exception as e:
+                        self.errors[name] = e
+                        notify(name, "failed", self.timings[name])
+
+        self.timings["total"] = time.perf_counter() - pipeline_start
+        first_error = next((e for e in self.errors.values() if e is not None), None)
+        if first_error is not None:
+            raise first_error
+        return results
+
+    async def arun(self, on_event=None):
+        """run 的异步版本，参数和返回值相同；协程阶段（async def）在事件循环中执行，不占用线程"""
+        def notify(stage, status, elapsed=None):
+            if on_event is not None:
+                on_event(stage, status, elapsed)
+
+        async def execute(name, func):
+            start = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    return await func()
+                return await asyncio.to_thread(func)
+            finally:
+                self.timings[name] = time.perf_counter() - start
+
+        results = {}
+        self.timings = {}
+        self.errors = {}
+        pending = dict(self._stages)
+        running = {}
+        pipeline_start = time.perf_counter()
+
+        while pending or running:
+            for name, (func, deps) in list(pending.items()):
+                if any(dep in self.errors for dep in deps):
+                    del pending[name]
+                    self.errors[name] = None  # 因上游失败被跳过
+                    notify(name, "skipped")
+                elif all(dep in results for dep in deps):
+                    del pending[name]
+                    notify(name, "started")
+                    running[asyncio.ensure_future(execute(name, func))] = name
+
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, timeout=self._wait_timeout(), return_when=asyncio.FIRST_COMPLETED)
+            self._beat()
+            for task in done:
+                name = running.pop(task)
+                try:
+                    results[name] = task.result()
+                    notify(name, "finished", self.timings[name])
+                except Exception as e:
+                    self.errors[name] = e
+                    notify(name, "failed", self.timings[name])
+
+        self.timings["total"] = time.perf_counter() - pipeline_start
+        first_error = next((e for e in self.errors.values() if e is not None), None)
+        if first_error is not None:
+            raise first_error
+        return results
@@ -0,0 +1,111 @@
+import os
+import queue
+import re
+import subprocess
+import tempfile
+import threading
+
+from moviepy.config import FFMPEG_BINARY
+
+from .media_demux import AUDIO_SAMPLE_RATE
+
+
+class StreamingIngestor:
+    """
+    边上传边解封装：把陆续到达的视频字节写入 ffmpeg 的标准输入，
+    在上传过程中就完成抽帧和 16 kHz 单声道音频提取。
+
+    只适用于可流式读取的容器（浏览器 MediaRecorder 产生的 WebM / 分片 MP4 等）；
+    moov 位于文件末尾的普通 MP4 无法从前缀解析，ffmpeg 会报错，此时 finish() 抛出异常，
+    调用方照常在上传完成后处理整个文件即可。
+
+    抽帧规则与 media_demux.demux_video 相同：保留 frame_interval, 2*frame_interval, ... 秒处的帧，
+    写入 frames 目录，命名与 InterviewProcessor.frame_path 一致（frame_{秒}s.jpg）。
+    """
+
+    def __init__(self, work_dir, frame_interval, sample_rate=AUDIO_SAMPLE_RATE, max_queued_chunks=64):
+        self.work_dir = work_dir
+        self.frame_interval = frame_interval
+        self.frames_dir = os.path.join(work_dir, "frames")
+        self.audio_path = os.path.join(work_dir, "audio.wav")
+        os.makedirs(self.frames_dir, exist_ok=True)
+        self.error = None
+        self.bytes_fed = 0
+
+        cmd = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+               "-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(sample_rate),
+               "-c:a", "pcm_s16le", "-y", self.audio_path,
+               "-map", "0:v:0", "-an",
+               "-vf", f"select='gte(t,{frame_interval}*(selected_n+1))'",
+               "-vsync", "vfr", "-q:v", "2", "-start_number", "1", "-y",
+               os.path.join(self.frames_dir, "selected_%06d.jpg")]
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+        # 写 stdin 放在单独的线程里：ffmpeg 短暂处理不过来时上传请求不必等待，
+        # 队列满时 feed 阻塞，形成背压
+        self._queue = queue.Queue(maxsize=max_queued_chunks)
+        self._writer = threading.Thread(target=self._pump, daemon=True)
+        self._writer.start()
+
+    def _pump(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            if self.error is not None:
+                continue  # ffmpeg 已退出，丢弃剩余数据
+            try:
+                self._proc.stdin.write(data)
+            except (BrokenPipeError, OSError) as e:
+                self.error = f"ffmpeg 提前退出: {e}"
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+
+    def feed(self, data):
+        """追加一段按顺序到达的视频字节"""
+        if self.error is None:
+            self._queue.put(data)
+            self.bytes_fed += len(data)
+
+    def frames_ready(self):
+        """目前已解出的帧数，可用于上报进度"""
+        return sum(1 for name in os.listdir(self.frames_dir) if name.startswith("selected_"))
+
+    def finish(self):
+        """
+        输入结束：等待 ffmpeg 处理完剩余数据，把帧文件改名为 frame_{秒}s.jpg。
+
+        Returns:
+            tuple: (帧目录, 音频路径)
+        Raises:
+            RuntimeError: ffmpeg 无法处理该输入（容器不可流式读取、没有音轨等）。
+        """
+        self._queue.put(None)
+        self._writer.join()
+        returncode = self._proc.wait()
+        if returncode != 0 and self.error is None:
+            self._stderr.seek(0)
+            message = self._stderr.read().decode("utf-8", errors="ignore").strip()
+            self.error = f"ffmpeg 流式解封装失败（返回码 {returncode}）: {message}"
+        self._stderr.close()
+        if self.error is not None:
+            raise RuntimeError(self.error)
+
+        for name in os.listdir(self.frames_dir):
+            match = re.fullmatch(r"selected_(\d+)\.jpg", name)
+            if match:
+                second = self.frame_interval * int(match.group(1))
+                os.replace(os.path.join(self.frames_dir, name),
+                           os.path.join(self.frames_dir, f"frame_{second}s.jpg"))
+        return self.frames_dir, self.audio_path
+
+    def abort(self):
+        """放弃本次解封装（上传会话被取消或过期）"""
+        self.error = self.error or "已取消"
+        self._proc.kill()
+        self._queue.put(None)
+        self._writer.join()
+        self._proc.wait()
+        self._stderr.close()
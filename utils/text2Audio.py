@@ -28,6 +28,7 @@ from datetime import datetime
 from time import mktime
 import _thread as thread
 import os
+import re
 import logging # 引入logging模块
 
 # 配置日志
@@ -41,7 +42,7 @@ STATUS_LAST_FRAME = 2    # 最后一帧的标识
 
 class Ws_Param(object):
     # 初始化
-    def __init__(self, APPID, APIKey, APISecret, Text):
+    def __init__(self, APPID, APIKey, APISecret, Text, vcn="xiaoyan", aue="raw", auf="audio/L16;rate=16000"):
         self.APPID = APPID
         self.APIKey = APIKey
         self.APISecret = APISecret
@@ -50,7 +51,7 @@ class Ws_Param(object):
         # 公共参数(common)
         self.CommonArgs = {"app_id": self.APPID}
         # 业务参数(business)，更多个性化参数可在官网查看
-        self.BusinessArgs = {"aue": "raw", "auf": "audio/L16;rate=16000", "vcn": "xiaoyan", "tte": "utf8"}
+        self.BusinessArgs = {"aue": aue, "auf": auf, "vcn": vcn, "tte": "utf8"}
         self.Data = {"status": 2, "text": str(base64.b64encode(self.Text.encode('utf-8')), "UTF8")}
         #使用小语种须使用以下方式，此处的unicode指的是 utf16小端的编码方式，即"UTF-16LE"”
         #self.Data = {"status": 2, "text": str(base64.b64encode(self.Text.encode('utf-16')), "UTF8")}
@@ -139,6 +140,12 @@ def on_open(ws):
     thread.start_new_thread(run, ())
 
 
+def _sample_rate(ws_param):
+    """从业务参数 auf（如 audio/L16;rate=16000）中取出采样率"""
+    match = re.search(r"rate=(\d+)", ws_param.BusinessArgs.get("auf", ""))
+    return int(match.group(1)) if match else 16000
+
+
 # 全局变量，用于存储WebSocket连接和参数 (虽然在run_tts中重新定义，但保留以防其他地方使用)
 ws_app = None
 ws_param_global = None
@@ -147,12 +154,16 @@ def run_tts(text, output_filepath):
     # from config.voice_config import VOICE_CONFIG
     # 从您的配置中导入语音配置
     from config.voice_config import VOICE_CONFIG # 确保这个导入路径正确
-    from utils.audio_utils import pcm_to_wav # 确保这个导入路径正确
+    from utils.audio_utils import StreamingWavWriter # 确保这个导入路径正确
 
     class Ws_Param_Dynamic(Ws_Param):
         def __init__(self, APPID, APIKey, APISecret, Text, output_filepath):
-            super().__init__(APPID, APIKey, APISecret, Text)
+            super().__init__(APPID, APIKey, APISecret, Text,
+                             vcn=VOICE_CONFIG.get('TTS_VCN', 'xiaoyan'),
+                             aue=VOICE_CONFIG.get('TTS_AUE', 'raw'),
+                             auf=VOICE_CONFIG.get('TTS_AUF', 'audio/L16;rate=16000'))
             self.output_filepath = output_filepath # 存储目标WAV文件的完整路径
+            self.writer = None # 收到第一帧音频时创建的流式 WAV 写入器
 
     # --- 动态消息处理回调函数 ---
     def on_message_dynamic(ws, message):
@@ -160,40 +171,24 @@ def run_tts(text, output_filepath):
             message = json.loads(message)
             code = message["code"]
             sid = message["sid"]
-            audio = message["data"]["audio"]
-            audio = base64.b64decode(audio)
-            status = message["data"]["status"]
             # logging.debug(message) # 调试时可以打开
 
             if code != 0:
                 errMsg = message["message"]
                 logging.error("sid:%s call error:%s code is:%s" % (sid, errMsg, code))
+                ws.close()
             else:
-                # 确保输出目录存在
-                # os.path.dirname(ws.ws_param.output_filepath) 获取的是如 'e:\\...\\question_audio'
-                output_dir = os.path.dirname(ws.ws_param.output_filepath)
-                if not os.path.exists(output_dir):
-                    os.makedirs(output_dir)
-                    logging.info(f"创建目录: {output_dir}") # 记录目录创建
-
-                # PCM临时文件路径，例如 'e:\\...\\question_0_hash.pcm'
-                pcm_temp_path = ws.ws_param.output_filepath.replace('.wav', '.pcm')
-
-                with open(pcm_temp_path, 'ab') as f:
-                    f.write(audio)
+                audio = base64.b64decode(message["data"]["audio"])
+                status = message["data"]["status"]
+                # 音频帧直接追加到 WAV 文件：文件头先写好，结束时回填长度，不再经过临时 PCM 文件
+                if ws.ws_param.writer is None:
+                    ws.ws_param.writer = StreamingWavWriter(ws.ws_param.output_filepath, sample_rate=_sample_rate(ws.ws_param))
+                ws.ws_param.writer.write(audio)
 
                 if status == 2: # 最后一帧
-                    # logging.info("接收到最后一帧，即将关闭WebSocket并转换文件")
-                    ws.close() # 关闭WebSocket连接
-                    
-                    # 转换PCM到WAV
-                    pcm_to_wav(pcm_temp_path, output_path=ws.ws_param.output_filepath)
+                    ws.ws_param.writer.close()
                     logging.info(f"音频文件已保存到: {ws.ws_param.output_filepath}")
-                    
-                    # 删除临时PCM文件
-                    if os.path.exists(pcm_temp_path):
-                        os.remove(pcm_temp_path)
-                        logging.info(f"已删除临时PCM文件: {pcm_temp_path}")
+                    ws.close() # 关闭WebSocket连接
 
         except Exception as e:
             logging.error(f"receive msg, but parse exception: {e}", exc_info=True) # 打印详细堆栈信息
@@ -236,7 +231,14 @@ def run_tts(text, output_filepath):
     ws_app_instance.on_open = on_open_dynamic # 指定动态 on_open
 
     # 运行WebSocket连接，直到完成
-    ws_app_instance.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+    try:
+        ws_app_instance.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE})
+    finally:
+        # 没有收到最后一帧（服务端报错或连接中断）时删除不完整的文件
+        writer = ws_param_current_call.writer
+        if writer is not None and not writer.closed:
+            writer.abort()
+            logging.warning(f"语音合成未完成，已删除不完整的音频文件: {output_filepath}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,262 @@
+"""
+问题语音（TTS）缓存。离线预先合成整个题库（在项目根目录执行）：
+    python -m utils.tts_cache                   # 合成 config/question/*.txt 中的全部问题并写入清单
+    python -m utils.tts_cache --concurrency 8
+服务启动时 load_tts_manifest 读取清单并固定这些条目，题库中的问题不会被淘汰，请求时无需等待合成。
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config.pipeline_config import TTS_BATCH_CONFIG, TTS_CACHE_CONFIG
+from config.prompts import SELF_INTRODUCTION_QUESTION
+from config.voice_config import VOICE_CONFIG
+from utils.cache_utils import DiskLRUCache, atomic_write_json, params_digest
+from utils.text2Audio import run_tts
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 缓存条目中的音频文件名
+AUDIO_NAME = "audio.wav"
+# 预合成清单，位于缓存根目录
+MANIFEST_NAME = "manifest.json"
+# 不在题库文件中、但每次面试都会用到的问题（generate_questions 固定的第一题）
+PRESYNTH_EXTRA_TEXTS = [SELF_INTRODUCTION_QUESTION]
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+_rate_limiter = None
+
+
+class TokenBucket:
+    """
+    令牌桶限流：每秒补充 rate 个令牌，最多积累 capacity 个；acquire 在没有令牌时阻塞等待。
+    线程安全，多个合成线程共享同一个桶即可把请求速率限制在服务商的配额以内。
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_rate_limiter(config=None):
+    """进程内共享的 TTS 请求令牌桶（同一账号的配额按进程统一限制）"""
+    global _rate_limiter
+    config = config or TTS_BATCH_CONFIG
+    with _tts_cache_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucket(config["rate_per_second"], config["burst"])
+        return _rate_limiter
+
+
+def get_tts_cache(config=None):
+    """进程内共享的问题语音缓存（DiskLRUCache），目录见 TTS_CACHE_CONFIG"""
+    global _tts_cache
+    config = config or TTS_CACHE_CONFIG
+    with _tts_cache_lock:
+        if _tts_cache is None:
+            cache_dir = config["cache_dir"]
+            if not os.path.isabs(cache_dir):
+                cache_dir = os.path.join(PROJECT_ROOT, cache_dir)
+            _tts_cache = DiskLRUCache(cache_dir, config["max_bytes"])
+        return _tts_cache
+
+
+def voice_params(voice_config=None):
+    voice_config = voice_config or VOICE_CONFIG
+    return {
+        "vcn": voice_config.get("TTS_VCN", "xiaoyan"),
+        "aue": voice_config.get("TTS_AUE", "raw"),
+        "auf": voice_config.get("TTS_AUF", "audio/L16;rate=16000"),
+    }
+
+
+def tts_cache_key(text, voice_config=None):
+    """缓存键只由文本和合成参数（发音人、音频编码和格式）决定"""
+    return params_digest({"text": text, **voice_params(voice_config)}, length=40)
+
+
+def synthesize_cached(text, cache=None, rate_limiter=None):
+    """
+    返回 text 的语音文件路径：缓存命中时不建立 websocket 连接，未命中时调用 run_tts 合成后写入缓存。
+    传入 rate_limiter（TokenBucket）时，每次实际合成前先取得一个令牌，命中缓存不消耗令牌。
+
+    Raises:
+        RuntimeError: 语音合成没有产生音频文件。
+    """
+    cache = cache or get_tts_cache()
+    key = tts_cache_key(text)
+    path = cache.path(key, AUDIO_NAME)
+    if path:
+        logging.info(f"问题语音缓存命中: '{text[:20]}' -> {path}")
+        return path
+
+    # 合成到缓存根目录下的唯一临时文件，完成后整体移入缓存（并发合成同一问题也不会互相覆盖）
+    tmp_path = os.path.join(cache.root, f".tmp_{uuid.uuid4().hex}.wav")
+    try:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        run_tts(text, tmp_path)
+        if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+            raise RuntimeError(f"语音合成失败，未生成音频文件: '{text[:20]}'")
+        # 临时文件与缓存在同一目录下，直接 rename 进条目，不再读回内存复制一遍
+        cache.put_file(key, AUDIO_NAME, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    path = os.path.join(cache.root, key, AUDIO_NAME)
+    if not os.path.exists(path):
+        # 刚写入就被淘汰：max_bytes 小于单个音频文件
+        raise RuntimeError(f"问题语音缓存容量不足，无法保存: '{text[:20]}'")
+    return path
+
+
+def synthesize_iter(texts, max_concurrency=None, rate_limiter=None):
+    """
+    并发合成一组文本，按完成顺序逐个产出 (下标, 语音文件路径)，合成失败时路径为 None。
+
+    每个 run_tts 都阻塞在自己的 websocket 上，用线程池并发执行；
+    并发数不超过 max_concurrency，实际请求速率受共享令牌桶限制。重复的文本只合成一次。
+    """
+    max_concurrency = max_concurrency or TTS_BATCH_CONFIG["max_concurrency"]
+    rate_limiter = rate_limiter or get_rate_limiter()
+    cache = get_tts_cache()
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return
+
+    def synthesize(text):
+        try:
+            return synthesize_cached(text, cache=cache, rate_limiter=rate_limiter)
+        except Exception as e:
+            logging.error(f"问题 '{text}' 的语音合成失败: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(unique)), thread_name_prefix="tts") as pool:
+        futures = {pool.submit(synthesize, text): text for text in unique}
+        for future in as_completed(futures):
+            text = futures[future]
+            path = future.result()
+            for index, candidate in enumerate(texts):
+                if candidate == text:
+                    yield index, path
+
+
+def synthesize_batch(texts, max_concurrency=None, rate_limiter=None):
+    """并发合成一组文本，返回与 texts 一一对应的语音文件路径；整体耗时取决于最慢的一条"""
+    paths = [None] * len(texts)
+    for index, path in synthesize_iter(texts, max_concurrency=max_concurrency, rate_limiter=rate_limiter):
+        paths[index] = path
+    return paths
+
+
+def load_question_bank(pattern=None):
+    """读取题库文件中的全部问题（与 InterviewQuestionAgent 相同的去空白规则），去重并保持顺序"""
+    pattern = pattern or TTS_CACHE_CONFIG["question_bank"]
+    if not os.path.isabs(pattern):
+        pattern = os.path.join(PROJECT_ROOT, pattern)
+    texts = list(PRESYNTH_EXTRA_TEXTS)
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    return list(dict.fromkeys(texts))
+
+
+def presynthesize(texts, max_concurrency=None):
+    """
+    并发合成 texts 并写入清单（缓存键 -> 文本和相对缓存根目录的音频路径）。
+
+    Returns:
+        tuple: (清单条目字典, 合成失败的文本列表)
+    """
+    cache = get_tts_cache()
+    # 先固定，合成过程中写入的新条目不会挤掉题库中已合成的问题
+    cache.pin(tts_cache_key(text) for text in texts)
+    paths = synthesize_batch(texts, max_concurrency=max_concurrency)
+    entries = {}
+    failed = []
+    for text, path in zip(texts, paths):
+        if path:
+            entries[tts_cache_key(text)] = {"text": text, "path": os.path.relpath(path, cache.root)}
+        else:
+            failed.append(text)
+    atomic_write_json(os.path.join(cache.root, MANIFEST_NAME), {
+        "created_at": time.time(),
+        "voice": voice_params(),
+        "entries": entries,
+    })
+    return entries, failed
+
+
+def load_tts_manifest():
+    """
+    服务启动时调用：读取预合成清单并固定其中仍存在的条目。
+    发音人或音频格式与清单不一致时清单整体失效（缓存键不同），需要重新执行预合成。
+
+    Returns:
+        dict: 有效的清单条目，没有清单时为空字典。
+    """
+    cache = get_tts_cache()
+    manifest_path = os.path.join(cache.root, MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        logging.info("未找到问题语音预合成清单，题库问题将在请求时合成（python -m utils.tts_cache 可预先生成）")
+        return {}
+    except ValueError as e:
+        logging.warning(f"问题语音预合成清单无法解析: {e}")
+        return {}
+    if manifest.get("voice") != voice_params():
+        logging.warning("问题语音预合成清单的发音人或音频格式与当前配置不一致，请重新执行 python -m utils.tts_cache")
+        return {}
+    entries = {
+        key: entry for key, entry in manifest.get("entries", {}).items()
+        if os.path.exists(os.path.join(cache.root, entry["path"]))
+    }
+    cache.pin(entries)
+    logging.info(f"已加载问题语音预合成清单：{len(entries)}/{len(manifest.get('entries', {}))} 条可用")
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线预合成题库中全部问题的语音")
+    parser.add_argument("--questions", default=None, help="题库文件的 glob 模式，缺省为 TTS_CACHE_CONFIG['question_bank']")
+    parser.add_argument("--concurrency", type=int, default=None, help="并发合成数，缺省为 TTS_BATCH_CONFIG['max_concurrency']")
+    args = parser.parse_args()
+
+    texts = load_question_bank(args.questions)
+    logging.info(f"共 {len(texts)} 个问题，开始预合成...")
+    start = time.perf_counter()
+    entries, failed = presynthesize(texts, max_concurrency=args.concurrency)
+    stats = get_tts_cache().stats()
+    logging.info(f"预合成完成：{len(entries)} 个成功，{len(failed)} 个失败，耗时 {time.perf_counter() - start:.1f} 秒，"
+                 f"缓存命中 {stats['hits']} 次（已合成过的问题）")
+    for text in failed:
+        logging.warning(f"合成失败: {text}")
+
+
+if __name__ == "__main__":
+    main()
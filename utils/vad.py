@@ -0,0 +1,121 @@
+import bisect
+import wave
+
+import numpy as np
+
+from config.pipeline_config import VAD_CONFIG
+
+
+def read_pcm16(path):
+    """读取 16 位 PCM WAV，返回 (单声道 int16 数组, 采样率)；多声道时取平均"""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"只支持 16 位 PCM WAV: {path}")
+        channels = f.getnchannels()
+        sample_rate = f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+
+def write_pcm16(path, samples, sample_rate):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+
+
+def speech_mask(samples, sample_rate, config=None):
+    """
+    按短时能量判断每一帧是否有语音。阈值自适应：取能量的第 10 百分位作为底噪，
+    高于底噪 margin_db 且高于 min_db 的帧视为语音。
+
+    Returns:
+        tuple: (每帧是否为语音的布尔数组, 帧长（采样点数）)
+    """
+    config = config or VAD_CONFIG
+    frame_len = max(1, int(sample_rate * config["frame_ms"] / 1000))
+    count = len(samples) // frame_len
+    if count == 0:
+        return np.zeros(0, dtype=bool), frame_len
+    frames = samples[:count * frame_len].reshape(count, frame_len).astype(np.float32) / 32768.0
+    db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+    threshold = max(np.percentile(db, 10) + config["margin_db"], config["min_db"])
+    return db > threshold, frame_len
+
+
+def keep_intervals(mask, frame_len, total, sample_rate, config=None):
+    """
+    由语音掩码得到需要保留的采样区间：长于 min_silence_seconds 的静音缩短为 keep_silence_seconds
+    （两端各保留一半，避免切掉字头字尾），其余原样保留。
+
+    Returns:
+        list[tuple]: [(起始采样点, 结束采样点), ...]，按时间排序且互不重叠。
+    """
+    config = config or VAD_CONFIG
+    min_silence = int(config["min_silence_seconds"] * sample_rate / frame_len)
+    pad = int(config["keep_silence_seconds"] * sample_rate / 2)
+    # 找出所有足够长的静音段（按帧），再换算成要删除的采样区间
+    cuts = []
+    padded = np.concatenate(([True], mask, [True]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start >= min_silence:
+            cut_start = start * frame_len + (pad if start > 0 else 0)
+            cut_end = min(total, end * frame_len) - (pad if end < len(mask) else 0)
+            if end >= len(mask):
+                cut_end = total  # 结尾的静音连同不足一帧的尾巴一起删除
+            if cut_end > cut_start:
+                cuts.append((cut_start, cut_end))
+
+    intervals = []
+    position = 0
+    for cut_start, cut_end in cuts:
+        if cut_start > position:
+            intervals.append((position, cut_start))
+        position = cut_end
+    if position < total:
+        intervals.append((position, total))
+    return intervals
+
+
+def compact_silence(input_path, output_path, config=None):
+    """
+    删除音频中的长静音后写入 output_path，并返回时间偏移表，用于把压缩后音频上的时间还原到原始时间轴。
+
+    Returns:
+        dict: {"offsets": [[压缩后起点秒, 原始起点秒, 时长秒], ...],
+               "original_seconds": 原始时长, "compact_seconds": 压缩后时长, "sample_rate": 采样率}
+    """
+    samples, sample_rate = read_pcm16(input_path)
+    mask, frame_len = speech_mask(samples, sample_rate, config)
+    intervals = keep_intervals(mask, frame_len, len(samples), sample_rate, config)
+
+    offsets = []
+    position = 0
+    for start, end in intervals:
+        offsets.append([position / sample_rate, start / sample_rate, (end - start) / sample_rate])
+        position += end - start
+    if intervals:
+        compact = np.concatenate([samples[start:end] for start, end in intervals])
+    else:
+        compact = samples[:0]
+    write_pcm16(output_path, compact, sample_rate)
+    return {
+        "offsets": offsets,
+        "original_seconds": len(samples) / sample_rate,
+        "compact_seconds": len(compact) / sample_rate,
+        "sample_rate": sample_rate,
+    }
+
+
+def to_original_time(seconds, offsets):
+    """把压缩后音频上的时间（秒）还原为原始音频上的时间"""
+    if not offsets:
+        return seconds
+    starts = [item[0] for item in offsets]
+    index = max(0, bisect.bisect_right(starts, seconds) - 1)
+    compact_start, original_start, length = offsets[index]
+    return original_start + min(max(seconds - compact_start, 0.0), length)
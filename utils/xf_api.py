@@ -1,25 +1,158 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import base64
 import hashlib
 import hmac
 import json
 import os
+import random
+import threading
 import time
-import requests
 import urllib
+import wave
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.pipeline_config import ASR_CONFIG
 
 lfasr_host = 'https://raasr.xfyun.cn/v2/api'
 api_upload = '/upload'
 api_get_result = '/getResult'
 
+# orderInfo.status：0 已创建，3 处理中，4 已完成，-1 失败
+PENDING_STATUSES = (0, 3)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(config=None):
+    """进程内共享的 keep-alive 会话：复用 TCP/TLS 连接，只对连接失败做重试"""
+    global _session
+    config = config or ASR_CONFIG
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(total=config["connect_retries"], connect=config["connect_retries"],
+                          read=0, status=0, backoff_factor=0.5)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config["pool_maxsize"], max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def audio_duration(path):
+    """读取 WAV 头得到音频时长（秒），无法解析时返回 None"""
+    try:
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / float(f.getframerate())
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def poll_delays(duration, config=None, rng=None):
+    """
+    生成每次查询前的等待时间（秒）：第一次等到预计完成时刻，
+    之后从 min_poll_interval 开始按 backoff_factor 放大到 max_poll_interval，每次加 ±jitter 的随机抖动。
+    累计等待超过 max_wait_seconds 后停止。
+    """
+    config = config or ASR_CONFIG
+    rng = rng or random
+    expected = config["expected_base_seconds"] + config["expected_ratio"] * (duration or 0)
+    delay = expected
+    interval = config["min_poll_interval"]
+    waited = 0.0
+    while waited < config["max_wait_seconds"]:
+        delay *= 1 + rng.uniform(-config["jitter"], config["jitter"])
+        delay = max(0.0, min(delay, config["max_wait_seconds"] - waited))
+        waited += delay
+        yield delay
+        delay = interval
+        interval = min(interval * config["backoff_factor"], config["max_poll_interval"])
+
+
+def parse_order_segments(order_result_str):
+    """
+    把 orderResult 解析为逐句的时间分段。句子的 bg/ed 为毫秒，词的 wb/we 为相对句首的帧（10 毫秒）。
+
+    Returns:
+        list[dict]: [{"start": 秒, "end": 秒, "text": 句子文本,
+                      "words": [(词, 起始秒, 结束秒, 词性), ...]}, ...]，跳过空句。
+    """
+    order_result_json = json.loads(order_result_str)
+    segments = []
+    for item in order_result_json.get("lattice", []):
+        if "json_1best" not in item:
+            continue
+        st = json.loads(item["json_1best"])["st"]
+        bg = int(st.get("bg", 0)) / 1000.0
+        ed = int(st.get("ed", 0)) / 1000.0
+        words = []
+        for rt_item in st["rt"]:
+            for ws_item in rt_item["ws"]:
+                word = "".join(cw["w"] for cw in ws_item["cw"])
+                if not word:
+                    continue
+                wp = ws_item["cw"][0].get("wp", "n")
+                words.append((word, bg + ws_item.get("wb", 0) / 100.0, bg + ws_item.get("we", 0) / 100.0, wp))
+        text = "".join(word for word, _, _, _ in words).strip()
+        if text:
+            segments.append({"start": bg, "end": ed, "text": text, "words": words})
+    return segments
+
+
+def parse_order_result(order_result_str):
+    """把 getResult 返回的 orderResult（lattice 结构的 JSON 字符串）解析为逐句文本"""
+    return "\n".join(segment["text"] for segment in parse_order_segments(order_result_str))
+
+
+def order_status(result):
+    """getResult 响应中的订单状态，字段缺失时视为处理中"""
+    content = (result or {}).get('content') or {}
+    return (content.get('orderInfo') or {}).get('status', 3)
+
+
+def result_segments(result):
+    """从已结束订单的 getResult 响应中取出逐句分段，没有结果或解析失败时返回 None"""
+    content = (result or {}).get('content') or {}
+    if not content.get('orderResult'):
+        print("get_result resp:", result)
+        return None
+    try:
+        return parse_order_segments(content['orderResult'])
+    except json.JSONDecodeError as e:
+        print(f"解析 orderResult 失败: {e}")
+        return None
+    except Exception as e:
+        print(f"处理转写结果时发生错误: {e}")
+        return None
+
+
+def result_text(result):
+    """从已结束订单的 getResult 响应中取出转写文本，没有结果或解析失败时返回 None"""
+    segments = result_segments(result)
+    if segments is None:
+        return None
+    return "\n".join(segment["text"] for segment in segments)
+
 
 class RequestApi(object):
-    def __init__(self, appid, secret_key, upload_file_path):
+    def __init__(self, appid, secret_key, upload_file_path, config=None, host=None):
         self.appid = appid
         self.secret_key = secret_key
         self.upload_file_path = upload_file_path
+        self.config = config or ASR_CONFIG
+        # 接口地址可替换，例如指向本地模拟服务
+        self.host = host or self.config.get("host", lfasr_host)
+        self.session = get_session(self.config)
+        self.timeout = (self.config["connect_timeout"], self.config["read_timeout"])
         self.ts = str(int(time.time()))
         self.signa = self.get_signa()
+        # 最近一次 get_result 的轮询统计：polls 查询次数，waited 累计等待秒数
+        self.poll_stats = {}
 
     def get_signa(self):
         appid = self.appid
@@ -47,75 +180,84 @@ class RequestApi(object):
         }
         print("upload参数：", param_dict)
 
+        url = self.host + api_upload + "?" + urllib.parse.urlencode(param_dict)
+        # 直接传文件对象，requests 按块流式发送，不把整个音频读入内存
         with open(self.upload_file_path, 'rb') as f:
-            data = f.read(file_len)
-
-        url = lfasr_host + api_upload + "?" + urllib.parse.urlencode(param_dict)
-        response = requests.post(url, headers={"Content-Type": "application/json"}, data=data)
+            response = self.session.post(url, headers={"Content-Type": "application/json"},
+                                         data=f, timeout=self.timeout)
         result = response.json()
         print("upload resp:", result)
         return result
 
-    def get_result(self):
-        uploadresp = self.upload()
-        if 'content' not in uploadresp or 'orderId' not in uploadresp['content']:
-            print("上传失败，无法获取 orderId")
-            return None
-
-        orderId = uploadresp['content']['orderId']
+    def query(self, order_id):
+        """查询一次转写结果，返回 getResult 的响应 JSON"""
         param_dict = {
             'appId': self.appid,
             'signa': self.signa,
             'ts': self.ts,
-            'orderId': orderId,
+            'orderId': order_id,
             'resultType': "transfer,predict"
         }
+        response = self.session.post(
+            url=self.host + api_get_result + "?" + urllib.parse.urlencode(param_dict),
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout
+        )
+        return response.json()
+
+    async def fetch_order_result(self):
+        """
+        上传音频并按 poll_delays 的节奏轮询，直到订单结束。唯一的上传/轮询实现，
+        同步的 get_result 与 asr_client.XfyunAsrClient 都基于它。
+        HTTP 请求是阻塞的，放到线程中执行；两次查询之间用 asyncio.sleep 等待，不占用线程。
+
+        Returns:
+            dict: 订单结束时最后一次 getResult 的响应；上传失败或等待超时返回 None。
+                  轮询统计保存在 self.poll_stats。
+        """
+        try:
+            uploadresp = await asyncio.to_thread(self.upload)
+        except requests.RequestException as e:
+            print(f"上传音频失败: {e}")
+            return None
+        orderId = (uploadresp.get('content') or {}).get('orderId')
+        if not orderId:
+            print("上传失败，无法获取 orderId")
+            return None
+
+        duration = audio_duration(self.upload_file_path)
         print("\n查询部分：")
-        print("get result参数：", param_dict)
+        print(f"orderId={orderId}，音频时长 {duration or 0:.1f} 秒")
 
+        result = None
         status = 3
-        while status == 3:
-            response = requests.post(
-                url=lfasr_host + api_get_result + "?" + urllib.parse.urlencode(param_dict),
-                headers={"Content-Type": "application/json"}
-            )
-            result = response.json()
-            print(result)
-            status = result['content']['orderInfo'].get('status', 3)
-            print("status=", status)
-            if status == -1:
+        polls = 0
+        waited = 0.0
+        for delay in poll_delays(duration, self.config):
+            await asyncio.sleep(delay)
+            waited += delay
+            polls += 1
+            try:
+                result = await asyncio.to_thread(self.query, orderId)
+            except (requests.RequestException, ValueError) as e:
+                # 查询是幂等的：超时或连接中断时按计划继续下一次查询
+                print(f"查询转写结果失败（第 {polls} 次），稍后重试: {e}")
+                continue
+            status = order_status(result)
+            print(f"第 {polls} 次查询（已等待 {waited:.1f} 秒）status=", status)
+            if status not in PENDING_STATUSES:
                 break
-            time.sleep(5)
+        self.poll_stats = {"polls": polls, "waited": waited, "status": status}
 
-        print("get_result resp:", result)
+        if status in PENDING_STATUSES:
+            print(f"等待 {waited:.0f} 秒后转写仍未完成，放弃")
+            return None
+        return result
 
+    def get_result(self):
+        """同步版本：在没有运行中事件循环的线程里调用，返回转写文本或 None"""
+        result = asyncio.run(self.fetch_order_result())
+        if result is None:
+            return None
         # 解析转写文本并返回
-        if status == -1 and 'orderResult' in result['content'] and result['content']['orderResult']:
-            try:
-                order_result_str = result['content']['orderResult']
-                order_result_json = json.loads(order_result_str)
-                lattice = order_result_json.get("lattice", [])
-                transcribed_text = ""
-
-                for item in lattice:
-                    if "json_1best" in item:
-                        inner_json = json.loads(item["json_1best"])
-                        words = [
-                            cw["w"]
-                            for rt_item in inner_json["st"]["rt"]
-                            for ws_item in rt_item["ws"]
-                            for cw in ws_item["cw"]
-                        ]
-                        sentence = "".join(words).strip()
-                        if sentence:
-                            transcribed_text += sentence + "\n"
-
-                return transcribed_text.strip()
-            except json.JSONDecodeError as e:
-                print(f"解析 orderResult 失败: {e}")
-                return None
-            except Exception as e:
-                print(f"处理转写结果时发生错误: {e}")
-                return None
-        else:
-            return None
\ No newline at end of file
+        return result_text(result)